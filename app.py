@@ -1,29 +1,52 @@
 from flask import Flask, render_template
 import os
-from groq import Groq
 from dotenv import load_dotenv
-from routes.tools import tools_bp
-from routes.agents import agents_bp
 
-# Load environment variables
-load_dotenv()
+def create_app(warm: bool = None) -> Flask:
+    """Build the app: one shared storage for every blueprint, then (unless WARM_UP=0) the
+    startup warm-up, so the first requests don't pay for loading registries and the Groq SDK."""
+    # Load environment variables
+    load_dotenv()
 
-app = Flask(__name__)
+    # Debug: Print if API key is loaded
+    api_key = os.getenv("GROQ_API_KEY")
+    print(f"API Key loaded: {'Yes' if api_key else 'No'}")
+    print(f"API Key: {api_key}")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in environment variables. Please check your .env file.")
 
-# Register blueprints
-app.register_blueprint(tools_bp)
-app.register_blueprint(agents_bp)
+    from storage import get_storage
+    from routes.tools import tools_bp
+    from routes.agents import agents_bp, engine
+    from routes.stats import stats_bp
+    from routes.logs import logs_bp
+    from routes.jobs import jobs_bp
 
-# Debug: Print if API key is loaded
-api_key = os.getenv("GROQ_API_KEY")
-print(f"API Key loaded: {'Yes' if api_key else 'No'}")
-print(f"API Key: {api_key}")
-if not api_key:
-    raise ValueError("GROQ_API_KEY not found in environment variables. Please check your .env file.")
+    app = Flask(__name__)
 
-@app.route('/')
-def home():
-    return render_template('index.html')
+    # Register blueprints
+    app.register_blueprint(tools_bp)
+    app.register_blueprint(agents_bp)
+    app.register_blueprint(stats_bp)
+    app.register_blueprint(logs_bp)
+    app.register_blueprint(jobs_bp)
+
+    @app.route('/')
+    def home():
+        return render_template('index.html')
+
+    if warm is None:
+        warm = os.getenv('WARM_UP', '1') == '1'
+    if warm:
+        from utils.warmup import warm_up
+        try:
+            print(f"Warm-up: {warm_up(get_storage(), engine)}")
+        except Exception as e:
+            print(f"Error during warm-up: {str(e)}")
+
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,84 @@
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from models import Agent, Tool
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+class StorageBackend(ABC):
+    """Interface every storage backend implements. `Storage` delegates to one of these."""
+
+    name = 'base'
+
+    # Agents
+    @abstractmethod
+    def load_agents(self) -> List[Agent]: ...
+
+    @abstractmethod
+    def get_agent(self, name: str) -> Optional[Agent]: ...
+
+    @abstractmethod
+    def upsert_agent(self, agent: Agent): ...
+
+    @abstractmethod
+    def delete_agent(self, name: str) -> bool: ...
+
+    @abstractmethod
+    def touch_agent(self, name: str, when: datetime): ...
+
+    @abstractmethod
+    def save_agents(self, agents: List[Agent]):
+        """Replace the whole agent set (bulk import / legacy callers)."""
+
+    # Tools
+    @abstractmethod
+    def load_tools(self) -> List[Tool]: ...
+
+    @abstractmethod
+    def get_tool(self, name: str) -> Optional[Tool]: ...
+
+    def get_tools(self, names: List[str]) -> List[Tool]:
+        tools = (self.get_tool(name) for name in names)
+        return [tool for tool in tools if tool]
+
+    @abstractmethod
+    def upsert_tool(self, tool: Tool): ...
+
+    @abstractmethod
+    def delete_tool(self, name: str) -> bool: ...
+
+    @abstractmethod
+    def save_tools(self, tools: List[Tool]):
+        """Replace the whole tool set (bulk import / legacy callers)."""
+
+    # Change tracking
+    @abstractmethod
+    def agents_version(self) -> str:
+        """Opaque token that changes whenever any agent is created, changed or deleted."""
+
+    @abstractmethod
+    def tools_version(self) -> str:
+        """Opaque token that changes whenever any tool is created, changed or deleted."""
+
+    # Interaction logs
+    @abstractmethod
+    def save_interaction_log(self, agent_name: str, log_data: Dict): ...
+
+    @abstractmethod
+    def get_agent_logs(self, agent_name: str, limit: int = 10) -> List[Dict]: ...
+
+    @abstractmethod
+    def iter_logs(self) -> Iterator[Dict]:
+        """Yield every stored interaction log, oldest first."""
+
+    def import_logs(self, logs: Iterator[Dict]):
+        for log in logs:
+            self.save_interaction_log(log.get('agent_name', ''), log)
+
+    def close(self):
+        pass
@@ -0,0 +1,320 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from models import Agent, Tool
+from backends.base import DateTimeEncoder, StorageBackend
+from utils.log_store import LogStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# touch_agent's last_active updates are kept in memory and written to a small sidecar
+# file at most this often, instead of rewriting agents.json on every /ask
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('AGENT_ACTIVITY_FLUSH_INTERVAL', '5'))
+
+class JSONBackend(StorageBackend):
+    """JSON-file storage with a resident, name-keyed registry of agents and tools.
+
+    The registry is reloaded only when the backing file changes on disk (inode,
+    mtime or size), so several gunicorn workers sharing the same data volume
+    stay consistent without re-parsing the files on every lookup."""
+
+    name = 'json'
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+        self.agents_file = os.path.join(data_dir, "agents.json")
+        self.tools_file = os.path.join(data_dir, "tools.json")
+        self.activity_file = os.path.join(data_dir, "agent_activity.json")
+        self.logs_dir = os.path.join(data_dir, "logs")
+        self.lock_file = os.path.join(data_dir, ".registry.lock")
+        self._lock = threading.RLock()
+        self._agents: Dict[str, Agent] = {}
+        self._tools: Dict[str, Tool] = {}
+        self._agents_sig = None
+        self._tools_sig = None
+        self._activity: Dict[str, datetime] = {}
+        self._activity_sig = None
+        self._pending_activity: Dict[str, datetime] = {}
+        self._activity_flushed = time.monotonic()
+        atexit.register(self.flush_activity)
+        self._ensure_data_dir()
+        self._initialize_files()
+        self.log_store = LogStore.from_env(self.logs_dir)
+        with self._write_lock():
+            self._import_legacy_logs()
+
+    def _ensure_data_dir(self):
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+        if not os.path.exists(self.logs_dir):
+            os.makedirs(self.logs_dir)
+
+    def _initialize_files(self):
+        # Initialize agents file if it doesn't exist
+        if not os.path.exists(self.agents_file):
+            with open(self.agents_file, 'w') as f:
+                json.dump([], f)
+
+        # Initialize tools file if it doesn't exist
+        if not os.path.exists(self.tools_file):
+            with open(self.tools_file, 'w') as f:
+                json.dump([], f)
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize read-modify-write cycles across threads and worker processes."""
+        with self._lock:
+            with open(self.lock_file, 'a') as lock:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _file_signature(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _write_json(self, path: str, data):
+        # Write to a temp file and swap it in so other workers never read a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2, cls=DateTimeEncoder)
+        os.replace(tmp_path, path)
+        return self._file_signature(path)
+
+    def _read_json(self, path: str) -> List[Dict]:
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except json.JSONDecodeError:
+            # If file is corrupted, reinitialize it
+            self._initialize_files()
+            return []
+
+    def _refresh_agents(self):
+        sig = self._file_signature(self.agents_file)
+        if sig == self._agents_sig:
+            return
+        with self._lock:
+            if sig == self._agents_sig:
+                return
+            data = self._read_json(self.agents_file)
+            self._agents = {a.name: a for a in (Agent.from_dict(d) for d in data)}
+            self._agents_sig = sig
+            self._apply_activity(self._activity)
+            self._apply_activity(self._pending_activity)
+
+    def _refresh_tools(self):
+        sig = self._file_signature(self.tools_file)
+        if sig == self._tools_sig:
+            return
+        with self._lock:
+            if sig == self._tools_sig:
+                return
+            data = self._read_json(self.tools_file)
+            self._tools = {t.name: t for t in (Tool(**d) for d in data)}
+            self._tools_sig = sig
+
+    def _write_agents(self, agents: Dict[str, Agent]):
+        self._agents_sig = self._write_json(self.agents_file, [a.to_dict() for a in agents.values()])
+        self._agents = agents
+
+    def _write_tools(self, tools: Dict[str, Tool]):
+        self._tools_sig = self._write_json(self.tools_file, [vars(t) for t in tools.values()])
+        self._tools = tools
+
+    def save_agents(self, agents: List[Agent]):
+        with self._write_lock():
+            self._write_agents({agent.name: agent for agent in agents})
+
+    def load_agents(self) -> List[Agent]:
+        self._refresh_agents()
+        self._refresh_activity()
+        return list(self._agents.values())
+
+    def get_agent(self, name: str) -> Optional[Agent]:
+        self._refresh_agents()
+        self._refresh_activity()
+        return self._agents.get(name)
+
+    def upsert_agent(self, agent: Agent):
+        with self._write_lock():
+            self._refresh_agents()
+            agents = dict(self._agents)
+            agents[agent.name] = agent
+            self._write_agents(agents)
+
+    def delete_agent(self, name: str) -> bool:
+        with self._write_lock():
+            self._refresh_agents()
+            if name not in self._agents:
+                return False
+            agents = dict(self._agents)
+            del agents[name]
+            self._write_agents(agents)
+            return True
+
+    # last_active lives in agent_activity.json ({name: timestamp}), merged into the agents
+    # as they are read, so touching an agent never changes the registry file or its version
+
+    def _apply_activity(self, activity: Dict[str, datetime]):
+        for name, when in activity.items():
+            agent = self._agents.get(name)
+            if agent is not None and (agent.last_active is None or agent.last_active < when):
+                agent.last_active = when
+
+    def _refresh_activity(self):
+        sig = self._file_signature(self.activity_file)
+        if sig == self._activity_sig:
+            return
+        with self._lock:
+            if sig == self._activity_sig:
+                return
+            try:
+                with open(self.activity_file) as f:
+                    data = json.load(f)
+                self._activity = {name: datetime.fromisoformat(when) for name, when in data.items()}
+            except (OSError, ValueError, AttributeError):
+                self._activity = {}
+            self._activity_sig = sig
+            self._apply_activity(self._activity)
+
+    def touch_agent(self, name: str, when: datetime):
+        with self._lock:
+            agent = self._agents.get(name)
+            if agent is not None:
+                agent.last_active = when
+            self._pending_activity[name] = when
+            due = time.monotonic() - self._activity_flushed >= ACTIVITY_FLUSH_INTERVAL
+        if due:
+            self.flush_activity()
+
+    def flush_activity(self):
+        """Merge this process's pending last_active updates into the sidecar file."""
+        with self._lock:
+            pending, self._pending_activity = self._pending_activity, {}
+            self._activity_flushed = time.monotonic()
+        if not pending:
+            return
+        try:
+            self._write_activity(pending)
+        except OSError as e:
+            print(f"Error writing agent activity: {str(e)}")
+
+    def _write_activity(self, pending: Dict[str, datetime]):
+        with self._write_lock():
+            self._activity_sig = None
+            self._refresh_activity()
+            merged = dict(self._activity)
+            for name, when in pending.items():
+                if name not in merged or merged[name] < when:
+                    merged[name] = when
+            self._activity_sig = self._write_json(
+                self.activity_file, {name: when.isoformat() for name, when in merged.items()})
+            self._activity = merged
+
+    def save_tools(self, tools: List[Tool]):
+        with self._write_lock():
+            self._write_tools({tool.name: tool for tool in tools})
+
+    def load_tools(self) -> List[Tool]:
+        self._refresh_tools()
+        return list(self._tools.values())
+
+    def get_tool(self, name: str) -> Optional[Tool]:
+        self._refresh_tools()
+        return self._tools.get(name)
+
+    def get_tools(self, names: List[str]) -> List[Tool]:
+        self._refresh_tools()
+        tools = self._tools
+        return [tools[name] for name in names if name in tools]
+
+    def upsert_tool(self, tool: Tool):
+        with self._write_lock():
+            self._refresh_tools()
+            tools = dict(self._tools)
+            tools[tool.name] = tool
+            self._write_tools(tools)
+
+    def delete_tool(self, name: str) -> bool:
+        with self._write_lock():
+            self._refresh_tools()
+            if name not in self._tools:
+                return False
+            tools = dict(self._tools)
+            del tools[name]
+            self._write_tools(tools)
+            return True
+
+    @staticmethod
+    def _version(sig) -> str:
+        return '-'.join(str(part) for part in sig) if sig else '0'
+
+    def agents_version(self) -> str:
+        self._refresh_agents()
+        return self._version(self._agents_sig)
+
+    def tools_version(self) -> str:
+        self._refresh_tools()
+        return self._version(self._tools_sig)
+
+    def _import_legacy_logs(self):
+        """Move one-file-per-request logs from older versions into the log store."""
+        legacy = [f for f in os.listdir(self.logs_dir) if f.endswith('.json')]
+        if not legacy:
+            return
+        logs = []
+        for filename in legacy:
+            try:
+                with open(os.path.join(self.logs_dir, filename), 'r') as f:
+                    logs.append(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping unreadable log {filename}: {str(e)}")
+        logs.sort(key=lambda log: log.get('timestamp', ''))
+        for log in logs:
+            self.log_store.append(log.get('agent_name', ''), log)
+        self.log_store.flush()
+
+        archive_dir = os.path.join(self.logs_dir, 'legacy_json')
+        os.makedirs(archive_dir, exist_ok=True)
+        for filename in legacy:
+            os.replace(os.path.join(self.logs_dir, filename), os.path.join(archive_dir, filename))
+
+    def save_interaction_log(self, agent_name: str, log_data: Dict):
+        """Save an interaction log for an agent."""
+        log_data['timestamp'] = datetime.now().isoformat()
+        self.log_store.append(agent_name, log_data)
+
+    def get_agent_logs(self, agent_name: str, limit: int = 10) -> List[Dict]:
+        """Get the most recent interaction logs for an agent."""
+        return self.log_store.last(agent_name, limit)
+
+    def iter_logs(self) -> Iterator[Dict]:
+        yield from self.log_store
+
+    def import_logs(self, logs: Iterator[Dict]):
+        for log in logs:
+            self.log_store.append(log.get('agent_name', ''), log)
+        self.log_store.flush()
+
+    def close(self):
+        self.flush_activity()
+        self.log_store.close()
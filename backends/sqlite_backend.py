@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from models import Agent, Tool
+from backends.base import DateTimeEncoder, StorageBackend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    last_active TEXT
+);
+CREATE TABLE IF NOT EXISTS tools (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interaction_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent_name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_agent ON interaction_logs (agent_name, id);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON interaction_logs (timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('agents_version', 0), ('tools_version', 0);
+"""
+
+# Bump a per-table version on every write so caches can tell when the registry changed.
+# Agent updates count only when the definition changes: touch_agent's last_active
+# updates happen on every /ask and must not invalidate listings and caches.
+SCHEMA += "DROP TRIGGER IF EXISTS agents_update_version;\n"
+for _table in ('agents', 'tools'):
+    for _op in ('INSERT', 'UPDATE', 'DELETE'):
+        _event, _name = _op, f"{_table}_{_op.lower()}_version"
+        if _table == 'agents' and _op == 'UPDATE':
+            _event, _name = 'UPDATE OF data', 'agents_update_data_version'
+        SCHEMA += (f"CREATE TRIGGER IF NOT EXISTS {_name} AFTER {_event} ON {_table} "
+                   f"BEGIN UPDATE meta SET value = value + 1 WHERE key = '{_table}_version'; END;\n")
+
+class SQLiteBackend(StorageBackend):
+    """SQLite storage in WAL mode.
+
+    Every create/delete/touch is a single-row statement, so concurrent gunicorn
+    workers don't clobber each other and write cost doesn't grow with the size
+    of the registry. Connections are per thread and per process."""
+
+    name = 'sqlite'
+
+    def __init__(self, data_dir: str = "data", db_path: Optional[str] = None):
+        self.data_dir = data_dir
+        self.db_path = db_path or os.path.join(data_dir, "toolmind.db")
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not be shared with a forked child
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _agent_from_row(data: str, last_active: Optional[str]) -> Agent:
+        agent_data = json.loads(data)
+        agent_data['last_active'] = last_active
+        return Agent.from_dict(agent_data)
+
+    @staticmethod
+    def _agent_row(agent: Agent):
+        data = agent.to_dict()
+        return (agent.name, json.dumps(data), data['last_active'])
+
+    @staticmethod
+    def _tool_row(tool: Tool):
+        return (tool.name, json.dumps(vars(tool), cls=DateTimeEncoder))
+
+    def load_agents(self) -> List[Agent]:
+        rows = self._conn().execute("SELECT data, last_active FROM agents ORDER BY rowid")
+        return [self._agent_from_row(*row) for row in rows]
+
+    def get_agent(self, name: str) -> Optional[Agent]:
+        row = self._conn().execute(
+            "SELECT data, last_active FROM agents WHERE name = ?", (name,)).fetchone()
+        return self._agent_from_row(*row) if row else None
+
+    def upsert_agent(self, agent: Agent):
+        self._conn().execute(
+            "INSERT INTO agents (name, data, last_active) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET data = excluded.data, last_active = excluded.last_active",
+            self._agent_row(agent))
+
+    def delete_agent(self, name: str) -> bool:
+        return self._conn().execute("DELETE FROM agents WHERE name = ?", (name,)).rowcount > 0
+
+    def touch_agent(self, name: str, when: datetime):
+        self._conn().execute(
+            "UPDATE agents SET last_active = ? WHERE name = ?", (when.isoformat(), name))
+
+    def save_agents(self, agents: List[Agent]):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM agents")
+            conn.executemany("INSERT INTO agents (name, data, last_active) VALUES (?, ?, ?)",
+                             [self._agent_row(agent) for agent in agents])
+
+    def load_tools(self) -> List[Tool]:
+        rows = self._conn().execute("SELECT data FROM tools ORDER BY rowid")
+        return [Tool(**json.loads(data)) for (data,) in rows]
+
+    def get_tool(self, name: str) -> Optional[Tool]:
+        row = self._conn().execute("SELECT data FROM tools WHERE name = ?", (name,)).fetchone()
+        return Tool(**json.loads(row[0])) if row else None
+
+    def get_tools(self, names: List[str]) -> List[Tool]:
+        if not names:
+            return []
+        placeholders = ','.join('?' * len(names))
+        rows = self._conn().execute(
+            f"SELECT name, data FROM tools WHERE name IN ({placeholders})", list(names))
+        found = {name: data for name, data in rows}
+        return [Tool(**json.loads(found[name])) for name in names if name in found]
+
+    def upsert_tool(self, tool: Tool):
+        self._conn().execute(
+            "INSERT INTO tools (name, data) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET data = excluded.data",
+            self._tool_row(tool))
+
+    def delete_tool(self, name: str) -> bool:
+        return self._conn().execute("DELETE FROM tools WHERE name = ?", (name,)).rowcount > 0
+
+    def save_tools(self, tools: List[Tool]):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM tools")
+            conn.executemany("INSERT INTO tools (name, data) VALUES (?, ?)",
+                             [self._tool_row(tool) for tool in tools])
+
+    def _meta_value(self, key: str) -> str:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return str(row[0]) if row else '0'
+
+    def agents_version(self) -> str:
+        return self._meta_value('agents_version')
+
+    def tools_version(self) -> str:
+        return self._meta_value('tools_version')
+
+    def save_interaction_log(self, agent_name: str, log_data: Dict):
+        """Save an interaction log for an agent."""
+        log_data.setdefault('timestamp', datetime.now().isoformat())
+        self._conn().execute(
+            "INSERT INTO interaction_logs (agent_name, timestamp, data) VALUES (?, ?, ?)",
+            (agent_name, log_data['timestamp'], json.dumps(log_data, cls=DateTimeEncoder)))
+
+    def get_agent_logs(self, agent_name: str, limit: int = 10) -> List[Dict]:
+        """Get the most recent interaction logs for an agent."""
+        rows = self._conn().execute(
+            "SELECT data FROM interaction_logs WHERE agent_name = ? ORDER BY id DESC LIMIT ?",
+            (agent_name, limit))
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_logs(self) -> Iterator[Dict]:
+        rows = self._conn().execute("SELECT data FROM interaction_logs ORDER BY timestamp, id")
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def import_logs(self, logs: Iterator[Dict]):
+        """Bulk-insert logs in one transaction (used by migration)."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO interaction_logs (agent_name, timestamp, data) VALUES (?, ?, ?)",
+                ((log.get('agent_name', ''), log.get('timestamp', ''),
+                  json.dumps(log, cls=DateTimeEncoder)) for log in logs))
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,74 @@
+"""End-to-end /ask latency with and without early tool dispatch, against local fake servers.
+
+    python -m benchmarks.bench_early_dispatch --tail-words 40 --tool-latency 0.2
+
+The fake model answers the first completion with a tool request followed by
+--tail-words words of chatter (as models sometimes add), streamed at
+--tokens-per-sec. Without early dispatch the tool call waits for the whole
+completion, and a tool request followed by text isn't recognized at all
+(see the tool calls column); with it, the tool starts as soon as the JSON
+object closes and the stream is closed once the tool is done."""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from groq import Groq
+from models import Agent, Tool
+from storage import Storage
+from utils import agent_engine
+from utils.agent_engine import AgentEngine
+from benchmarks.common import percentiles
+from benchmarks.fake_groq import DEFAULT_ANSWER, FakeGroqServer
+from benchmarks.fake_tool import FakeToolServer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--tail-words', type=int, default=40, help='words the model adds after the tool JSON')
+    parser.add_argument('--tokens-per-sec', type=float, default=200)
+    parser.add_argument('--ttft', type=float, default=0.1)
+    parser.add_argument('--tool-latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    tail = ''.join(f" word{i}" for i in range(args.tail_words))
+
+    def responder(messages, body):
+        if any(str(m.get('content', '')).startswith('Tool execution result') for m in messages):
+            return DEFAULT_ANSWER
+        return json.dumps({'tool': 'Facts', 'params': {'q': 'dogs'}}) + tail
+
+    groq = FakeGroqServer(ttft=args.ttft, tokens_per_sec=args.tokens_per_sec, responder=responder).start()
+    tool = FakeToolServer(latency=args.tool_latency, body_size=256).start()
+    data_dir = tempfile.mkdtemp(prefix='bench_early_')
+    agent_engine.rate_limits.enabled = False
+    try:
+        storage = Storage(data_dir)
+        storage.add_tool(Tool(name='Facts', description='Facts about a topic', type='http_api', config={
+            'base_url': tool.base_url, 'http_method': 'GET', 'endpoint_path': '/facts'}))
+        agent = Agent(name='FactAgent', description='Answers with facts', tools=['Facts'])
+        storage.add_agent(agent)
+        engine = AgentEngine(storage, Groq(api_key='fake', base_url=groq.base_url, max_retries=0))
+
+        print(f"{'early dispatch':<15} {'p50 ms':>8} {'p95 ms':>8} {'tool calls':>11} {'saved p50 ms':>13}")
+        for early in (False, True):
+            agent_engine.EARLY_TOOL_DISPATCH = early
+            samples, saved, tool_calls = [], [], 0
+            for i in range(args.requests):
+                started = time.perf_counter()
+                result = engine.ask(agent, f"Tell me about dogs #{i}")
+                samples.append(time.perf_counter() - started)
+                tool_calls += len(result['tools_used'])
+                saved += [entry['saved_ms'] / 1000 for entry in result['debug_log']
+                          if entry['event'] == 'early_dispatch_saved']
+            latency = percentiles(samples)
+            saved_p50 = percentiles(saved).get('p50_ms', 0.0)
+            print(f"{'on' if early else 'off':<15} {latency['p50_ms']:>8.1f} {latency['p95_ms']:>8.1f} "
+                  f"{tool_calls:>11} {saved_p50:>13.1f}")
+    finally:
+        groq.stop()
+        tool.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
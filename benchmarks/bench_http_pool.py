@@ -0,0 +1,59 @@
+"""Tool-call latency through execute_http_tool with and without connection pooling.
+
+    python -m benchmarks.bench_http_pool --calls 500 --concurrency 8
+
+Runs against a local stub server, so the difference is the per-call TCP
+connect; against a real HTTPS upstream the TLS handshake adds to it."""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from models import Tool
+from utils import tool_executor
+from utils.http_pool import HttpPool
+from benchmarks.common import percentiles
+from benchmarks.fake_tool import FakeToolServer
+
+class UnpooledClient:
+    """What execute_http_tool did before pooling: a fresh connection per call."""
+
+    def request(self, method, url, timeout=None, **kwargs):
+        return requests.request(method=method, url=url, timeout=timeout, **kwargs)
+
+def run(client, tool, calls, concurrency):
+    tool_executor.http_pool = client
+
+    def call(_):
+        start = time.perf_counter()
+        tool_executor.execute_http_tool(tool, {'q': 'dogs'})
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return percentiles(list(executor.map(call, range(calls))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.002, help="stub server latency in seconds")
+    args = parser.parse_args()
+
+    server = FakeToolServer(latency=args.latency).start()
+    tool = Tool(name='Stub', description='stub', type='http_api',
+                config={'base_url': server.base_url, 'http_method': 'GET', 'endpoint_path': '/facts'})
+    pooled = HttpPool(pool_maxsize=args.concurrency)
+    original = tool_executor.http_pool
+    try:
+        print(f"{'client':<10} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+        for name, client in (('unpooled', UnpooledClient()), ('pooled', pooled)):
+            before = server.connections
+            stats = run(client, tool, args.calls, args.concurrency)
+            print(f"{name:<10} {stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f} {server.connections - before:>12}")
+        print(f"pool stats: {pooled.stats()}")
+    finally:
+        tool_executor.http_pool = original
+        pooled.close()
+        server.stop()
+
+if __name__ == '__main__':
+    main()
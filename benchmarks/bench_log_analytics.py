@@ -0,0 +1,79 @@
+"""Time /logs queries and /logs/stats aggregation over a large interaction history.
+
+    python -m benchmarks.bench_log_analytics --entries 1000000
+
+Synthetic logs (spread over 30 days, 20 agents, 10 tools, ~5% errors) are
+indexed with LogAnalytics.record_many, then filtered queries and stats are timed."""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from utils.log_analytics import LogAnalytics
+from benchmarks.common import timed
+
+def synthetic_log(i, entries, start):
+    ts = start + timedelta(seconds=i * 30 * 86400 / entries)
+    agent = f"agent{i % 20}"
+    tool = f"tool{random.randrange(10)}"
+    groq_ms = random.lognormvariate(6, 0.4)
+    tool_ms = random.lognormvariate(4, 0.8)
+
+    def at(ms):
+        return (ts + timedelta(milliseconds=ms)).isoformat()
+
+    debug_log = [
+        {'timestamp': at(0), 'event': 'request_received'},
+        {'timestamp': at(1), 'event': 'tools_loaded'},
+        {'timestamp': at(1), 'event': 'system_prompt_ready', 'lookup_ms': 0.01},
+        {'timestamp': at(1), 'event': 'groq_api_call'},
+        {'timestamp': at(1 + groq_ms), 'event': 'groq_response_received'},
+        {'timestamp': at(1 + groq_ms), 'event': 'tool_execution_started', 'tool': tool},
+        {'timestamp': at(1 + groq_ms + tool_ms), 'event': 'tool_execution_completed', 'tool': tool,
+         'debug_info': {'response': {'status_code': 500 if random.random() < 0.05 else 200}}},
+    ]
+    return agent, {'agent_name': agent, 'timestamp': ts.isoformat(), 'question': f"question {i}",
+                   'response': 'answer', 'tools_used': [tool], 'debug_log': debug_log}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bench_logs_")
+    try:
+        analytics = LogAnalytics(os.path.join(data_dir, 'log_analytics.db'))
+        start = datetime.now() - timedelta(days=30)
+        started = time.perf_counter()
+        batch = []
+        for i in range(args.entries):
+            batch.append(synthetic_log(i, args.entries, start))
+            if len(batch) == 5000:
+                analytics.record_many(batch)
+                batch = []
+        if batch:
+            analytics.record_many(batch)
+        elapsed = time.perf_counter() - started
+        print(f"indexed {args.entries} logs in {elapsed:.1f}s ({args.entries / elapsed:.0f}/s)")
+
+        last_week = (datetime.now() - timedelta(days=7)).timestamp()
+        cases = {
+            'page': lambda i: list(analytics.query(limit=100)),
+            'agent_page': lambda i: list(analytics.query(agent=f"agent{i % 20}", limit=100)),
+            'tool_page': lambda i: list(analytics.query(tool=f"tool{i % 10}", limit=100)),
+            'errors_page': lambda i: list(analytics.query(error=True, limit=100)),
+            'stats_all': lambda i: analytics.stats(),
+            'stats_agent_week': lambda i: analytics.stats(agent=f"agent{i % 20}", since=last_week),
+        }
+        print(f"{'operation':<18} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, fn in cases.items():
+            stats = timed(fn, args.iterations)
+            print(f"{name:<18} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Measure the per-request cost of metrics instrumentation and of serving /metrics.
+
+    python -m benchmarks.bench_metrics --workers 8
+
+`observe` is the work added to every answered question; `render` is one
+scrape merging the snapshot files of --workers simulated gunicorn workers."""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from utils.metrics import MetricsRegistry, metrics, observe_request
+from benchmarks.common import timed
+
+def synthetic_log():
+    start = datetime.now()
+
+    def at(ms):
+        return (start + timedelta(milliseconds=ms)).isoformat()
+
+    usage = {'prompt_tokens': 420, 'completion_tokens': 32}
+    return {'response': 'answer', 'debug_log': [
+        {'timestamp': at(0), 'event': 'request_received'},
+        {'timestamp': at(1), 'event': 'tools_loaded'},
+        {'timestamp': at(1), 'event': 'system_prompt_ready', 'lookup_ms': 0.01},
+        {'timestamp': at(1), 'event': 'groq_api_call'},
+        {'timestamp': at(300), 'event': 'groq_response_received', 'usage': usage},
+        {'timestamp': at(300), 'event': 'tool_execution_started', 'tool': 'Weather'},
+        {'timestamp': at(380), 'event': 'tool_execution_completed', 'tool': 'Weather', 'debug_info': {}},
+        {'timestamp': at(380), 'event': 'groq_api_call', 'context': 'tool_result_interpretation'},
+        {'timestamp': at(700), 'event': 'groq_response_received', 'usage': usage,
+         'context': 'tool_result_interpretation'},
+    ]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=10000)
+    args = parser.parse_args()
+
+    log = synthetic_log()
+    observe = timed(lambda i: observe_request(f"agent{i % 20}", 'llama', log), args.iterations)
+
+    metrics_dir = tempfile.mkdtemp(prefix="bench_metrics_")
+    registry = MetricsRegistry(metrics_dir, flush_interval=3600)
+    registry._metrics = metrics._metrics
+    try:
+        # This process plus workers-1 simulated ones publishing the same snapshot
+        snapshot = registry.snapshot()
+        for pid in range(args.workers - 1):
+            with open(os.path.join(metrics_dir, f"worker-sim{pid}.json"), 'w') as f:
+                json.dump(snapshot, f)
+        render = timed(lambda i: registry.render(), min(args.iterations, 200))
+    finally:
+        atexit.unregister(registry.flush)
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+    print(f"{'operation':<10} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, stats in (('observe', observe), ('render', render)):
+        print(f"{name:<10} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Sustained load against a rate-limited fake Groq, with and without client-side limiting.
+
+    python -m benchmarks.bench_rate_limit --upstream-rps 10 --duration 10
+
+One busy agent (--busy-clients threads) and one quiet agent (one thread)
+ask questions back to back. Without the limiter, requests above the
+upstream's limit fail with 429s. With it, they queue, and round-robin
+scheduling keeps the quiet agent's latency close to the busy one's."""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from groq import Groq
+from models import Agent
+from storage import Storage
+from utils import agent_engine
+from utils.agent_engine import AgentEngine
+from utils.rate_limit import RateLimits
+from benchmarks.common import percentiles
+from benchmarks.fake_groq import FakeGroqServer
+
+def run(limited, args):
+    server = FakeGroqServer(requests_per_sec=args.upstream_rps).start()
+    data_dir = tempfile.mkdtemp(prefix="bench_rate_")
+    agent_engine.rate_limits = RateLimits(enabled=limited, max_wait=args.max_wait,
+                                          groq={'rate': args.upstream_rps, 'burst': None, 'max_concurrency': 16})
+    try:
+        storage = Storage(data_dir)
+        agents = [Agent(name='busy', description='busy', temperature=0.7),
+                  Agent(name='quiet', description='quiet', temperature=0.7)]
+        for agent in agents:
+            storage.add_agent(agent)
+        client = Groq(api_key='fake', base_url=server.base_url, max_retries=0)
+        engine = AgentEngine(storage, client)
+        results = {agent.name: {'ok': [], 'errors': 0} for agent in agents}
+        lock = threading.Lock()
+        stop_at = time.monotonic() + args.duration
+
+        def worker(agent):
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    engine.ask(agent, "How good is a dog's nose?")
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        results[agent.name]['ok'].append(elapsed)
+                except Exception:
+                    with lock:
+                        results[agent.name]['errors'] += 1
+                    time.sleep(0.05)
+
+        threads = [threading.Thread(target=worker, args=(agents[0],)) for _ in range(args.busy_clients)]
+        threads.append(threading.Thread(target=worker, args=(agents[1],)))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        storage.backend.close()
+        return results, server.rejected
+    finally:
+        server.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--upstream-rps', type=float, default=10)
+    parser.add_argument('--busy-clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--max-wait', type=float, default=30)
+    args = parser.parse_args()
+
+    print(f"{'limiter':<8} {'agent':<6} {'ok/s':>6} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'429s':>6}")
+    for limited in (False, True):
+        results, rejected = run(limited, args)
+        for name, result in results.items():
+            stats = percentiles(result['ok'])
+            print(f"{'on' if limited else 'off':<8} {name:<6} {len(result['ok']) / args.duration:>6.1f} "
+                  f"{result['errors']:>7} {stats.get('p50_ms', 0):>9.1f} {stats.get('p99_ms', 0):>9.1f} {rejected:>6}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""/recommend_agent cost vs. agent count: local index lookups vs. the all-agents LLM prompt.
+
+    python -m benchmarks.bench_recommend --counts 10 100 1000 10000
+
+For each registry size this reports index build time, index search latency,
+and the prompt size the LLM would be sent: every agent (before) vs. the
+top-k shortlist (after, and only when the index isn't confident)."""
+import argparse
+import json
+import random
+import time
+from models import Agent, Tool
+from utils.agent_index import AgentIndex, confident_pick
+from utils.sessions import estimate_tokens
+from benchmarks.common import timed
+
+TOPICS = ['dog', 'cat', 'weather', 'stock', 'joke', 'recipe', 'movie', 'book', 'flight', 'news',
+          'currency', 'football', 'music', 'translation', 'dictionary', 'github', 'calendar', 'email']
+
+def make_registry(n):
+    tools = [Tool(name=f"{topic.title()}Api", description=f"Fetch {topic} data from the {topic} service",
+                  type='http_api', config={'base_url': 'http://localhost', 'http_method': 'GET',
+                                           'endpoint_path': f'/{topic}'})
+             for topic in TOPICS]
+    agents = []
+    for i in range(n):
+        topic = TOPICS[i % len(TOPICS)]
+        agents.append(Agent(name=f"{topic.title()}Agent{i}",
+                            description=f"Agent {i} that answers questions about {topic} using live {topic} data",
+                            tools=[tools[i % len(TOPICS)].name]))
+    return agents, {tool.name: tool for tool in tools}
+
+def llm_prompt_tokens(agents):
+    return estimate_tokens(json.dumps([{'name': a.name, 'description': a.description, 'tools': a.tools}
+                                       for a in agents], indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--shortlist', type=int, default=5)
+    args = parser.parse_args()
+
+    questions = [f"Can you give me the latest {random.choice(TOPICS)} information?" for _ in range(args.queries)]
+    print(f"{'agents':>7} {'build ms':>9} {'search p50 ms':>14} {'search p99 ms':>14} "
+          f"{'confident':>10} {'llm tokens before':>18} {'llm tokens after':>17}")
+    for n in args.counts:
+        agents, tools = make_registry(n)
+        index = AgentIndex()
+        start = time.perf_counter()
+        for agent in agents:
+            index.add_agent(agent, [tools[name] for name in agent.tools])
+        build_ms = (time.perf_counter() - start) * 1000
+
+        confident = 0
+        def search(i):
+            nonlocal confident
+            ranked = index.search(questions[i], k=args.shortlist)
+            if confident_pick(ranked, 0.5, 1.5):
+                confident += 1
+        stats = timed(search, args.queries)
+
+        by_name = {agent.name: agent for agent in agents}
+        shortlist = [by_name[name] for name, _ in index.search(questions[0], k=args.shortlist)]
+        print(f"{n:>7} {build_ms:>9.1f} {stats['p50_ms']:>14.3f} {stats['p99_ms']:>14.3f} "
+              f"{confident / args.queries:>10.0%} {llm_prompt_tokens(agents):>18} {llm_prompt_tokens(shortlist):>17}")
+
+if __name__ == '__main__':
+    main()
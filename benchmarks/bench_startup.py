@@ -0,0 +1,87 @@
+"""Measure cold start: app import time and latency of the first requests in a fresh process.
+
+    python -m benchmarks.bench_startup --runs 5
+    WARM_UP=0 python -m benchmarks.bench_startup
+
+Each run starts a new Python process (like a freshly forked or recycled
+gunicorn worker without --preload) against a seeded data directory and
+local fake Groq and tool servers, then times `import app`, the first
+GET /agents, the first POST /ask that calls a tool and the second one."""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS = ('import_ms', 'first_list_ms', 'first_ask_ms', 'second_ask_ms')
+
+def child():
+    """Runs inside the measured process; prints one JSON line of timings."""
+    timings = {}
+    started = time.perf_counter()
+    from app import app
+    timings['import_ms'] = (time.perf_counter() - started) * 1000
+    client = app.test_client()
+    for step, call in (('first_list_ms', lambda: client.get('/agents')),
+                       ('first_ask_ms', lambda: client.post('/ask/Tooled', json={'question': 'dogs?'})),
+                       ('second_ask_ms', lambda: client.post('/ask/Tooled', json={'question': 'cats?'}))):
+        started = time.perf_counter()
+        response = call()
+        response.get_data()
+        timings[step] = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise SystemExit(f"{step}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}")
+    print(json.dumps(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--backend', default=os.getenv('STORAGE_BACKEND', 'json'), choices=['json', 'sqlite'])
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    from benchmarks.fake_groq import FakeGroqServer
+    from benchmarks.fake_tool import FakeToolServer
+    from benchmarks.run import tool_responder
+    groq = FakeGroqServer(responder=tool_responder).start()
+    tool = FakeToolServer(body_size=2048).start()
+    workdir = tempfile.mkdtemp(prefix='bench_startup_')
+    env = dict(os.environ, GROQ_BASE_URL=groq.base_url, GROQ_API_KEY='fake', STORAGE_BACKEND=args.backend,
+               RATE_LIMITS=os.getenv('RATE_LIMITS', '0'), PYTHONPATH=REPO)
+    try:
+        os.environ['STORAGE_BACKEND'] = args.backend
+        from models import Agent, Tool
+        from storage import Storage
+        storage = Storage(os.path.join(workdir, 'data'))
+        storage.add_tool(Tool(name='Echo', description='Echo the query back', type='http_api', config={
+            'base_url': tool.base_url, 'http_method': 'GET', 'endpoint_path': '/echo'}))
+        storage.add_agent(Agent(name='Tooled', description='Answers using the Echo tool', tools=['Echo']))
+        storage.backend.close()
+
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--child'], cwd=workdir,
+                                    env=env, capture_output=True, text=True)
+            if output.returncode != 0:
+                raise SystemExit(output.stderr or output.stdout)
+            runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    finally:
+        groq.stop()
+        tool.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'step':<16} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for step in STEPS:
+        values = [run[step] for run in runs]
+        print(f"{step:<16} {statistics.median(values):>10.1f} {min(values):>8.1f} {max(values):>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Compare create / lookup / ask-path latency of the storage backends.
+
+    python -m benchmarks.bench_storage --agents 10000
+
+The registry is seeded in bulk, then individual operations are timed against
+a registry of that size."""
+import argparse
+import random
+import shutil
+import tempfile
+from models import Agent, Tool
+from storage import BACKENDS, create_backend
+from benchmarks.common import timed
+
+def bench_backend(name, n_agents, iterations):
+    data_dir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    try:
+        backend = create_backend(name, data_dir)
+        tools = [Tool(name=f"tool{i}", description=f"Tool number {i}", type='http_api',
+                      config={'base_url': 'http://localhost', 'http_method': 'GET', 'endpoint_path': f'/t/{i}'})
+                 for i in range(50)]
+        backend.save_tools(tools)
+        backend.save_agents([Agent(name=f"agent{i}", description=f"Agent number {i}",
+                                   tools=[f"tool{i % 50}", f"tool{(i + 1) % 50}"])
+                             for i in range(n_agents)])
+        names = [f"agent{random.randrange(n_agents)}" for _ in range(iterations)]
+
+        def create(i):
+            backend.upsert_agent(Agent(name=f"new{i}", description="benchmark", tools=["tool0"]))
+
+        def lookup(i):
+            backend.get_agent(names[i])
+
+        def ask_path(i):
+            agent = backend.get_agent(names[i])
+            backend.get_tools(agent.tools)
+            backend.touch_agent(agent.name, agent.created_at)
+            backend.save_interaction_log(agent.name, {'agent_name': agent.name, 'question': 'q',
+                                                      'response': 'r', 'tools_used': [], 'debug_log': []})
+
+        results = {
+            'create': timed(create, iterations),
+            'lookup': timed(lookup, iterations),
+            'ask_path': timed(ask_path, iterations),
+        }
+        backend.close()
+        return results
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agents', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'operation':<10} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in args.backends:
+        for op, stats in bench_backend(name, args.agents, args.iterations).items():
+            print(f"{name:<8} {op:<10} {stats['mean_ms']:>9.3f} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Tool call tail latency with and without hedged GETs, and time to fail while a tool is down.
+
+    python -m benchmarks.bench_tool_hedging --calls 400 --slow-ratio 0.03 --slow-latency 0.5
+
+The fake tool answers in --latency seconds, except for a --slow-ratio share of
+requests that take --slow-latency. With hedging, a call still running after
+the tool's recent p95 latency gets a second request, and the first response wins.
+The last line times calls to a tool that only returns 500s, before and after its
+circuit breaker opens."""
+import argparse
+import random
+import time
+from benchmarks.common import percentiles
+from benchmarks.fake_tool import FakeToolServer
+from models import Tool
+from utils.rate_limit import rate_limits
+from utils.tool_executor import execute_http_tool
+from utils.tool_health import tool_health
+
+class TailServer(FakeToolServer):
+    def __init__(self, latency: float, slow_ratio: float, slow_latency: float):
+        super().__init__()
+        self.base_latency = latency
+        self.slow_ratio = slow_ratio
+        self.slow_latency = slow_latency
+        self.failing = False
+
+    def respond(self, handler, body):
+        if self.failing:
+            time.sleep(self.base_latency)
+            return 500, {'error': 'upstream down'}, {}
+        time.sleep(self.slow_latency if random.random() < self.slow_ratio else self.base_latency)
+        return super().respond(handler, body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--slow-ratio', type=float, default=0.03)
+    parser.add_argument('--slow-latency', type=float, default=0.5)
+    args = parser.parse_args()
+
+    server = TailServer(args.latency, args.slow_ratio, args.slow_latency).start()
+    # The host rate limiter would pace these calls; this measures the upstream alone
+    rate_limits.enabled = False
+    try:
+        tool = Tool(name='Tail', description='Sometimes slow', type='http_api', config={
+            'base_url': server.base_url, 'http_method': 'GET', 'endpoint_path': '/items', 'coalesce': False})
+
+        print(f"{'hedge':<6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedges':>7} {'wins':>5}")
+        for hedge in (False, True):
+            tool.config['hedge'] = hedge
+            tool_health.reset(tool.name)
+            samples = []
+            for i in range(args.calls):
+                started = time.perf_counter()
+                execute_http_tool(tool, {'q': i})
+                samples.append(time.perf_counter() - started)
+            latency = percentiles(samples)
+            health = tool_health.stats()[tool.name]
+            print(f"{'on' if hedge else 'off':<6} {latency['p50_ms']:>8.1f} {latency['p95_ms']:>8.1f} "
+                  f"{latency['p99_ms']:>8.1f} {health['hedges']:>7} {health['hedge_wins']:>5}")
+
+        server.failing = True
+        tool.config['hedge'] = False
+        tool_health.reset(tool.name)
+        closed, opened = [], []
+        for i in range(20):
+            started = time.perf_counter()
+            execute_http_tool(tool, {'q': i})
+            state = tool_health.stats()[tool.name]['state']
+            (closed if state == 'closed' else opened).append(time.perf_counter() - started)
+        print(f"failing tool: {len(closed)} calls before the breaker opened, p50 "
+              f"{percentiles(closed).get('p50_ms', 0.0):.1f} ms; then {len(opened)} calls, p50 "
+              f"{percentiles(opened).get('p50_ms', 0.0):.3f} ms")
+    finally:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
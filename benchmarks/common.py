@@ -0,0 +1,75 @@
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) in milliseconds."""
+    samples = sorted(samples)
+    if not samples:
+        return {'count': 0}
+
+    def pct(p):
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 3)
+
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3),
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+    }
+
+def timed(fn: Callable[[int], object], iterations: int) -> Dict[str, float]:
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def load(fn: Callable[[int], object], requests: int, concurrency: int) -> Dict:
+    """Call fn(0..requests-1) from `concurrency` threads; latency percentiles plus throughput.
+
+    A call counts as an error if it raises or returns False."""
+    samples = []
+    failures = []
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                ok = fn(i) is not False
+                error = None if ok else 'returned False'
+            except Exception as e:
+                ok, error = False, str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    samples.append(elapsed)
+                else:
+                    failures.append(error)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    result = {
+        **percentiles(samples),
+        'errors': len(failures),
+        'concurrency': concurrency,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(samples) / duration, 2) if duration else 0.0,
+    }
+    if failures:
+        result['first_error'] = failures[0]
+    return result
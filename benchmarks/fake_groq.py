@@ -0,0 +1,205 @@
+"""Local stand-in for the Groq chat-completions API.
+
+    python -m benchmarks.fake_groq --port 8300 --ttft 0.3 --tokens-per-sec 200
+    GROQ_BASE_URL=http://127.0.0.1:8300 GROQ_API_KEY=fake python app.py
+
+Replies are scripted: if `tool_call` is set, the first completion of a
+conversation returns that JSON tool request and the follow-up (after a
+"Tool execution result" message) returns `answer`. Both plain and
+`stream=True` requests are supported. With `requests_per_sec` set, requests
+over the limit in each one-second window get a 429 with Retry-After and
+Groq-style x-ratelimit-* headers."""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_ANSWER = "Dogs have about 300 million olfactory receptors, compared to about 6 million in humans."
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r'\S+\s*|\s+', text) or ['']
+
+class FakeGroqServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, ttft: float = 0.0,
+                 tokens_per_sec: float = 0.0, answer: str = DEFAULT_ANSWER,
+                 tool_call: Optional[Dict] = None,
+                 responder: Optional[Callable[[List[Dict], Dict], str]] = None,
+                 requests_per_sec: float = 0.0):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.answer = answer
+        self.tool_call = tool_call
+        self.responder = responder or self._default_responder
+        self.requests = 0
+        self.requests_per_sec = requests_per_sec
+        self.rejected = 0
+        self._window = (0, 0)  # (second, requests admitted in it)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _default_responder(self, messages: List[Dict], body: Dict) -> str:
+        has_tool_result = any(str(m.get('content', '')).startswith('Tool execution result')
+                              for m in messages)
+        if self.tool_call and not has_tool_result:
+            return json.dumps(self.tool_call)
+        return self.answer
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if not self.path.endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                rejection = server.admit(body)
+                if rejection:
+                    self._send_json(*rejection)
+                    return
+                content = server.responder(body.get('messages', []), body)
+                if body.get('stream'):
+                    self._stream(body, content)
+                else:
+                    if server.ttft:
+                        time.sleep(server.ttft)
+                    if server.tokens_per_sec:
+                        time.sleep(len(_tokenize(content)) / server.tokens_per_sec)
+                    self._send_json(200, server._completion(body, content))
+
+            def _stream(self, body: Dict, content: str):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                if server.ttft:
+                    time.sleep(server.ttft)
+                try:
+                    for token in _tokenize(content):
+                        self._write_chunk(server._chunk(completion_id, body, {'content': token}))
+                        if server.tokens_per_sec:
+                            time.sleep(1 / server.tokens_per_sec)
+                    final = server._chunk(completion_id, body, {}, finish_reason='stop')
+                    final['x_groq'] = {'id': completion_id, 'usage': server._usage(body, content)}
+                    self._write_chunk(final)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client stopped reading the stream
+                self.close_connection = True
+
+            def _write_chunk(self, chunk: Dict):
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+
+        return Handler
+
+    def admit(self, body: Dict):
+        """Hook for subclasses to reject a request; return (status, payload[, headers]) or None."""
+        if not self.requests_per_sec:
+            return None
+        now = time.time()
+        with self._lock:
+            second, count = self._window
+            if int(now) != second:
+                second, count = int(now), 0
+            if count < self.requests_per_sec:
+                self._window = (second, count + 1)
+                return None
+            self.rejected += 1
+        reset = second + 1 - now
+        return (429, {'error': {'message': 'Rate limit reached for requests', 'type': 'requests',
+                                'code': 'rate_limit_exceeded'}},
+                {'retry-after': f"{reset:.3f}", 'x-ratelimit-limit-requests': str(int(self.requests_per_sec)),
+                 'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': f"{reset:.3f}s"})
+
+    @staticmethod
+    def _usage(body: Dict, content: str) -> Dict:
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+        completion_tokens = len(_tokenize(content))
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+    def _completion(self, body: Dict, content: str) -> Dict:
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': self._usage(body, content),
+        }
+
+    @staticmethod
+    def _chunk(completion_id: str, body: Dict, delta: Dict, finish_reason: Optional[str] = None) -> Dict:
+        return {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+
+    def start(self) -> 'FakeGroqServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq chat-completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8300)
+    parser.add_argument('--ttft', type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument('--tokens-per-sec', type=float, default=200)
+    parser.add_argument('--tool-call', help='JSON tool request returned by the first completion')
+    parser.add_argument('--answer', default=DEFAULT_ANSWER)
+    parser.add_argument('--requests-per-sec', type=float, default=0, help='429 above this rate (0 = unlimited)')
+    args = parser.parse_args()
+
+    server = FakeGroqServer(args.host, args.port, args.ttft, args.tokens_per_sec, args.answer,
+                            json.loads(args.tool_call) if args.tool_call else None,
+                            requests_per_sec=args.requests_per_sec)
+    print(f"Fake Groq listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
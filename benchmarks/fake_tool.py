@@ -0,0 +1,101 @@
+"""Local stand-in for an HTTP tool API.
+
+    python -m benchmarks.fake_tool --port 8400 --latency 0.02
+
+Every request gets a JSON body echoing the method, path and query, padded to
+`body_size` bytes. Connections are kept alive (HTTP/1.1)."""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+class FakeToolServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, body_size: int = 0):
+        self.latency = latency
+        self.body_size = body_size
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, handler: BaseHTTPRequestHandler, body: bytes):
+        """Return (status, payload, headers); override to script failures or large bodies."""
+        url = urlsplit(handler.path)
+        payload = {'method': handler.command, 'path': url.path, 'query': parse_qs(url.query)}
+        if body:
+            payload['body'] = body.decode(errors='replace')
+        if self.body_size:
+            payload['padding'] = 'x' * max(0, self.body_size - len(json.dumps(payload)))
+        return 200, payload, {}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                status, payload, headers = server.respond(self, body)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = _handle
+
+        return Handler
+
+    def start(self) -> 'FakeToolServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake HTTP tool server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8400)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds per request")
+    parser.add_argument('--body-size', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeToolServer(args.host, args.port, args.latency, args.body_size)
+    print(f"Fake tool server listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""End-to-end benchmark suite: runs the app in-process against local fake Groq and tool servers.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --scenarios ask_tool log_reads --compare results.json
+
+Scenarios: ask_plain / ask_tool / ask_stream (POST /ask, with and without a
+tool call), recommend_<n> (/recommend_agent with n agents), crud (agent and
+tool create/delete under concurrency) and log_reads (recent logs and /logs
+queries over a large log history). Each reports throughput and
+p50/p95/p99 latency; the JSON report is written to --output (stdout by
+default) and --compare prints the change against an earlier report."""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from benchmarks.common import load
+from benchmarks.fake_groq import DEFAULT_ANSWER, FakeGroqServer
+from benchmarks.fake_tool import FakeToolServer
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTIONS = ["How good is a dog's nose?", "What's the weather in Paris?", "Tell me a joke about cats",
+             "Latest football scores", "Convert 10 USD to EUR", "Find a pasta recipe"]
+TOPICS = ['dog', 'weather', 'joke', 'football', 'currency', 'recipe', 'movie', 'book', 'flight', 'news']
+
+def tool_responder(messages, body):
+    """Pick the first shortlisted agent for /recommend_agent; otherwise ask for the Echo tool
+    when the agent has it, then answer from its result."""
+    system = str(messages[0].get('content', '')) if messages else ''
+    if 'selected_agent' in system:
+        names = re.findall(r'"name": "([^"]+)"', str(messages[-1].get('content', '')))
+        return json.dumps({'selected_agent': names[0] if names else '', 'reason': 'first candidate'})
+    has_result = any(str(m.get('content', '')).startswith('Tool execution result') for m in messages)
+    if 'Echo' in system and not has_result:
+        return json.dumps({'tool': 'Echo', 'params': {'q': 'dogs'}})
+    return DEFAULT_ANSWER
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.groq = FakeGroqServer(ttft=args.groq_ttft, tokens_per_sec=args.groq_tokens_per_sec,
+                                   responder=tool_responder).start()
+        self.tool = FakeToolServer(latency=args.tool_latency, body_size=args.tool_body_size).start()
+
+        # The app reads its configuration and data directory at import time
+        self.workdir = tempfile.mkdtemp(prefix='toolmind_bench_')
+        os.chdir(self.workdir)
+        os.environ.update(GROQ_BASE_URL=self.groq.base_url, GROQ_API_KEY='fake',
+                          STORAGE_BACKEND=args.backend)
+        os.environ.setdefault('RATE_LIMITS', '0')
+        from app import app
+        import routes.agents
+        self.app = app
+        self.storage = routes.agents.storage
+        self._seed()
+
+    def _seed(self):
+        from models import Agent, Tool
+        self.storage.add_tool(Tool(name='Echo', description='Echo the query back', type='http_api', config={
+            'base_url': self.tool.base_url, 'http_method': 'GET', 'endpoint_path': '/echo'}))
+        self.storage.add_agent(Agent(name='Plain', description='Answers from its own knowledge'))
+        self.storage.add_agent(Agent(name='Tooled', description='Answers using the Echo tool', tools=['Echo']))
+
+    def post(self, path, body):
+        response = self.app.test_client().post(path, json=body)
+        response.get_data()
+        return response.status_code < 400
+
+    def ask_plain(self):
+        return load(lambda i: self.post('/ask/Plain', {'question': QUESTIONS[i % len(QUESTIONS)]}),
+                    self.args.requests, self.args.concurrency)
+
+    def ask_tool(self):
+        return load(lambda i: self.post('/ask/Tooled', {'question': QUESTIONS[i % len(QUESTIONS)]}),
+                    self.args.requests, self.args.concurrency)
+
+    def ask_stream(self):
+        return load(lambda i: self.post('/ask/Plain/stream', {'question': QUESTIONS[i % len(QUESTIONS)]}),
+                    self.args.requests, self.args.concurrency)
+
+    def crud(self):
+        client_for = self.app.test_client
+
+        def op(i):
+            client = client_for()
+            ok = client.post('/agents', json={'name': f'crud{i}', 'description': 'temporary agent',
+                                              'tools': ['Echo']}).status_code == 201
+            ok = ok and client.get('/agents').status_code == 200
+            ok = ok and client.delete(f'/agents/crud{i}').status_code == 200
+            if i % 4 == 0:
+                ok = ok and client.post('/tools', json={
+                    'name': f'crudtool{i}', 'description': 'temporary tool', 'type': 'http_api',
+                    'config': {'base_url': self.tool.base_url, 'http_method': 'GET', 'endpoint_path': '/x'}
+                }).status_code == 201
+                ok = ok and client.delete(f'/tools/crudtool{i}').status_code == 200
+            return ok
+
+        return load(op, self.args.requests, self.args.concurrency)
+
+    def log_reads(self):
+        """Seed --logs interaction logs across 20 agents, then read recent logs and query /logs."""
+        start = datetime.now() - timedelta(days=7)
+        logs = []
+        for i in range(self.args.logs):
+            ts = start + timedelta(seconds=i)
+            logs.append({'agent_name': f'logagent{i % 20}', 'timestamp': ts.isoformat(), 'question': f'q{i}',
+                         'response': 'answer', 'tools_used': ['Echo'] if i % 3 == 0 else [], 'debug_log': [
+                             {'timestamp': ts.isoformat(), 'event': 'request_received'},
+                             {'timestamp': (ts + timedelta(milliseconds=250)).isoformat(),
+                              'event': 'groq_response_received'}]})
+        self.storage.backend.import_logs(iter(logs))
+        self.storage.log_analytics.record_many((log['agent_name'], log) for log in logs)
+
+        def read(i):
+            client = self.app.test_client()
+            path = [f'/logs/logagent{i % 20}?limit=10', f'/logs?agent=logagent{i % 20}&limit=100',
+                    '/logs?tool=Echo&limit=100', '/logs/stats'][i % 4]
+            response = client.get(path)
+            response.get_data()
+            return response.status_code == 200
+
+        return load(read, self.args.requests, self.args.concurrency)
+
+    def recommend(self, count):
+        from models import Agent
+        self.storage.save_agents([Agent(name=f'{TOPICS[i % len(TOPICS)].title()}Agent{i}',
+                                        description=f'Answers questions about {TOPICS[i % len(TOPICS)]}')
+                                  for i in range(count)])
+        self.post('/recommend_agent', {'question': 'warm up the index'})
+        return load(lambda i: self.post('/recommend_agent', {'question': QUESTIONS[i % len(QUESTIONS)]}),
+                    self.args.requests, self.args.concurrency)
+
+    def scenarios(self):
+        scenarios = {'ask_plain': self.ask_plain, 'ask_tool': self.ask_tool, 'ask_stream': self.ask_stream,
+                     'crud': self.crud, 'log_reads': self.log_reads}
+        # Recommendation replaces the agent registry, so it runs last
+        for count in self.args.agent_counts:
+            scenarios[f'recommend_{count}'] = lambda count=count: self.recommend(count)
+        return scenarios
+
+    def close(self):
+        self.groq.stop()
+        self.tool.httpd.shutdown()
+        self.storage.backend.close()
+        os.chdir(REPO)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline):
+    print(f"{'scenario':<16} {'rps':>9} {'Δ':>7} {'p50 ms':>9} {'Δ':>7} {'p99 ms':>9} {'Δ':>7}", file=sys.stderr)
+
+    def delta(new, old):
+        return f"{(new - old) / old * 100:+.0f}%" if old else 'n/a'
+
+    for name, result in report['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old or not result.get('count'):
+            continue
+        print(f"{name:<16} {result['throughput_rps']:>9.1f} {delta(result['throughput_rps'], old['throughput_rps']):>7}"
+              f" {result['p50_ms']:>9.1f} {delta(result['p50_ms'], old.get('p50_ms', 0)):>7}"
+              f" {result['p99_ms']:>9.1f} {delta(result['p99_ms'], old.get('p99_ms', 0)):>7}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='+', help='run only these (default: all)')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--backend', default=os.getenv('STORAGE_BACKEND', 'json'), choices=['json', 'sqlite'])
+    parser.add_argument('--agent-counts', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--logs', type=int, default=100000, help='interaction logs seeded for log_reads')
+    parser.add_argument('--groq-ttft', type=float, default=0.05, help='fake Groq seconds to first token')
+    parser.add_argument('--groq-tokens-per-sec', type=float, default=1000)
+    parser.add_argument('--tool-latency', type=float, default=0.01)
+    parser.add_argument('--tool-body-size', type=int, default=2048)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='earlier JSON report to diff against')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    # The app prints diagnostics; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        suite = Suite(args)
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            },
+            'scenarios': {},
+        }
+        try:
+            for name, scenario in suite.scenarios().items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                print(f"running {name}...", file=sys.stderr)
+                started = time.perf_counter()
+                report['scenarios'][name] = scenario()
+                print(f"  {report['scenarios'][name].get('throughput_rps', 0)} req/s, "
+                      f"p50 {report['scenarios'][name].get('p50_ms')} ms ({time.perf_counter() - started:.1f}s)",
+                      file=sys.stderr)
+        finally:
+            suite.close()
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if baseline_path:
+        with open(baseline_path) as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+# gevent lets one worker hold many in-flight conversations (and /ask/<agent>/stream
+# connections) while they wait on Groq and tool APIs. Set GUNICORN_WORKER_CLASS=sync
+# to go back to one request per worker.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# GUNICORN_PRELOAD=1 imports and warms up the app once in the master (see create_app in
+# app.py); forked workers share those pages instead of each repeating the work
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+if preload_app and worker_class == 'gevent':
+    # gevent must patch the stdlib before the app (and its thread pools and locks) is imported
+    from gevent import monkey
+    monkey.patch_all()
+
+# Workers share /metrics through per-worker snapshot files (see utils/metrics.py)
+os.environ.setdefault('METRICS_DIR', os.path.join(os.getenv('TMPDIR', '/tmp'), 'toolmind-metrics'))
+
+def on_starting(server):
+    # Counters restart with the server; drop the previous run's worker snapshots
+    import glob
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], 'worker-*.json')):
+        os.remove(path)
+
+def post_worker_init(worker):
+    # Start the background job pool as soon as a worker is up (after gevent patching), so
+    # queued and interrupted jobs resume without waiting for the worker's first request
+    from routes.jobs import job_runner
+    job_runner.ensure_started()
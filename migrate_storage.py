@@ -0,0 +1,24 @@
+"""One-shot migration between storage backends.
+
+    python migrate_storage.py --from json --to sqlite
+
+Afterwards start the app with STORAGE_BACKEND=sqlite."""
+import argparse
+from storage import BACKENDS, create_backend, migrate
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy agents, tools and logs between storage backends")
+    parser.add_argument('--from', dest='source', default='json', choices=BACKENDS)
+    parser.add_argument('--to', dest='target', default='sqlite', choices=BACKENDS)
+    parser.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    if args.source == args.target:
+        parser.error("--from and --to must differ")
+
+    counts = migrate(create_backend(args.source, args.data_dir), create_backend(args.target, args.data_dir))
+    print(f"Migrated {counts['agents']} agents, {counts['tools']} tools and {counts['logs']} logs "
+          f"from {args.source} to {args.target}")
+
+if __name__ == '__main__':
+    main()
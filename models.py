@@ -2,6 +2,9 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Optional
 from datetime import datetime
 import json
+from utils.tool_response import validate_config
+from utils import tool_health
+from utils.tool_template import CompiledRequest, compile_request
 
 @dataclass
 class Tool:
@@ -27,6 +30,42 @@ class Tool:
             if 'body_template' not in self.config:
                 self.config['body_template'] = ''
 
+    def validate(self):
+        """Check the optional config settings and parse the URL and body templates; raises ValueError.
+
+        Run when a tool is created through the API, not when tools are loaded from
+        storage, so a stored tool that no longer validates only fails its own calls."""
+        if self.type == 'http_api':
+            # Optional response cache settings, see utils/response_cache.py
+            if 'cache' in self.config and not isinstance(self.config['cache'], (dict, type(None))):
+                raise ValueError("'cache' must be an object like {\"ttl\": 60, \"max_entries\": 128}")
+
+            # Whether identical in-flight calls share one request (default: GET/HEAD only)
+            if 'coalesce' in self.config and not isinstance(self.config['coalesce'], bool):
+                raise ValueError("'coalesce' must be true or false")
+
+            # Response size caps and JSON-path extraction, see utils/tool_response.py
+            validate_config(self.config)
+            tool_health.validate_config(self.config)
+
+            # Parse the URL and body templates now so a malformed one is rejected up front
+            self.compiled_request()
+
+    def compiled_request(self) -> CompiledRequest:
+        """The tool's parsed URL and body templates (shared by every Tool with the same templates)."""
+        return compile_request(self.config['base_url'], self.config['endpoint_path'],
+                               self.config.get('body_template') or '')
+
+    @property
+    def required_params(self) -> List[str]:
+        if self.type != 'http_api':
+            return []
+        try:
+            return list(self.compiled_request().required_params)
+        except ValueError:
+            # A stored tool with a malformed template; its calls report the error
+            return []
+
     def to_dict(self):
         return {
             'name': self.name,
@@ -47,6 +86,16 @@ class Agent:
     tools: List[Tool] = field(default_factory=list)
     created_at: datetime = field(default_factory=datetime.now)
     last_active: Optional[datetime] = None
+    answer_cache: Optional[Dict] = None  # e.g. {'ttl': 300, 'max_entries': 256, 'similarity_threshold': 0.9}
+    # Optional fast model for the tool-selection step; the answer still comes from `model`
+    router_model: Optional[str] = None
+    router_max_tokens: int = 256
+
+    def __post_init__(self):
+        if self.answer_cache is not None and not isinstance(self.answer_cache, dict):
+            raise ValueError("'answer_cache' must be an object like {\"ttl\": 300, \"max_entries\": 256}")
+        if not isinstance(self.router_max_tokens, int) or self.router_max_tokens <= 0:
+            raise ValueError("'router_max_tokens' must be a positive integer")
 
     def to_dict(self):
         return {
@@ -57,7 +106,10 @@ class Agent:
             'max_tokens': self.max_tokens,
             'tools': [tool.name if isinstance(tool, Tool) else tool for tool in self.tools],
             'created_at': self.created_at.isoformat(),
-            'last_active': self.last_active.isoformat() if self.last_active else None
+            'last_active': self.last_active.isoformat() if self.last_active else None,
+            'answer_cache': self.answer_cache,
+            'router_model': self.router_model,
+            'router_max_tokens': self.router_max_tokens
         }
 
     @classmethod
@@ -70,5 +122,8 @@ class Agent:
             max_tokens=int(data.get('max_tokens', 1024)),
             tools=data.get('tools', []),  # This will be a list of tool names
             created_at=datetime.fromisoformat(data['created_at']) if 'created_at' in data else datetime.now(),
-            last_active=datetime.fromisoformat(data['last_active']) if data.get('last_active') else None
+            last_active=datetime.fromisoformat(data['last_active']) if data.get('last_active') else None,
+            answer_cache=data.get('answer_cache'),
+            router_model=data.get('router_model'),
+            router_max_tokens=int(data.get('router_max_tokens', 256))
         ) 
\ No newline at end of file
@@ -1,21 +1,59 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from models import Agent
-from storage import Storage
+from storage import get_storage
+from utils.agent_engine import AgentEngine
+from utils.sessions import session_store
+from utils.prompt_cache import prompt_cache
+from utils.agent_index import agent_index, confident_pick
+from utils.answer_cache import answer_cache
+from utils.rate_limit import RateLimitExceeded
+from utils.batch import BATCH_DEFAULT_DEADLINE, BATCH_MAX_ITEMS, run_batch
+from utils.listing import listing_response
 from datetime import datetime
 import json
-from groq import Groq
+import time
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 agents_bp = Blueprint('agents', __name__)
-storage = Storage()
-client = Groq()
+storage = get_storage()
+# The Groq client (and SDK import) is created on first use, or by the startup warm-up
+engine = AgentEngine(storage)
+
+# /recommend_agent answers from the local index when the best match is this far ahead
+RECOMMEND_SHORTLIST = int(os.getenv('RECOMMEND_SHORTLIST', '5'))
+RECOMMEND_MIN_SCORE = float(os.getenv('RECOMMEND_MIN_SCORE', '0.5'))
+RECOMMEND_CONFIDENCE_RATIO = float(os.getenv('RECOMMEND_CONFIDENCE_RATIO', '1.5'))
+# Picking an agent from a shortlist only needs a short JSON answer
+RECOMMEND_MODEL = os.getenv('RECOMMEND_MODEL', 'meta-llama/llama-4-scout-17b-16e-instruct')
+RECOMMEND_MAX_TOKENS = int(os.getenv('RECOMMEND_MAX_TOKENS', '256'))
+
+AGENT_FIELDS = ('name', 'description', 'model', 'temperature', 'max_tokens', 'tools', 'created_at',
+                'last_active', 'answer_cache', 'router_model', 'router_max_tokens')
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def request_session(data):
+    """The session a question belongs to: the one named by `session_id`, or a new one when the
+    client asks for it with "session": true. One-shot questions get none, so they don't take
+    room in the session store from real conversations."""
+    if data.get('session_id') or data.get('session'):
+        return session_store.get_or_create(data.get('session_id'))
+    return None
+
+def rate_limited(e: RateLimitExceeded):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(max(1, round(e.retry_after)))
+    return response, 503
 
 @agents_bp.route('/agents', methods=['GET'])
 def list_agents():
-    agents = storage.load_agents()
-    return jsonify([agent.to_dict() for agent in agents])
+    """Agents sorted by name. Optional: limit and cursor (see X-Next-Cursor), prefix, and
+    fields=a,b to return only some fields. Send If-None-Match to get 304 when nothing changed."""
+    return listing_response('agents', storage.agents_version(),
+                            lambda: [agent.to_dict() for agent in storage.load_agents()], AGENT_FIELDS)
 
 @agents_bp.route('/agents', methods=['POST'])
 def create_agent():
@@ -33,28 +71,35 @@ def create_agent():
         else:
             return jsonify({'error': f'Tool not found: {tool_name}'}), 404
 
-    agent = Agent(
-        name=data['name'],
-        description=data['description'],
-        model=data.get('model', 'meta-llama/llama-4-scout-17b-16e-instruct'),
-        temperature=float(data.get('temperature', 0.7)),
-        max_tokens=int(data.get('max_tokens', 1024)),
-        tools=tool_names  # Store tool names instead of Tool objects
-    )
+    try:
+        agent = Agent(
+            name=data['name'],
+            description=data['description'],
+            model=data.get('model', 'meta-llama/llama-4-scout-17b-16e-instruct'),
+            temperature=float(data.get('temperature', 0.7)),
+            max_tokens=int(data.get('max_tokens', 1024)),
+            tools=tool_names,  # Store tool names instead of Tool objects
+            answer_cache=data.get('answer_cache'),
+            router_model=data.get('router_model') or None,
+            router_max_tokens=int(data.get('router_max_tokens', 256))
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    agents = storage.load_agents()
-    agents.append(agent)
-    storage.save_agents(agents)
+    storage.add_agent(agent)
+    prompt_cache.invalidate_agent(agent.name)
+    agent_index.add_agent(agent, tools)
+    answer_cache.invalidate_agent(agent.name)
 
     return jsonify(agent.to_dict()), 201
 
 @agents_bp.route('/agents/<agent_name>', methods=['DELETE'])
 def delete_agent(agent_name):
     try:
-        agents = storage.load_agents()
-        # Find and remove the agent
-        agents = [agent for agent in agents if agent.name != agent_name]
-        storage.save_agents(agents)
+        storage.delete_agent(agent_name)
+        prompt_cache.invalidate_agent(agent_name)
+        agent_index.remove_agent(agent_name)
+        answer_cache.invalidate_agent(agent_name)
         return jsonify({'message': f'Agent {agent_name} deleted successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -73,195 +118,105 @@ def ask_agent(agent_name):
         if not question:
             return jsonify({'error': 'No question provided'}), 400
 
-        debug_log = []
-        tools_used = []  # Track tools used in this interaction
+        # Conversations continue server-side when the client sends back its session_id
+        session = request_session(data)
 
-        debug_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'request_received',
-            'question': question
-        })
+        return jsonify(engine.ask(agent, question, session=session))
 
-        # Update agent's last active timestamp
-        agent.last_active = datetime.now()
-        agents = storage.load_agents()
-        for i, a in enumerate(agents):
-            if a.name == agent_name:
-                agents[i] = agent
-                break
-        storage.save_agents(agents)
-
-        # Get available tools for the agent
-        available_tools = []
-        for tool_name in agent.tools:
-            tool = storage.get_tool(tool_name)
-            if tool:
-                available_tools.append(tool)
-
-        debug_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'tools_loaded',
-            'available_tools': [tool.name for tool in available_tools]
-        })
+    except RateLimitExceeded as e:
+        return rate_limited(e)
+    except Exception as e:
+        print(f"Error in /ask endpoint: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
-        # Create a system message that includes tool information
-        system_message = f"""You are an AI assistant with access to the following tools:
-{json.dumps([{'name': tool.name, 'description': tool.description} for tool in available_tools], indent=2)}
-
-Always prioritize using a tool before trying to answer the question yourself. When you need to use a tool, respond with ONLY a JSON object in this format. You can also return parameters like param1 and param2, they can be called something else as per the tool's description:
-{{
-    "tool": "tool_name",
-    "params": {{
-        "param1": "value1",
-        "param2": "value2"
-    }}
-}}
-
-Otherwise, respond normally to the user's question."""
-
-        debug_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'groq_api_call',
-            'model': agent.model,
-            'temperature': agent.temperature,
-            'max_tokens': agent.max_tokens
-        })
+@agents_bp.route('/ask/<agent_name>/stream', methods=['POST'])
+def ask_agent_stream(agent_name):
+    """Streaming variant of /ask: forwards Groq tokens and debug_log entries as server-sent events.
 
-        # Get response from Groq
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": question
-                }
-            ],
-            model=agent.model,
-            temperature=agent.temperature,
-            max_tokens=agent.max_tokens,
-        )
+    Events: `debug` (one debug_log entry), `token` ({"text": ...}), `done` (final
+    response and tools_used) and `error`. Run under an async worker (gevent, see
+    gunicorn.conf.py) so a worker can hold many open streams."""
+    agent = storage.get_agent(agent_name)
+    if not agent:
+        return jsonify({'error': f'Agent {agent_name} not found'}), 404
 
-        response = chat_completion.choices[0].message.content
+    data = request.get_json() or {}
+    question = data.get('question')
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
 
-        debug_log.append({
-            'timestamp': datetime.now().isoformat(),
-            'event': 'groq_response_received',
-            'response': response
-        })
+    session = request_session(data)
 
-        # Check if the response is a tool usage request
+    def generate():
+        started = time.perf_counter()
+        first_token_sent = False
         try:
-            tool_request = json.loads(response)
-            if isinstance(tool_request, dict) and 'tool' in tool_request and 'params' in tool_request:
-                debug_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'event': 'tool_request_detected',
-                    'tool_request': tool_request
-                })
-
-                # Find the requested tool
-                tool_name = tool_request['tool']
-                tool = next((t for t in available_tools if t.name == tool_name), None)
-                
-                if tool:
-                    tools_used.append(tool_name)  # Add tool to used tools list
-                    
-                    debug_log.append({
-                        'timestamp': datetime.now().isoformat(),
-                        'event': 'tool_execution_started',
-                        'tool': tool_name,
-                        'params': tool_request['params']
-                    })
-
-                    # Execute the tool
-                    from utils.tool_executor import execute_http_tool  # Import from new location
-                    tool_result, tool_debug = execute_http_tool(tool, tool_request['params'])
-                    
-                    debug_log.append({
-                        'timestamp': datetime.now().isoformat(),
-                        'event': 'tool_execution_completed',
-                        'tool': tool_name,
-                        'result': tool_result,
-                        'debug_info': tool_debug
-                    })
-
-                    debug_log.append({
-                        'timestamp': datetime.now().isoformat(),
-                        'event': 'groq_api_call',
-                        'model': agent.model,
-                        'temperature': agent.temperature,
-                        'max_tokens': agent.max_tokens,
-                        'context': 'tool_result_interpretation'
-                    })
-
-                    final_response = client.chat.completions.create(
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": system_message
-                            },
-                            {
-                                "role": "user",
-                                "content": question
-                            },
-                            {
-                                "role": "assistant",
-                                "content": response
-                            },
-                            {
-                                "role": "user",
-                                "content": f"Tool execution result: {tool_result}"
-                            }
-                        ],
-                        model=agent.model,
-                        temperature=agent.temperature,
-                        max_tokens=agent.max_tokens,
-                    )
-                    response = final_response.choices[0].message.content
-
-                    debug_log.append({
+            for kind, payload in engine.iter_ask(agent, question, stream=True, session=session):
+                if kind == 'token' and not first_token_sent:
+                    first_token_sent = True
+                    yield sse_event('debug', {
                         'timestamp': datetime.now().isoformat(),
-                        'event': 'groq_response_received',
-                        'response': response,
-                        'context': 'tool_result_interpretation'
+                        'event': 'first_token',
+                        'time_to_first_token_ms': round((time.perf_counter() - started) * 1000, 1)
                     })
-                else:
-                    response = f"Error: Tool '{tool_name}' not found or not available to this agent."
-                    debug_log.append({
-                        'timestamp': datetime.now().isoformat(),
-                        'event': 'tool_not_found',
-                        'tool': tool_name
-                    })
-        except json.JSONDecodeError:
-            # Response is not a tool usage request, use it as is
-            debug_log.append({
-                'timestamp': datetime.now().isoformat(),
-                'event': 'no_tool_request',
-                'response': response
-            })
+                if kind == 'token':
+                    yield sse_event('token', {'text': payload})
+                elif kind == 'debug':
+                    yield sse_event('debug', payload)
+                elif kind == 'done':
+                    yield sse_event('done', {'response': payload['response'], 'tools_used': payload['tools_used'],
+                                             'session_id': payload.get('session_id')})
+        except Exception as e:
+            print(f"Error in /ask stream endpoint: {str(e)}")
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@agents_bp.route('/batch/ask', methods=['POST'])
+def ask_batch():
+    """Answer many (agent, question) items, streaming one NDJSON line per item as each finishes.
+
+    Body: {"items": [{"agent": ..., "question": ..., "id": optional}], "concurrency": 4,
+    "deadline": seconds}. Each line carries the item's index and id, plus either the
+    response, tools_used and debug_log, or an error."""
+    data = request.get_json() or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No items provided'}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {BATCH_MAX_ITEMS} items per batch'}), 400
+    try:
+        concurrency = int(data.get('concurrency', 4))
+        deadline = float(data.get('deadline', BATCH_DEFAULT_DEADLINE))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Resolve each agent once for the whole batch
+    agents = {}
+    for item in items:
+        name = item.get('agent') if isinstance(item, dict) else None
+        if name and name not in agents:
+            agents[name] = storage.get_agent(name)
+
+    def run_item(item):
+        if not isinstance(item, dict) or not item.get('question'):
+            raise ValueError('Each item needs an agent and a question')
+        agent = agents.get(item.get('agent'))
+        if not agent:
+            raise ValueError(f"Agent {item.get('agent')} not found")
+        # Batch items share the fair queues under their own owner, so a batch can't crowd out /ask
+        return engine.ask(agent, item['question'], owner=f"batch:{agent.name}")
 
-        # Save the interaction log
-        log_data = {
-            'agent_name': agent_name,
-            'question': question,
-            'response': response,
-            'tools_used': tools_used,
-            'debug_log': debug_log
-        }
-        storage.save_interaction_log(agent_name, log_data)
+    def generate():
+        for result in run_batch(items, run_item, concurrency, deadline):
+            item = items[result['index']]
+            if isinstance(item, dict):
+                result['id'] = item.get('id')
+                result['agent'] = item.get('agent')
+            yield json.dumps(result) + '\n'
 
-        return jsonify({
-            'response': response,
-            'tools_used': tools_used,
-            'debug_log': debug_log
-        })
-
-    except Exception as e:
-        print(f"Error in /ask endpoint: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @agents_bp.route('/recommend_agent', methods=['POST'])
 def recommend_agent():
@@ -272,12 +227,28 @@ def recommend_agent():
         if not question:
             return jsonify({'error': 'No question provided'}), 400
 
-        # Get all agents
-        agents = storage.load_agents()
-        
-        if not agents:
+        # Rank agents locally first; only ambiguous questions go to the LLM
+        agent_index.sync(storage)
+        if not len(agent_index):
             return jsonify({'error': 'No agents available'}), 404
 
+        if len(agent_index) == 1:
+            agent = storage.load_agents()[0]
+            return jsonify({'agent': agent.name, 'reason': 'Only one agent is available'})
+
+        ranked = agent_index.search(question, k=RECOMMEND_SHORTLIST)
+        picked = confident_pick(ranked, RECOMMEND_MIN_SCORE, RECOMMEND_CONFIDENCE_RATIO)
+        if picked:
+            return jsonify({
+                'agent': picked,
+                'reason': f"Best keyword match for the question (score {ranked[0][1]:.2f})"
+            })
+
+        # Shortlist the top matches for the LLM (or the first few agents if nothing matched)
+        agents = [agent for agent in (storage.get_agent(name) for name, _ in ranked) if agent]
+        if not agents:
+            agents = storage.load_agents()[:RECOMMEND_SHORTLIST]
+
         # Create a system message for agent selection
         system_message = """You are an AI assistant that helps select the most appropriate agent for a given question.
 You will be given a list of available agents and their capabilities.
@@ -304,22 +275,19 @@ Question: {question}
 
 Which agent would be most suitable for this question? Respond with a JSON object only."""
 
-        # Get recommendation from Groq
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": system_message
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            temperature=0.3,
-            max_tokens=1024,
-        )
+        # Get recommendation from Groq (through the same rate limiter as agent calls)
+        recommender = Agent(name='recommend_agent', description='Agent recommendation',
+                            model=RECOMMEND_MODEL, temperature=0.3, max_tokens=RECOMMEND_MAX_TOKENS)
+        chat_completion = engine.create_completion(recommender, [
+            {
+                "role": "system",
+                "content": system_message
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ], stream=False)
 
         response_text = chat_completion.choices[0].message.content.strip()
         
@@ -368,6 +336,8 @@ Which agent would be most suitable for this question? Respond with a JSON object
             'reason': recommendation.get('reason', 'No reason provided')
         })
 
+    except RateLimitExceeded as e:
+        return rate_limited(e)
     except Exception as e:
         print(f"Error in /recommend_agent endpoint: {str(e)}")
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
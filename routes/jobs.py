@@ -0,0 +1,101 @@
+from flask import Blueprint, request, jsonify
+import os
+from storage import get_storage
+from routes.agents import engine
+from utils.sessions import session_store
+from utils.jobs import FINISHED, JobCancelled, JobQueue, JobRunner, QueueFull
+
+jobs_bp = Blueprint('jobs', __name__)
+storage = get_storage()
+
+# Longest a GET /jobs/<id>?wait= long-poll may hold the connection
+JOB_MAX_WAIT = float(os.getenv('JOB_MAX_WAIT', '60'))
+
+def run_job(job, check_cancelled):
+    agent = storage.get_agent(job['agent'])
+    if not agent:
+        raise ValueError(f"Agent {job['agent']} not found")
+    session = session_store.get_or_create(job['session_id']) if job['session_id'] else None
+    steps = engine.iter_ask(agent, job['question'], session=session)
+    try:
+        for kind, payload in steps:
+            if kind == 'done':
+                return payload
+            check_cancelled()
+    except JobCancelled:
+        steps.close()
+        raise
+
+job_queue = JobQueue(os.path.join(storage.data_dir, 'jobs.db'))
+job_runner = JobRunner(job_queue, run_job)
+
+@jobs_bp.before_app_request
+def start_job_runner():
+    # Cheap after the first request; starts this process's pool after a fork (gunicorn --preload)
+    job_runner.ensure_started()
+
+@jobs_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a question for an agent and return at once with the job id (202).
+
+    Body: {"agent": ..., "question": ..., "priority": 0, "session_id": optional}.
+    Higher priorities run first. Poll GET /jobs/<job_id> for the result."""
+    data = request.get_json() or {}
+    agent_name = data.get('agent')
+    question = data.get('question')
+    if not agent_name or not question:
+        return jsonify({'error': 'An agent and a question are required'}), 400
+    if not storage.get_agent(agent_name):
+        return jsonify({'error': f'Agent {agent_name} not found'}), 404
+    try:
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': "'priority' must be an integer"}), 400
+
+    try:
+        job = job_queue.submit(agent_name, question, session_id=data.get('session_id'), priority=priority)
+    except QueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    job_runner.ensure_started()
+    job_runner.notify()
+
+    response = jsonify(job)
+    response.headers['Location'] = f"/jobs/{job['job_id']}"
+    return response, 202
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Most recent jobs (without results). Filters: status, agent, limit."""
+    try:
+        limit = min(int(request.args.get('limit', 100)), 1000)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(job_queue.list(status=request.args.get('status'), agent=request.args.get('agent'),
+                                  limit=limit))
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """A job's status, and its result (response, tools_used, debug_log) once it succeeded.
+
+    With ?wait=seconds the request is held until the job finishes or the wait is over."""
+    try:
+        wait = min(float(request.args.get('wait', 0)), JOB_MAX_WAIT)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    job = job_runner.wait(job_id, wait) if wait > 0 else job_queue.get(job_id)
+    if not job:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    response = jsonify(job)
+    if job['status'] not in FINISHED:
+        response.headers['Retry-After'] = '1'
+    return response
+
+@jobs_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job: queued jobs never start; running jobs stop before their next step."""
+    job = job_queue.cancel(job_id)
+    if not job:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify(job)
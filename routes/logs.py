@@ -0,0 +1,74 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime
+import json
+from storage import get_storage
+
+logs_bp = Blueprint('logs', __name__)
+storage = get_storage()
+
+MAX_PAGE_SIZE = 10000
+
+def _time_arg(name):
+    """Accept ISO-8601 or epoch seconds."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def _limit_arg(default: int, maximum: int) -> int:
+    """The `limit` query argument, capped at `maximum`; ValueError unless it is a positive integer."""
+    limit = int(request.args.get('limit', default))
+    if limit < 1:
+        raise ValueError("'limit' must be a positive integer")
+    return min(limit, maximum)
+
+def _filters():
+    error = request.args.get('error')
+    return {
+        'agent': request.args.get('agent'),
+        'tool': request.args.get('tool'),
+        'since': _time_arg('since'),
+        'until': _time_arg('until'),
+        'error': None if error is None else error.lower() in ('1', 'true', 'yes'),
+    }
+
+@logs_bp.route('/logs', methods=['GET'])
+def query_logs():
+    """Interaction summaries as NDJSON, newest first.
+
+    Filters: agent, tool, since, until, error. Page with `limit` and pass the
+    last line's `id` as `cursor` to fetch the next page."""
+    try:
+        filters = _filters()
+        limit = _limit_arg(100, MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        for row in storage.log_analytics.query(cursor=cursor, limit=limit, **filters):
+            yield json.dumps(row) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@logs_bp.route('/logs/stats', methods=['GET'])
+def log_stats():
+    """Per-stage latency percentiles, tool usage and error rates for the matching logs."""
+    try:
+        filters = _filters()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(storage.log_analytics.stats(**filters))
+
+@logs_bp.route('/logs/<agent_name>', methods=['GET'])
+def agent_logs(agent_name):
+    """Full debug logs of an agent's most recent interactions."""
+    try:
+        limit = _limit_arg(10, 100)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(storage.get_agent_logs(agent_name, limit))
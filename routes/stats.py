@@ -0,0 +1,34 @@
+from flask import Blueprint, Response, jsonify
+from utils.http_pool import http_pool
+from utils.response_cache import tool_response_cache
+from utils.sessions import session_store
+from utils.prompt_cache import prompt_cache
+from utils.answer_cache import answer_cache
+from utils.metrics import metrics
+from utils.single_flight import tool_flights, completion_flights
+from utils.rate_limit import rate_limits
+from utils.listing import listing_cache
+from utils.tool_health import tool_health
+from routes.jobs import job_runner
+
+stats_bp = Blueprint('stats', __name__)
+
+@stats_bp.route('/stats', methods=['GET'])
+def get_stats():
+    return jsonify({
+        'http_pool': http_pool.stats(),
+        'tool_cache': tool_response_cache.stats(),
+        'sessions': session_store.stats(),
+        'prompt_cache': prompt_cache.stats(),
+        'answer_cache': answer_cache.stats(),
+        'listing_cache': listing_cache.stats(),
+        'coalescing': {'tool': tool_flights.stats(), 'completion': completion_flights.stats()},
+        'rate_limits': rate_limits.stats(),
+        'tool_health': tool_health.stats(),
+        'jobs': job_runner.stats()
+    })
+
+@stats_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Latency histograms and counters in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,23 +1,42 @@
 from flask import Blueprint, request, jsonify
 from models import Tool
-from storage import Storage
+from storage import get_storage
+from utils.response_cache import tool_response_cache
+from utils.prompt_cache import prompt_cache
+from utils.agent_index import agent_index
+from utils.listing import listing_response
+from utils.tool_health import tool_health
 
 tools_bp = Blueprint('tools', __name__)
-storage = Storage()
+storage = get_storage()
+
+TOOL_FIELDS = ('name', 'description', 'type', 'config', 'created_at', 'last_used', 'required_params')
 
 @tools_bp.route('/tools', methods=['GET'])
 def list_tools():
-    tools = storage.load_tools()
-    return jsonify([vars(tool) for tool in tools])
+    """Tools sorted by name, with the same limit/cursor/prefix/fields options and ETag as /agents."""
+    return listing_response('tools', storage.tools_version(),
+                            lambda: [{**vars(tool), 'required_params': tool.required_params}
+                                     for tool in storage.load_tools()], TOOL_FIELDS)
 
 @tools_bp.route('/tools', methods=['POST'])
 def create_tool():
     data = request.json
-    tool = Tool(**data)
-    tools = storage.load_tools()
-    tools.append(tool)
-    storage.save_tools(tools)
-    return jsonify(vars(tool)), 201
+    try:
+        tool = Tool(**data)
+        tool.validate()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    storage.add_tool(tool)
+    tool_response_cache.invalidate(tool.name)
+    prompt_cache.invalidate_tool(tool.name)
+    tool_health.reset(tool.name)
+    # A replaced tool's description feeds the index of every agent using it
+    for agent_name in agent_index.agents_using_tool(tool.name):
+        agent = storage.get_agent(agent_name)
+        if agent:
+            agent_index.add_agent(agent, storage.get_tools(agent.tools))
+    return jsonify({**vars(tool), 'required_params': tool.required_params}), 201
 
 @tools_bp.route('/tools/<tool_name>', methods=['DELETE'])
 def delete_tool(tool_name):
@@ -32,9 +51,10 @@ def delete_tool(tool_name):
             }), 400
 
         # If no agents are using the tool, proceed with deletion
-        tools = storage.load_tools()
-        tools = [tool for tool in tools if tool.name != tool_name]
-        storage.save_tools(tools)
+        storage.delete_tool(tool_name)
+        tool_response_cache.invalidate(tool_name)
+        prompt_cache.invalidate_tool(tool_name)
+        tool_health.reset(tool_name)
         return jsonify({'message': f'Tool {tool_name} deleted successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -1,122 +1,116 @@
-import json
 import os
+import threading
 from typing import List, Dict, Optional
 from datetime import datetime
 from models import Agent, Tool
+from backends.base import DateTimeEncoder, StorageBackend
+from backends.json_backend import JSONBackend
+from backends.sqlite_backend import SQLiteBackend
+from utils.log_analytics import LogAnalytics
 
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+BACKENDS = {
+    'json': JSONBackend,
+    'sqlite': SQLiteBackend,
+}
+
+def create_backend(name: str, data_dir: str = "data") -> StorageBackend:
+    try:
+        return BACKENDS[name](data_dir)
+    except KeyError:
+        raise ValueError(f"Unknown storage backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
 
 class Storage:
-    def __init__(self, data_dir: str = "data"):
+    """Facade over a pluggable storage backend.
+
+    The backend is chosen with the STORAGE_BACKEND environment variable
+    ('json' by default, or 'sqlite')."""
+
+    def __init__(self, data_dir: str = "data", backend: Optional[StorageBackend] = None):
         self.data_dir = data_dir
-        self.agents_file = os.path.join(data_dir, "agents.json")
-        self.tools_file = os.path.join(data_dir, "tools.json")
-        self.logs_dir = os.path.join(data_dir, "logs")
-        self._ensure_data_dir()
-        self._initialize_files()
-
-    def _ensure_data_dir(self):
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-        if not os.path.exists(self.logs_dir):
-            os.makedirs(self.logs_dir)
-
-    def _initialize_files(self):
-        # Initialize agents file if it doesn't exist
-        if not os.path.exists(self.agents_file):
-            with open(self.agents_file, 'w') as f:
-                json.dump([], f)
-
-        # Initialize tools file if it doesn't exist
-        if not os.path.exists(self.tools_file):
-            with open(self.tools_file, 'w') as f:
-                json.dump([], f)
+        self.backend = backend or create_backend(os.getenv('STORAGE_BACKEND', 'json'), data_dir)
+        # Queryable summaries of every interaction, kept alongside whichever backend holds the logs
+        self.log_analytics = LogAnalytics(os.path.join(data_dir, 'log_analytics.db'),
+                                          queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
 
     def save_agents(self, agents: List[Agent]):
-        data = [agent.to_dict() for agent in agents]
-        with open(self.agents_file, 'w') as f:
-            json.dump(data, f, indent=2, cls=DateTimeEncoder)
+        self.backend.save_agents(agents)
 
     def load_agents(self) -> List[Agent]:
-        try:
-            if not os.path.exists(self.agents_file):
-                return []
-            with open(self.agents_file, 'r') as f:
-                data = json.load(f)
-            return [Agent.from_dict(agent_data) for agent_data in data]
-        except json.JSONDecodeError:
-            # If file is corrupted, reinitialize it
-            self._initialize_files()
-            return []
+        return self.backend.load_agents()
 
     def save_tools(self, tools: List[Tool]):
-        data = [vars(tool) for tool in tools]
-        with open(self.tools_file, 'w') as f:
-            json.dump(data, f, indent=2, cls=DateTimeEncoder)
+        self.backend.save_tools(tools)
 
     def load_tools(self) -> List[Tool]:
-        try:
-            if not os.path.exists(self.tools_file):
-                return []
-            with open(self.tools_file, 'r') as f:
-                data = json.load(f)
-            return [Tool(**tool_data) for tool_data in data]
-        except json.JSONDecodeError:
-            # If file is corrupted, reinitialize it
-            self._initialize_files()
-            return []
+        return self.backend.load_tools()
 
     def get_agent(self, name: str) -> Optional[Agent]:
-        agents = self.load_agents()
-        for agent in agents:
-            if agent.name == name:
-                return agent
-        return None
+        return self.backend.get_agent(name)
 
     def get_tool(self, name: str) -> Optional[Tool]:
-        tools = self.load_tools()
-        for tool in tools:
-            if tool.name == name:
-                return tool
-        return None
+        return self.backend.get_tool(name)
+
+    def get_tools(self, names: List[str]) -> List[Tool]:
+        """Resolve tool names in order, skipping any that no longer exist."""
+        return self.backend.get_tools(names)
+
+    def add_agent(self, agent: Agent):
+        self.backend.upsert_agent(agent)
+
+    def delete_agent(self, name: str) -> bool:
+        return self.backend.delete_agent(name)
+
+    def touch_agent(self, name: str, when: Optional[datetime] = None):
+        """Bump an agent's last_active timestamp."""
+        self.backend.touch_agent(name, when or datetime.now())
+
+    def add_tool(self, tool: Tool):
+        self.backend.upsert_tool(tool)
+
+    def delete_tool(self, name: str) -> bool:
+        return self.backend.delete_tool(name)
+
+    def agents_version(self) -> str:
+        return self.backend.agents_version()
+
+    def tools_version(self) -> str:
+        return self.backend.tools_version()
 
     def save_interaction_log(self, agent_name: str, log_data: Dict):
         """Save an interaction log for an agent."""
-        # Create a timestamp-based filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{agent_name}_{timestamp}.json"
-        filepath = os.path.join(self.logs_dir, filename)
-        
-        # Add timestamp to log data
-        log_data['timestamp'] = datetime.now().isoformat()
-        
-        # Save the log
-        with open(filepath, 'w') as f:
-            json.dump(log_data, f, indent=2, cls=DateTimeEncoder)
+        self.backend.save_interaction_log(agent_name, log_data)
+        try:
+            self.log_analytics.record(agent_name, log_data)
+        except Exception as e:
+            print(f"Error indexing interaction log: {str(e)}")
 
     def get_agent_logs(self, agent_name: str, limit: int = 10) -> List[Dict]:
         """Get the most recent interaction logs for an agent."""
-        logs = []
-        try:
-            # Get all log files for this agent
-            log_files = [f for f in os.listdir(self.logs_dir) 
-                        if f.startswith(f"{agent_name}_") and f.endswith('.json')]
-            
-            # Sort by timestamp (newest first)
-            log_files.sort(reverse=True)
-            
-            # Load the most recent logs
-            for filename in log_files[:limit]:
-                filepath = os.path.join(self.logs_dir, filename)
-                with open(filepath, 'r') as f:
-                    log_data = json.load(f)
-                    logs.append(log_data)
-                    
-        except Exception as e:
-            print(f"Error loading logs: {str(e)}")
-            
-        return logs 
\ No newline at end of file
+        return self.backend.get_agent_logs(agent_name, limit)
+
+_shared: Optional[Storage] = None
+_shared_lock = threading.Lock()
+
+def get_storage() -> Storage:
+    """The Storage shared by every blueprint in this process, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Storage()
+        return _shared
+
+def migrate(source: StorageBackend, target: StorageBackend) -> Dict[str, int]:
+    """Copy every agent, tool and interaction log from one backend into another."""
+    agents = source.load_agents()
+    tools = source.load_tools()
+    target.save_tools(tools)
+    target.save_agents(agents)
+
+    counter = {'logs': 0}
+    def counted(logs):
+        for log in logs:
+            counter['logs'] += 1
+            yield log
+    target.import_logs(counted(source.iter_logs()))
+
+    return {'agents': len(agents), 'tools': len(tools), 'logs': counter['logs']}
@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+from types import SimpleNamespace
+
+# Tests import the app's modules the same way app.py does, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def client(tmp_path_factory):
+    """A test client for the whole app, with its shared storage in a temporary directory.
+
+    The blueprints bind the shared storage when they are imported, so one app serves
+    every test in the session; tests use their own agent and tool names."""
+    import storage
+    storage._shared = storage.Storage(str(tmp_path_factory.mktemp('data')))
+    os.environ.setdefault('GROQ_API_KEY', 'test')
+    os.environ['WARM_UP'] = '0'
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
+
+class ScriptedGroq:
+    """Stands in for the Groq client: completion n answers with replies[n] (the last reply
+    repeats), whole or one chunk per list item when streamed. `calls` keeps each request."""
+
+    def __init__(self, *replies):
+        create = SimpleNamespace(create=self.create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=create))
+        self.script(*replies)
+
+    def script(self, *replies):
+        self.replies = list(replies) or ['An answer']
+        self.calls = []
+
+    def create(self, stream, **kwargs):
+        reply = self.replies[min(len(self.calls), len(self.replies) - 1)]
+        self.calls.append(kwargs)
+        chunks = reply if isinstance(reply, list) else [reply]
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5)
+        if stream:
+            result = _Stream([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))],
+                                              x_groq=None) for text in chunks])
+            result.append(SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=usage)))
+        else:
+            message = SimpleNamespace(content=''.join(chunks))
+            result = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        return SimpleNamespace(status_code=200, headers={}, parse=lambda: result)
+
+class _Stream(list):
+    def close(self):
+        pass
+
+@pytest.fixture
+def groq(client, monkeypatch):
+    """Answer the app's completions with a ScriptedGroq; call groq.script(*replies) to set replies."""
+    from routes.agents import engine
+    fake = ScriptedGroq()
+    monkeypatch.setattr(engine, '_client', fake)
+    return fake
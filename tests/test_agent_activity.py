@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+import pytest
+from backends import json_backend
+from backends.json_backend import JSONBackend
+from backends.sqlite_backend import SQLiteBackend
+from models import Agent
+
+@pytest.fixture(params=['json', 'sqlite'])
+def backend(request, tmp_path):
+    return JSONBackend(str(tmp_path)) if request.param == 'json' else SQLiteBackend(str(tmp_path))
+
+def test_touch_agent_keeps_the_registry_version(backend):
+    backend.upsert_agent(Agent(name='A', description='a'))
+    version = backend.agents_version()
+    when = datetime(2026, 1, 2, 3, 4, 5)
+    backend.touch_agent('A', when)
+    assert backend.get_agent('A').last_active == when
+    assert backend.agents_version() == version
+    backend.upsert_agent(Agent(name='A', description='changed'))
+    assert backend.agents_version() != version
+
+def test_json_touch_does_not_rewrite_agents_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(json_backend, 'ACTIVITY_FLUSH_INTERVAL', 0)
+    backend = JSONBackend(str(tmp_path))
+    backend.upsert_agent(Agent(name='A', description='a'))
+    before = (tmp_path / 'agents.json').read_bytes()
+    when = datetime(2026, 1, 2, 3, 4, 5)
+    backend.touch_agent('A', when)
+    assert (tmp_path / 'agents.json').read_bytes() == before
+    # Another process (a fresh backend on the same directory) sees the flushed activity
+    assert JSONBackend(str(tmp_path)).get_agent('A').last_active == when
+    # An older touch from another worker never moves last_active back
+    other = JSONBackend(str(tmp_path))
+    other.touch_agent('A', when - timedelta(hours=1))
+    assert JSONBackend(str(tmp_path)).get_agent('A').last_active == when
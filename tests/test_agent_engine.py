@@ -0,0 +1,160 @@
+import time
+from types import SimpleNamespace
+import pytest
+from models import Agent, Tool
+from storage import Storage
+from utils import agent_engine
+from utils.agent_engine import AgentEngine, parse_tool_requests
+from utils.metrics import observe_request, usage_unknown_total
+
+class Stream(list):
+    def close(self):
+        pass
+
+class FakeClient:
+    """Answers every completion with `chunks`, one chunk at a time when streaming.
+    With `replies` (a list of chunk lists), successive completions get successive replies."""
+
+    def __init__(self, chunks=(), usage=True, replies=None):
+        self.chunks = chunks
+        self.replies = list(replies or [])
+        self.usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5) if usage else None
+        self.models = []
+        create = SimpleNamespace(create=self.create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=create))
+
+    def create(self, stream, **kwargs):
+        self.models.append(kwargs.get('model'))
+        if self.replies:
+            self.chunks = self.replies.pop(0)
+        if stream:
+            chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], x_groq=None)
+                      for text in self.chunks]
+            if self.usage:
+                chunks.append(SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=self.usage)))
+            result = Stream(chunks)
+        else:
+            message = SimpleNamespace(content=''.join(self.chunks))
+            result = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=self.usage)
+        return SimpleNamespace(status_code=200, headers={}, parse=lambda: result)
+
+def complete(engine, agent, **kwargs):
+    debug_log, result = [], []
+
+    def debug(event, **fields):
+        debug_log.append({'event': event, **fields})
+        return ('debug', debug_log[-1])
+
+    list(engine._complete(agent, [], debug, result, **kwargs))
+    return result.pop(), debug_log
+
+@pytest.mark.parametrize('response, tools', [
+    ('{"tool": "A", "params": {}}', ['A']),
+    ('  [{"tool": "A", "params": {}}, {"tool": "B", "params": {"q": "}"}}]', ['A', 'B']),
+    ('{"tool": "A", "params": {}} Let me look that up.', ['A']),
+])
+def test_parse_tool_requests(response, tools):
+    assert [r['tool'] for r in parse_tool_requests(response)] == tools
+
+@pytest.mark.parametrize('response', [
+    'A plain answer', '{"answer": 42} and more', '{"tool": "A"', '', None,
+    '{"tool": ["A"], "params": {}}', '{"tool": "A", "params": "q=1"}', '[{"tool": "A", "params": {}}, {"tool": 1}]',
+])
+def test_parse_plain_answers(response):
+    assert parse_tool_requests(response) is None
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_text_after_a_tool_request_is_dropped_without_early_dispatch(stream):
+    engine = AgentEngine(storage=None, client=FakeClient(['{"tool": "A", ', '"params": {}}', ' Checking now.']))
+    response, _ = complete(engine, Agent(name='A', description='a'), stream=stream)
+    assert response == '{"tool": "A", "params": {}}'
+
+def test_stream_without_usage_is_marked_unknown():
+    engine = AgentEngine(storage=None, client=FakeClient(['Hello'], usage=False))
+    _, debug_log = complete(engine, Agent(name='A', description='a'), stream=True)
+    received = next(entry for entry in debug_log if entry['event'] == 'groq_response_received')
+    assert received['usage_unknown'] and 'usage' not in received
+
+    labels = ('A', received['model'])
+    before = usage_unknown_total._values.get(labels, 0)
+    observe_request('A', received['model'], {'debug_log': [received]})
+    assert usage_unknown_total._values[labels] == before + 1
+
+def test_stream_with_usage_reports_it():
+    engine = AgentEngine(storage=None, client=FakeClient(['Hello']))
+    _, debug_log = complete(engine, Agent(name='A', description='a'), stream=True)
+    received = next(entry for entry in debug_log if entry['event'] == 'groq_response_received')
+    assert received['usage'] == {'prompt_tokens': 10, 'completion_tokens': 5}
+    assert 'usage_unknown' not in received
+
+def make_tool(name):
+    return Tool(name=name, description=name, type='http_api',
+                config={'base_url': 'http://127.0.0.1:1', 'http_method': 'GET', 'endpoint_path': '/'})
+
+def test_early_dispatched_tools_report_parallelism(tmp_path, monkeypatch):
+    def slow_tool_call(tool, params, owner=''):
+        time.sleep(0.05)
+        return f"{tool.name} result", {}, 0.05
+
+    monkeypatch.setattr(agent_engine, '_timed_tool_call', slow_tool_call)
+    monkeypatch.setattr(agent_engine, 'EARLY_TOOL_DISPATCH', True)
+    storage = Storage(str(tmp_path))
+    for name in ('Weather', 'News'):
+        storage.add_tool(make_tool(name))
+    agent = Agent(name='Parallel', description='p', tools=['Weather', 'News'])
+    engine = AgentEngine(storage, client=FakeClient(replies=[
+        ['[{"tool": "Weather", "params": {}}, ', '{"tool": "News", "params": {}}]', ' Looking these up.'],
+        ['Sunny, and nothing new.'],
+    ]))
+    result = engine.ask(agent, 'Weather and news?')
+    events = {entry['event']: entry for entry in result['debug_log']}
+    assert result['response'] == 'Sunny, and nothing new.'
+    assert 'tool_dispatched_early' in events
+    completed = [entry for entry in result['debug_log'] if entry['event'] == 'tool_execution_completed']
+    assert sorted(entry['tool'] for entry in completed) == ['News', 'Weather']
+    assert all(entry['step'] == 1 for entry in completed)
+    parallel = events['parallel_tools_completed']
+    assert parallel['step'] == 1 and parallel['tool_count'] == 2
+    assert parallel['sequential_ms'] == 100.0 and parallel['wall_clock_ms'] < 100
+
+@pytest.mark.parametrize('last_reply, answer', [
+    ('It will be sunny.', 'It will be sunny.'),
+    ('{"tool": "Weather", "params": {}}', 'Error: The agent was still requesting tools after using all 1 tool steps.'),
+])
+@pytest.mark.parametrize('stream', [False, True])
+def test_tool_request_past_the_step_budget_is_never_the_answer(tmp_path, monkeypatch, last_reply, answer, stream):
+    monkeypatch.setattr(agent_engine, '_timed_tool_call', lambda tool, params, owner='': ('Sunny', {}, 0.0))
+    storage = Storage(str(tmp_path))
+    storage.add_tool(make_tool('Weather'))
+    request = '{"tool": "Weather", "params": {}}'
+    client = FakeClient(replies=[[request], [request], [last_reply]])
+    engine = AgentEngine(storage, client=client, max_steps=1)
+    events = list(engine.iter_ask(Agent(name='Budget', description='b', tools=['Weather']), 'Weather?', stream=stream))
+    result = events[-1][1]
+    assert result['response'] == answer
+    assert 'step_budget_exhausted' in [entry['event'] for entry in result['debug_log']]
+    if stream:
+        assert ''.join(text for kind, text in events if kind == 'token') == answer
+
+@pytest.mark.parametrize('router_reply, escalated', [
+    ('{"tool": "Weather", "params": {}}', None),
+    ('It is probably sunny.', 'no_tool_request'),
+    ('{"tool": "Horoscope", "params": {}}', 'unknown_tool'),
+])
+def test_router_model_picks_tools_and_escalates_anything_else(tmp_path, monkeypatch, router_reply, escalated):
+    monkeypatch.setattr(agent_engine, '_timed_tool_call', lambda tool, params, owner='': ('Sunny', {}, 0.0))
+    storage = Storage(str(tmp_path))
+    storage.add_tool(make_tool('Weather'))
+    agent = Agent(name='Cascade', description='c', tools=['Weather'], model='big', router_model='small')
+    replies = [[router_reply], ['Sunny today.']]
+    if escalated:
+        replies.insert(1, ['{"tool": "Weather", "params": {}}'])
+    client = FakeClient(replies=replies)
+    result = AgentEngine(storage, client=client).ask(agent, 'Weather?')
+    assert result['response'] == 'Sunny today.'
+    assert client.models == (['small', 'big', 'big'] if escalated else ['small', 'big'])
+    escalations = [entry for entry in result['debug_log'] if entry['event'] == 'router_escalated']
+    assert [entry['reason'] for entry in escalations] == ([escalated] if escalated else [])
+    contexts = [entry['context'] for entry in result['debug_log'] if entry['event'] == 'groq_api_call']
+    assert contexts[0] == 'tool_selection' and contexts[-1] == 'tool_result_interpretation'
+    assert ('escalation' in contexts) == bool(escalated)
@@ -0,0 +1,43 @@
+import pytest
+from models import Agent, Tool
+from storage import Storage
+from utils.agent_index import AgentIndex, confident_pick, tokenize
+
+def tool(name, description):
+    return Tool(name=name, description=description, type='http_api',
+                config={'base_url': 'http://127.0.0.1:1', 'http_method': 'GET', 'endpoint_path': '/'})
+
+def test_tokenize_splits_camel_case_and_folds_plurals():
+    assert tokenize('What are the WeatherForecasts for London?') == ['weather', 'forecast', 'london']
+
+def test_search_ranks_by_agent_and_tool_text():
+    index = AgentIndex()
+    index.add_agent(Agent(name='Forecaster', description='Answers weather questions'),
+                    [tool('OpenMeteo', 'Current temperature and rain for a city')])
+    index.add_agent(Agent(name='Newsroom', description='Summarizes the latest headlines'), [])
+    assert [name for name, _ in index.search('Will it rain in Paris?')] == ['Forecaster']
+    assert index.search('headlines today')[0][0] == 'Newsroom'
+    assert index.search('recipes') == []
+    index.remove_agent('Newsroom')
+    assert index.search('headlines today') == []
+
+def test_sync_reindexes_agents_when_a_tool_description_changes(tmp_path):
+    storage = Storage(str(tmp_path))
+    storage.add_tool(tool('Lookup', 'Stock prices'))
+    storage.add_agent(Agent(name='Helper', description='Helps out', tools=['Lookup']))
+    index = AgentIndex()
+    index.sync(storage)
+    assert index.search('stock prices')[0][0] == 'Helper'
+    storage.add_tool(tool('Lookup', 'Flight times'))
+    index.sync(storage)
+    assert index.search('stock prices') == [] and index.search('flight')[0][0] == 'Helper'
+
+@pytest.mark.parametrize('ranked, pick', [
+    ([('A', 3.0), ('B', 1.0)], 'A'),
+    ([('A', 3.0), ('B', 2.5)], None),
+    ([('A', 0.2)], None),
+    ([('A', 0.6)], 'A'),
+    ([], None),
+])
+def test_confident_pick_needs_a_clear_winner(ranked, pick):
+    assert confident_pick(ranked, min_score=0.5, ratio=1.5) == pick
@@ -0,0 +1,45 @@
+import pytest
+from models import Agent
+from utils import answer_cache as answer_cache_module
+from utils.answer_cache import AnswerCache, question_terms
+
+def agent(threshold=0.9, ttl=300, max_entries=256):
+    return Agent(name='A', description='a',
+                 answer_cache={'ttl': ttl, 'max_entries': max_entries, 'similarity_threshold': threshold})
+
+def test_question_terms_keep_interrogatives_and_negations():
+    assert question_terms("When was Einstein born?") == ['when', 'einstein', 'born']
+    assert question_terms("Isn't a dog's nose wet?") == ['not', 'dog', 'nose', 'wet']
+
+@pytest.mark.parametrize('stored, asked', [
+    ("When was Einstein born?", "Where was Einstein born?"),
+    ("Who wrote Hamlet?", "Why wrote Hamlet?"),
+    ("Is a dog smart?", "Is a dog not smart?"),
+    ("Do dogs like rain?", "Don't dogs like rain?"),
+])
+def test_different_questions_are_not_served_each_others_answers(stored, asked):
+    cache = AnswerCache()
+    cache.put(agent(), 'v1', stored, 'cached answer', [])
+    assert cache.get(agent(), 'v1', asked) is None
+
+def test_paraphrases_still_hit():
+    cache = AnswerCache()
+    cache.put(agent(), 'v1', "How good is a dog's nose?", 'very good', [])
+    hit = cache.get(agent(), 'v1', "how good are dogs noses")
+    assert hit and hit['response'] == 'very good'
+
+def test_postings_are_dropped_with_their_entries(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, 'monotonic', lambda: clock[0])
+    cache = AnswerCache()
+    short = agent(ttl=10, max_entries=2)
+    cache.put(short, 'v1', 'first question', 'a', [])
+    cache.put(short, 'v2', 'second question', 'b', [])
+    cache.put(short, 'v2', 'third question', 'c', [])  # evicts the only v1 entry
+    answers = cache._agents['A']
+    assert len(answers.postings) == 1
+    clock[0] += 11
+    cache.put(short, 'v3', 'fourth question', 'd', [])  # the v2 entries have expired
+    assert list(answers.postings) == [cache.fingerprint(short, 'v3')]
+    assert len(answers.entries) == 1
+    assert cache.stats()['expirations'] == 2
@@ -0,0 +1,59 @@
+import threading
+import time
+from utils.background_writer import BackgroundWriter
+
+def test_items_are_written_in_batches_on_the_named_thread():
+    written, threads = [], set()
+
+    def write(batch):
+        threads.add(threading.current_thread().name)
+        written.extend(batch)
+
+    writer = BackgroundWriter(write, 'test-writer')
+    for i in range(5):
+        writer.submit(i)
+    writer.flush()
+    assert written == [0, 1, 2, 3, 4] and threads == {'test-writer'}
+    writer.close()
+    assert not writer.running()
+
+def test_full_queue_writes_on_the_caller_thread():
+    gate = threading.Event()
+    written = []
+
+    def write(batch):
+        if threading.current_thread().name == 'slow-writer':
+            gate.wait(5)
+        written.extend(batch)
+
+    writer = BackgroundWriter(write, 'slow-writer', queue_size=1)
+    started = time.perf_counter()
+    for i in range(4):
+        writer.submit(i)
+    assert time.perf_counter() - started < 0.5
+    assert writer.sync_writes >= 2
+    gate.set()
+    writer.flush()
+    assert sorted(written) == [0, 1, 2, 3]
+    writer.close()
+
+def test_write_errors_do_not_stop_the_thread():
+    written = []
+
+    def write(batch):
+        if 'bad' in batch:
+            raise ValueError('bad item')
+        written.extend(batch)
+
+    writer = BackgroundWriter(write, 'test-writer', batch_size=1)
+    for item in ('a', 'bad', 'b'):
+        writer.submit(item)
+    writer.flush()
+    assert written == ['a', 'b'] and writer.running()
+    writer.close()
+
+def test_without_background_writes_inline():
+    written = []
+    writer = BackgroundWriter(written.extend, 'test-writer', background=False)
+    writer.submit('a')
+    assert written == ['a'] and not writer.running()
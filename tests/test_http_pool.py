@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.fake_tool import FakeToolServer
+from utils.http_pool import HttpPool
+
+@pytest.fixture
+def server():
+    server = FakeToolServer(latency=0.02).start()
+    yield server
+    server.stop()
+
+def test_sequential_calls_reuse_one_connection(server):
+    pool = HttpPool()
+    for i in range(5):
+        assert pool.request('GET', f'{server.base_url}/items/{i}').json()['path'] == f'/items/{i}'
+    assert server.connections == 1
+    stats = pool.stats()[server.base_url]
+    assert stats['requests'] == 5 and stats['new_connections'] == 1 and stats['connection_hits'] == 4
+    pool.close()
+
+def test_concurrent_calls_wait_for_the_per_host_limit(server):
+    pool = HttpPool(pool_maxsize=2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda i: pool.request('GET', f'{server.base_url}/{i}'), range(8)))
+    assert all(response.status_code == 200 for response in responses)
+    assert server.connections <= 2 and pool.stats()[server.base_url]['new_connections'] <= 2
+    pool.close()
+
+@pytest.mark.parametrize('method, attempts', [('GET', 3), ('POST', 1)])
+def test_only_idempotent_methods_are_retried(server, method, attempts):
+    server.respond = lambda handler, body: (503, {'error': 'busy'}, {})
+    pool = HttpPool(retries=2, backoff_factor=0)
+    assert pool.request(method, f'{server.base_url}/busy').status_code == 503
+    assert server.requests == attempts
+    pool.close()
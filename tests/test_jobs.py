@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+from utils.jobs import JobQueue, JobRunner
+
+@pytest.fixture
+def jobs(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.db'), agent_concurrency=2)
+
+def make_stale(jobs, job_id):
+    jobs._conn().execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time() - 3600, job_id))
+
+def test_claim_caps_running_jobs_per_agent(jobs):
+    for i in range(3):
+        jobs.submit('A', f'a{i}')
+    b = jobs.submit('B', 'b0')
+    claimed = [jobs.claim('w1'), jobs.claim('w1')]
+    assert [job['agent'] for job in claimed] == ['A', 'A']
+    # A's third job waits for a free slot, so B's is next even though it was queued later
+    assert jobs.claim('w2')['job_id'] == b['job_id']
+    assert jobs.claim('w2') is None
+
+    jobs.finish(claimed[0]['job_id'], 'w1', 'succeeded', result={'response': 'ok'})
+    assert jobs.claim('w2')['question'] == 'a2'
+
+def test_claim_takes_higher_priority_first(jobs):
+    jobs.submit('A', 'low')
+    jobs.submit('B', 'high', priority=5)
+    assert jobs.claim('w')['question'] == 'high'
+
+def test_recover_requeues_stale_jobs(jobs):
+    job = jobs.submit('A', 'q')
+    jobs.claim('dead-worker')
+    make_stale(jobs, job['job_id'])
+    assert jobs.recover(stale_after=30, max_attempts=3) == 1
+    recovered = jobs.get(job['job_id'])
+    assert recovered['status'] == 'queued' and recovered['attempts'] == 1
+    assert jobs.claim('w')['attempts'] == 2
+
+def test_recover_fails_jobs_at_max_attempts(jobs):
+    job = jobs.submit('A', 'q')
+    for _ in range(2):
+        jobs.claim('dead-worker')
+        make_stale(jobs, job['job_id'])
+        jobs.recover(stale_after=30, max_attempts=2)
+    failed = jobs.get(job['job_id'])
+    assert failed['status'] == 'failed' and failed['attempts'] == 2
+    assert failed['error'] == 'Worker stopped while running the job'
+
+def test_recover_leaves_live_jobs_alone(jobs):
+    job = jobs.submit('A', 'q')
+    jobs.claim('w')
+    assert jobs.recover(stale_after=30) == 0
+    assert jobs.get(job['job_id'])['status'] == 'running'
+
+def test_cancel_queued_job(jobs):
+    job = jobs.submit('A', 'q')
+    assert jobs.cancel(job['job_id'])['status'] == 'cancelled'
+    assert jobs.claim('w') is None
+
+def test_cancel_running_job_is_flagged(jobs):
+    job = jobs.submit('A', 'q')
+    jobs.claim('w')
+    cancelled = jobs.cancel(job['job_id'])
+    assert cancelled['status'] == 'running' and cancelled['cancel_requested']
+    assert jobs.cancel_requested(job['job_id'])
+
+def test_cancelled_stale_job_is_not_requeued(jobs):
+    job = jobs.submit('A', 'q')
+    jobs.claim('dead-worker')
+    jobs.cancel(job['job_id'])
+    make_stale(jobs, job['job_id'])
+    jobs.recover(stale_after=30)
+    assert jobs.get(job['job_id'])['status'] == 'cancelled'
+
+def test_runner_stops_a_cancelled_job(jobs, monkeypatch):
+    monkeypatch.setattr('utils.jobs.JOB_POLL_INTERVAL', 0.01)
+    started = threading.Event()
+
+    def execute(job, check_cancelled):
+        started.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    runner = JobRunner(jobs, execute, workers=1)
+    runner.ensure_started()
+    job = jobs.submit('A', 'q')
+    runner.notify()
+    assert started.wait(5)
+    jobs.cancel(job['job_id'])
+    finished = runner.wait(job['job_id'], 5)
+    assert finished['status'] == 'cancelled' and finished['error'] == 'Cancelled'
+    assert runner.cancelled == 1
+
+def test_purge_deletes_only_old_finished_jobs(jobs):
+    done = jobs.submit('A', 'done')
+    jobs.claim('w')
+    jobs.finish(done['job_id'], 'w', 'succeeded', result={})
+    cancelled = jobs.cancel(jobs.submit('A', 'cancelled')['job_id'])
+    queued = jobs.submit('A', 'queued')
+    jobs._conn().execute("UPDATE jobs SET finished_at = ?", (time.time() - 3600,))
+    assert jobs.purge(older_than=60) == 2
+    assert jobs.get(done['job_id']) is None and jobs.get(cancelled['job_id']) is None
+    assert jobs.get(queued['job_id'])['status'] == 'queued'
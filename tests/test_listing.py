@@ -0,0 +1,31 @@
+import pytest
+
+@pytest.fixture(scope='module')
+def listed(client):
+    for name in ('ListC', 'ListA', 'ListB'):
+        assert client.post('/agents', json={'name': name, 'description': name.lower()}).status_code == 201
+    return client
+
+def test_cursor_pages_through_the_prefix(listed):
+    first = listed.get('/agents?prefix=List&limit=2&fields=name')
+    assert first.get_json() == [{'name': 'ListA'}, {'name': 'ListB'}]
+    assert first.headers['X-Next-Cursor'] == 'ListB'
+    last = listed.get('/agents?prefix=List&limit=2&fields=name&cursor=ListB')
+    assert last.get_json() == [{'name': 'ListC'}]
+    assert 'X-Next-Cursor' not in last.headers
+
+def test_matching_etag_gets_304_until_the_registry_changes(listed):
+    etag = listed.get('/agents?prefix=List').headers['ETag']
+    cached = listed.get('/agents?prefix=List', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.headers['ETag'] == etag
+    # The ETag belongs to one query, not to the whole listing
+    assert listed.get('/agents?prefix=List&limit=1', headers={'If-None-Match': etag}).status_code == 200
+
+    assert listed.post('/agents', json={'name': 'ListD', 'description': 'd'}).status_code == 201
+    changed = listed.get('/agents?prefix=List', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert [agent['name'] for agent in changed.get_json()] == ['ListA', 'ListB', 'ListC', 'ListD']
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-1', 'fields=name,secret'])
+def test_bad_listing_queries_are_rejected(listed, query):
+    assert listed.get(f'/tools?{query}').status_code == 400
@@ -0,0 +1,42 @@
+import threading
+from utils.log_analytics import LogAnalytics
+
+def interaction(i, tools=()):
+    return {'timestamp': '2026-01-01T00:00:00', 'question': f'q{i}', 'response': f'r{i}',
+            'tools_used': list(tools), 'debug_log': []}
+
+def test_record_writes_on_the_background_thread(tmp_path, monkeypatch):
+    analytics = LogAnalytics(str(tmp_path / 'log_analytics.db'))
+    writers = []
+    write = analytics._writer.write
+    monkeypatch.setattr(analytics._writer, 'write', lambda summaries: (writers.append(threading.current_thread().name),
+                                                                write(summaries)))
+    for i in range(3):
+        analytics.record('A', interaction(i, tools=['Weather']))
+    assert [row['question'] for row in analytics.query(agent='A')] == ['q2', 'q1', 'q0']
+    assert [row['id'] for row in analytics.query(tool='Weather')]
+    assert set(writers) == {'log-analytics-writer'}
+    analytics.close()
+
+def test_record_snapshots_the_log(tmp_path):
+    analytics = LogAnalytics(str(tmp_path / 'log_analytics.db'))
+    log = interaction(0)
+    analytics.record('A', log)
+    log['question'] = 'changed'
+    log['tools_used'].append('Late')
+    row = next(analytics.query(agent='A'))
+    assert row['question'] == 'q0' and row['tools_used'] == []
+    analytics.close()
+
+def test_full_queue_writes_synchronously(tmp_path):
+    analytics = LogAnalytics(str(tmp_path / 'log_analytics.db'), queue_size=1)
+    gate = threading.Event()
+    write = analytics._writer.write
+    analytics._writer.write = lambda summaries: (gate.wait(5) if threading.current_thread().name == 'log-analytics-writer'
+                                          else None, write(summaries))
+    for i in range(4):
+        analytics.record('A', interaction(i))
+    assert analytics._writer.sync_writes >= 2
+    gate.set()
+    assert len(list(analytics.query(agent='A'))) == 4
+    analytics.close()
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+import pytest
+from utils.log_store import LogStore
+
+def record(i):
+    return {'timestamp': '2026-01-01T00:00:00', 'question': f'q{i}', 'response': f'r{i}'}
+
+def test_background_writes_are_readable(tmp_path):
+    store = LogStore(str(tmp_path / 'logs'))
+    for i in range(5):
+        store.append('A', record(i))
+    assert [r['question'] for r in store.last('A', 3)] == ['q4', 'q3', 'q2']
+    store.close()
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+@pytest.mark.parametrize('used_before_fork', [False, True])
+def test_forked_child_writes_its_own_records(tmp_path, used_before_fork):
+    # Like gunicorn --preload: the store is created in the master and used in forked workers
+    store = LogStore(str(tmp_path / 'logs'))
+    if used_before_fork:
+        store.append('A', record('parent'))
+        store.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            store.append('A', record('child'))
+            store.flush()
+            code = 0 if store.last('A', 1)[0]['question'] == 'qchild' else 2
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert 'qchild' in [r['question'] for r in LogStore(str(tmp_path / 'logs'), background=False).last('A', 5)]
+    store.close()
+
+def test_append_snapshots_the_record(tmp_path):
+    store = LogStore(str(tmp_path / 'logs'))
+    log = record(0)
+    store.append('A', log)
+    log['question'] = 'changed'
+    log['debug_log'] = ['added later']
+    assert store.last('A', 1)[0] == record(0)
+    store.close()
+
+def test_full_queue_writes_at_once(tmp_path, monkeypatch):
+    store = LogStore(str(tmp_path / 'logs'), queue_size=1)
+    gate = threading.Event()
+    write = store._writer.write
+
+    def slow_writer(records):
+        if threading.current_thread().name == 'log-writer':
+            gate.wait(5)
+        write(records)
+
+    monkeypatch.setattr(store._writer, 'write', slow_writer)
+    started = time.perf_counter()
+    for i in range(4):
+        store.append('A', record(i))
+    assert time.perf_counter() - started < 0.5
+    assert store.stats()['sync_fallbacks'] >= 2
+    gate.set()
+    store.flush()
+    assert sorted(r['question'] for r in store.last('A', 10)) == ['q0', 'q1', 'q2', 'q3']
+    store.close()
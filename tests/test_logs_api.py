@@ -0,0 +1,12 @@
+import pytest
+
+@pytest.mark.parametrize('path', ['/logs', '/logs/Nobody'])
+@pytest.mark.parametrize('limit', ['-1', '0', 'abc'])
+def test_bad_limits_are_rejected(client, path, limit):
+    response = client.get(f'{path}?limit={limit}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_limit_is_capped(client):
+    assert client.get('/logs/Nobody?limit=1000').get_json() == []
+    assert client.get('/logs?limit=100000').status_code == 200
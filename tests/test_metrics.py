@@ -0,0 +1,37 @@
+import json
+from utils.metrics import Histogram, MetricsRegistry
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, 'groq')
+    lines = list(Histogram.render('latency_seconds', histogram.snapshot()))
+    assert lines == [
+        'latency_seconds_bucket{stage="groq",le="0.1"} 1',
+        'latency_seconds_bucket{stage="groq",le="1"} 3',
+        'latency_seconds_bucket{stage="groq",le="+Inf"} 4',
+        'latency_seconds_sum{stage="groq"} 4.05',
+        'latency_seconds_count{stage="groq"} 4',
+    ]
+
+def test_snapshots_of_all_workers_are_merged(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    requests = registry.counter('requests_total', 'Requests', ['agent'])
+    requests.inc('A', amount=2)
+    # A snapshot left behind by another (possibly exited) worker
+    other = MetricsRegistry()
+    other.counter('requests_total', 'Requests', ['agent']).inc('A', amount=3)
+    other.counter('requests_total', 'Requests', ['agent']).inc('B')
+    (tmp_path / 'worker-1.json').write_text(json.dumps(other.snapshot()))
+    text = registry.render()
+    assert 'requests_total{agent="A"} 5' in text and 'requests_total{agent="B"} 1' in text
+
+def test_answered_questions_show_up_at_metrics(client, groq):
+    assert client.post('/agents', json={'name': 'Measured', 'description': 'm'}).status_code == 201
+    assert client.post('/ask/Measured', json={'question': 'Hi?'}).status_code == 200
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'toolmind_requests_total{agent="Measured",status="ok"} 1' in text
+    assert 'toolmind_request_seconds_count{agent="Measured"} 1' in text
+    assert 'toolmind_groq_call_seconds_count{' in text
@@ -0,0 +1,33 @@
+import time
+from types import SimpleNamespace
+from models import Agent, Tool
+from utils import prompt_cache as prompt_cache_module
+from utils.prompt_cache import PromptCache
+
+TOOLS = [Tool(name='Weather', description='Forecasts', type='http_api',
+              config={'base_url': 'http://127.0.0.1:1', 'http_method': 'GET', 'endpoint_path': '/w/<city>'})]
+
+def test_hits_reuse_the_compiled_prompt():
+    cache = PromptCache()
+    agent = Agent(name='A', description='a', tools=['Weather'])
+    prompt, info = cache.get(agent, TOOLS, 'v1')
+    assert info['cache'] == 'miss' and 'Weather' in prompt
+    again, info = cache.get(agent, TOOLS, 'v1')
+    assert again is prompt and info['cache'] == 'hit'
+    assert cache.get(agent, TOOLS, 'v2')[1]['cache'] == 'miss'
+
+def test_build_time_is_this_threads_cpu_time(monkeypatch):
+    # Other threads' CPU (here 1 s per reading of process time) must not count
+    clock = {'thread': 0.0, 'process': 0.0}
+
+    def tick(name, step):
+        def read():
+            clock[name] += step
+            return clock[name]
+        return read
+
+    fake_time = SimpleNamespace(perf_counter=time.perf_counter, monotonic=time.monotonic,
+                                thread_time=tick('thread', 0.002), process_time=tick('process', 1.0))
+    monkeypatch.setattr(prompt_cache_module, 'time', fake_time)
+    _, info = PromptCache().get(Agent(name='A', description='a', tools=['Weather']), TOOLS, 'v1')
+    assert info['build_ms'] == 2.0
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+import pytest
+from models import Agent
+from storage import Storage
+from utils import agent_engine
+from utils.agent_engine import AgentEngine
+from utils.rate_limit import RateLimits
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        self.closed = True
+
+class FakeClient:
+    def __init__(self, chunks, completion='completion'):
+        self.streams = []
+        create = SimpleNamespace(create=self.create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=create))
+        self.chunks = chunks
+        self.completion = completion
+
+    def create(self, stream, **kwargs):
+        result = FakeStream(self.chunks) if stream else self.completion
+        if stream:
+            self.streams.append(result)
+        return SimpleNamespace(status_code=200, headers={}, parse=lambda: result)
+
+@pytest.fixture
+def limits(monkeypatch):
+    limits = RateLimits(enabled=True, groq={'rate': 1000.0, 'burst': None, 'max_concurrency': 2})
+    monkeypatch.setattr(agent_engine, 'rate_limits', limits)
+    return limits
+
+def in_flight(limits, agent):
+    return limits.for_model(agent.model)._in_flight
+
+def test_rate_limits_are_off_by_default(monkeypatch):
+    monkeypatch.delenv('RATE_LIMITS', raising=False)
+    assert not RateLimits.from_env().enabled
+
+def test_stream_holds_its_slot_until_exhausted(limits):
+    agent = Agent(name='A', description='a')
+    engine = AgentEngine(storage=None, client=FakeClient(['a', 'b']))
+    stream = engine.create_completion(agent, [], stream=True)
+    assert in_flight(limits, agent) == 1
+    assert list(stream) == ['a', 'b']
+    assert in_flight(limits, agent) == 0
+    assert engine.client.streams[0].closed
+
+def test_stream_releases_its_slot_when_closed(limits):
+    agent = Agent(name='A', description='a')
+    engine = AgentEngine(storage=None, client=FakeClient(['a', 'b']))
+    stream = engine.create_completion(agent, [], stream=True)
+    next(iter(stream))
+    stream.close()
+    stream.close()
+    assert in_flight(limits, agent) == 0
+
+def test_non_streaming_call_releases_at_once(limits):
+    agent = Agent(name='A', description='a')
+    engine = AgentEngine(storage=None, client=FakeClient([]))
+    assert engine.create_completion(agent, [], stream=False) == 'completion'
+    assert in_flight(limits, agent) == 0
+
+@pytest.mark.parametrize('owner, queued_as', [(None, 'A'), ('batch:A', 'batch:A')])
+def test_requests_queue_as_their_owner(limits, tmp_path, monkeypatch, owner, queued_as):
+    agent = Agent(name='A', description='a')
+    limiter = limits.for_model(agent.model)
+    owners = []
+    acquire = limiter.acquire
+    monkeypatch.setattr(limiter, 'acquire', lambda who, deadline: (owners.append(who), acquire(who, deadline))[1])
+    answer = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='An answer'))], usage=None)
+    engine = AgentEngine(Storage(str(tmp_path)), client=FakeClient([], completion=answer))
+    assert engine.ask(agent, 'Why?', owner=owner)['response'] == 'An answer'
+    assert owners == [queued_as]
@@ -0,0 +1,45 @@
+import time
+import pytest
+from benchmarks.fake_tool import FakeToolServer
+from models import Tool
+from utils.response_cache import TTLCache, tool_response_cache
+from utils.tool_executor import execute_http_tool
+
+def test_entries_expire_after_the_ttl():
+    cache = TTLCache(ttl=0.05)
+    cache.put('k', 'v')
+    assert cache.get('k') == 'v'
+    time.sleep(0.06)
+    assert cache.get('k') is None
+    assert cache.stats()['expirations'] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+@pytest.fixture
+def server():
+    server = FakeToolServer().start()
+    yield server
+    server.stop()
+
+@pytest.mark.parametrize('method, cached', [('GET', True), ('POST', False)])
+def test_only_idempotent_calls_are_served_from_the_cache(server, method, cached):
+    name = f'Cached{method}'
+    tool_response_cache.invalidate(name)
+    tool = Tool(name=name, description='c', type='http_api',
+                config={'base_url': server.base_url, 'http_method': method, 'endpoint_path': '/items/<id>',
+                        'cache': {'ttl': 60}})
+    first, first_info = execute_http_tool(tool, {'id': 1})
+    second, second_info = execute_http_tool(tool, {'id': 1})
+    assert first == second
+    assert first_info['cache'] == ('miss' if cached else 'disabled')
+    assert second_info['cache'] == ('hit' if cached else 'disabled')
+    assert server.requests == (1 if cached else 2)
+    execute_http_tool(tool, {'id': 2})
+    assert server.requests == (2 if cached else 3)
@@ -0,0 +1,58 @@
+import pytest
+from utils.sessions import SessionStore, estimate_tokens
+
+def make_session(turns=3, length=400):
+    store = SessionStore()
+    session = store.get_or_create()
+    for i in range(turns):
+        store.record(session, f"question {i} " + 'q' * length, f"answer {i} " + 'a' * length)
+    return store, session
+
+def test_history_with_zero_budget_drops_everything():
+    store, session = make_session(turns=1)
+    messages, info = store.history(session, 0)
+    assert messages == []
+    assert session.summary == ''
+    assert info['estimated_tokens'] == 0
+
+@pytest.mark.parametrize('budget', [1, 3, 4, 5, 8, 20])
+def test_history_with_small_budgets_fits_the_budget(budget):
+    store, session = make_session()
+    messages, info = store.history(session, budget)
+    assert info['estimated_tokens'] <= budget
+
+def test_history_keeps_newest_turns_and_summarizes_the_rest():
+    store, session = make_session(turns=3, length=400)
+    pair_cost = 2 * estimate_tokens('question 0 ' + 'q' * 400)
+    messages, info = store.history(session, pair_cost + 60)
+    assert info['trimmed_turns'] == 4
+    assert info['turns'] == 2
+    assert messages[-1]['content'].startswith('answer 2')
+    assert messages[0]['role'] == 'system' and info['summarized']
+    assert info['estimated_tokens'] <= pair_cost + 60
+
+def test_history_with_a_large_budget_keeps_everything():
+    store, session = make_session()
+    messages, info = store.history(session, 100000)
+    assert len(messages) == 6 and info['trimmed_turns'] == 0 and not info['summarized']
+
+def test_one_shot_questions_create_no_session(client, groq):
+    from utils.sessions import session_store
+    assert client.post('/agents', json={'name': 'OneShot', 'description': 'o'}).status_code == 201
+    before = session_store.stats()['sessions']
+    response = client.post('/ask/OneShot', json={'question': 'Hi?'}).get_json()
+    assert response['response'] == 'An answer' and 'session_id' not in response
+    assert session_store.stats()['sessions'] == before
+
+def test_conversations_opt_in_and_continue(client, groq):
+    assert client.post('/agents', json={'name': 'Chatty', 'description': 'c'}).status_code == 201
+    first = client.post('/ask/Chatty', json={'question': 'My name is Ada.', 'session': True}).get_json()
+    session_id = first['session_id']
+    second = client.post('/ask/Chatty', json={'question': 'What is my name?', 'session_id': session_id}).get_json()
+    assert second['session_id'] == session_id
+    assert 'My name is Ada.' in [m['content'] for m in groq.calls[-1]['messages']]
+
+def test_stream_without_a_session(client, groq):
+    assert client.post('/agents', json={'name': 'Streamer', 'description': 's'}).status_code == 201
+    body = client.post('/ask/Streamer/stream', json={'question': 'Hi?'}).get_data(as_text=True)
+    assert 'event: done' in body and '"session_id": null' in body
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.fake_tool import FakeToolServer
+from models import Tool
+from utils.single_flight import SingleFlight
+from utils.tool_executor import execute_http_tool
+
+def run_together(flight, fn, callers=4, key='k'):
+    """Start `callers` identical calls; the leader's fn blocks until every follower has joined."""
+    release = threading.Event()
+
+    def gated():
+        release.wait(5)
+        return fn()
+
+    def join_count():
+        with flight._lock:
+            call = flight._calls.get(key)
+            return call.followers if call else -1
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(flight.do, key, gated, 'T') for _ in range(callers)]
+        while join_count() < callers - 1:
+            threading.Event().wait(0.001)
+        release.set()
+        return futures
+
+def test_concurrent_identical_calls_share_one_result():
+    flight = SingleFlight('test')
+    calls = []
+    futures = run_together(flight, lambda: calls.append(1) or 'result')
+    results = [future.result() for future in futures]
+    assert calls == [1]
+    assert [result for result, _ in results] == ['result'] * 4
+    assert sorted(info['role'] for _, info in results) == ['follower'] * 3 + ['leader']
+    assert flight.stats() == {'in_flight': 0, 'leaders': 1, 'followers': 3, 'by_name': {'T': 3}}
+
+def test_followers_get_the_leaders_error():
+    flight = SingleFlight('test')
+
+    def fail():
+        raise ValueError('upstream down')
+
+    for future in run_together(flight, fail):
+        with pytest.raises(ValueError, match='upstream down'):
+            future.result()
+
+def test_finished_calls_are_not_reused():
+    flight = SingleFlight('test')
+    calls = []
+    for _ in range(2):
+        flight.do('k', lambda: calls.append(1))
+    assert len(calls) == 2 and flight.leaders == 2
+
+def test_identical_tool_calls_in_flight_hit_the_upstream_once():
+    server = FakeToolServer(latency=0.2).start()
+    tool = Tool(name='Coalesced', description='c', type='http_api',
+                config={'base_url': server.base_url, 'http_method': 'GET', 'endpoint_path': '/items/1'})
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: execute_http_tool(tool, {}), range(4)))
+    server.stop()
+    assert server.requests == 1
+    assert len({text for text, _ in results}) == 1
+    assert sorted(info['coalescing']['role'] for _, info in results) == ['follower'] * 3 + ['leader']
@@ -0,0 +1,34 @@
+from datetime import datetime
+from models import Agent, Tool
+from backends.json_backend import JSONBackend
+from backends.sqlite_backend import SQLiteBackend
+from storage import migrate
+
+def test_sqlite_writers_in_separate_workers_keep_each_others_rows(tmp_path):
+    # Two connections stand in for two gunicorn workers sharing the database
+    first, second = SQLiteBackend(str(tmp_path)), SQLiteBackend(str(tmp_path))
+    first.upsert_agent(Agent(name='A', description='a'))
+    second.upsert_agent(Agent(name='B', description='b'))
+    first.upsert_agent(Agent(name='A', description='changed'))
+    assert {agent.name: agent.description for agent in second.load_agents()} == {'A': 'changed', 'B': 'b'}
+    assert second.delete_agent('B') and not first.delete_agent('B')
+    assert [agent.name for agent in first.load_agents()] == ['A']
+
+def test_sqlite_touch_updates_only_last_active(tmp_path):
+    backend = SQLiteBackend(str(tmp_path))
+    backend.upsert_agent(Agent(name='A', description='a'))
+    version = backend.agents_version()
+    backend.touch_agent('A', datetime(2026, 1, 2, 3, 4, 5))
+    assert backend.get_agent('A').last_active == datetime(2026, 1, 2, 3, 4, 5)
+    assert backend.agents_version() == version
+
+def test_migrate_copies_everything_from_json_to_sqlite(tmp_path):
+    source = JSONBackend(str(tmp_path / 'json'))
+    source.upsert_tool(Tool(name='T', description='t', type='http_api',
+                            config={'base_url': 'http://127.0.0.1:1', 'http_method': 'GET', 'endpoint_path': '/'}))
+    source.upsert_agent(Agent(name='A', description='a', tools=['T']))
+    source.save_interaction_log('A', {'agent_name': 'A', 'question': 'q', 'response': 'r'})
+    target = SQLiteBackend(str(tmp_path / 'sqlite'))
+    assert migrate(source, target) == {'agents': 1, 'tools': 1, 'logs': 1}
+    assert target.get_agent('A').tools == ['T'] and target.get_tool('T').description == 't'
+    assert [log['question'] for log in target.get_agent_logs('A')] == ['q']
@@ -0,0 +1,100 @@
+import threading
+import time
+import pytest
+from utils import tool_health
+from utils.tool_health import CircuitBreaker, hedged
+
+def open_breaker(cooldown=0.05):
+    breaker = CircuitBreaker('T', failures=2, cooldown=cooldown)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == 'open'
+    return breaker
+
+def test_open_breaker_fails_fast_until_the_cooldown():
+    breaker = open_breaker(cooldown=30)
+    assert not breaker.allow() and not breaker.available()
+    assert breaker.short_circuited == 1
+
+def test_half_open_allows_a_single_trial_call():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+    breaker.record(True, 0.01)
+    assert breaker.state == 'closed' and breaker.allow()
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == 'open' and breaker.opened == 2
+    assert not breaker.allow()
+
+def test_released_trial_lets_another_through():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+@pytest.mark.parametrize('ratio, calls, hedges', [(0.1, 20, 2), (0.5, 4, 2), (0.1, 5, 0)])
+def test_hedge_max_ratio_caps_hedges(monkeypatch, ratio, calls, hedges):
+    monkeypatch.setattr(tool_health, 'TOOL_HEDGE_MAX_RATIO', ratio)
+    breaker = CircuitBreaker('T')
+    for _ in range(calls):
+        breaker.allow()
+    assert sum(breaker.take_hedge() for _ in range(calls)) == hedges
+
+def test_no_hedges_unless_closed():
+    breaker = open_breaker(cooldown=30)
+    breaker.calls = 100
+    assert not breaker.take_hedge()
+
+def attempts(*delays):
+    """An attempt function whose n-th call sleeps delays[n] and returns ('result', n)."""
+    calls = []
+    lock = threading.Lock()
+
+    def attempt():
+        with lock:
+            n = len(calls)
+            calls.append(n)
+        time.sleep(delays[n])
+        return ('result', n)
+    return attempt
+
+def test_slow_primary_is_beaten_by_the_hedge(monkeypatch):
+    monkeypatch.setattr(tool_health, 'TOOL_HEDGE_MAX_RATIO', 1.0)
+    breaker = CircuitBreaker('T')
+    breaker.allow()
+    result, info = hedged(attempts(0.5, 0.0), breaker, delay=0.02)
+    assert result == ('result', 1)
+    assert info['fired'] and info['winner'] == 'hedge'
+    assert breaker.hedges == 1 and breaker.hedge_wins == 1
+
+def test_primary_can_still_win_after_the_hedge_fires(monkeypatch):
+    monkeypatch.setattr(tool_health, 'TOOL_HEDGE_MAX_RATIO', 1.0)
+    breaker = CircuitBreaker('T')
+    breaker.allow()
+    result, info = hedged(attempts(0.05, 0.5), breaker, delay=0.02)
+    assert result == ('result', 0)
+    assert info['fired'] and info['winner'] == 'primary'
+    assert breaker.hedge_wins == 0
+
+def test_hedge_over_budget_waits_for_the_primary(monkeypatch):
+    monkeypatch.setattr(tool_health, 'TOOL_HEDGE_MAX_RATIO', 0.0)
+    breaker = CircuitBreaker('T')
+    breaker.allow()
+    result, info = hedged(attempts(0.05), breaker, delay=0.01)
+    assert result == ('result', 0)
+    assert info == {'fired': False, 'delay_ms': 10.0, 'reason': 'budget'}
+
+def test_no_hedge_without_enough_samples():
+    breaker = CircuitBreaker('T')
+    assert breaker.p95() is None
+    result, info = hedged(attempts(0.0), breaker, delay=breaker.p95())
+    assert result == ('result', 0) and info['reason'] == 'not_enough_samples'
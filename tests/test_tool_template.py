@@ -0,0 +1,33 @@
+import pytest
+from utils.tool_template import compile_request
+
+def test_path_values_are_url_encoded():
+    request = compile_request('http://api.test/v1/', 'users/<user>/posts/<post>')
+    url, query, body = request.render({'user': 'a/b?c#d', 'post': 'x y', 'page': 2})
+    assert url == 'http://api.test/v1/users/a%2Fb%3Fc%23d/posts/x%20y'
+    assert query == {'page': 2} and body is None
+
+@pytest.mark.parametrize('value', ['say "hi"\n', 'back\\slash', '", "admin": true, "x": "', '$other'])
+def test_string_values_stay_inside_their_json_string(value):
+    request = compile_request('http://api.test', '/notes', '{"note": "Re: $text", "tags": ["$text"]}')
+    _, _, body = request.render({'text': value})
+    assert body == {'note': f'Re: {value}', 'tags': [value]}
+
+def test_bare_placeholders_become_json_values():
+    request = compile_request('http://api.test', '/items', '{"count": $count, "flag": $flag, "name": $name, '
+                                                           '"price": "$$5"}')
+    _, _, body = request.render({'count': '5', 'flag': True, 'name': 'not json'})
+    assert body == {'count': 5, 'flag': True, 'name': 'not json', 'price': '$5'}
+    assert request.required_params == ('count', 'flag', 'name')
+
+def test_missing_parameter_is_reported():
+    request = compile_request('http://api.test', '/items/<id>', '{"q": "$q"}')
+    with pytest.raises(ValueError, match="Missing required parameter 'id'"):
+        request.render({'q': 'x'})
+    with pytest.raises(ValueError, match="Missing required parameter 'q'"):
+        request.render({'id': 1})
+
+@pytest.mark.parametrize('template', ['{"note": "costs $5"}', '{"a": $a', '{"a": $a $b}', 'not json'])
+def test_malformed_body_templates_are_rejected(template):
+    with pytest.raises(ValueError):
+        compile_request('http://api.test', '/notes', template)
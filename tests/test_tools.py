@@ -0,0 +1,44 @@
+import json
+import pytest
+from models import Tool
+from backends.json_backend import JSONBackend
+from backends.sqlite_backend import SQLiteBackend
+from utils.tool_executor import execute_http_tool
+
+LEGACY_TOOLS = [
+    {'name': 'Legacy', 'description': 'Stored before templates were validated', 'type': 'http_api',
+     'config': {'base_url': 'http://127.0.0.1:1', 'http_method': 'POST', 'endpoint_path': '/notes',
+                'headers': {}, 'body_template': '{"note": "costs $5"}'}},
+    {'name': 'Good', 'description': 'Fine', 'type': 'http_api',
+     'config': {'base_url': 'http://127.0.0.1:1', 'http_method': 'GET', 'endpoint_path': '/items/<id>',
+                'headers': {}, 'body_template': ''}},
+]
+
+def test_tool_validate_rejects_malformed_templates():
+    tool = Tool(**json.loads(json.dumps(LEGACY_TOOLS[0])))
+    with pytest.raises(ValueError):
+        tool.validate()
+    with pytest.raises(ValueError):
+        Tool(name='H', description='h', type='http_api', config={
+            'base_url': 'http://x', 'http_method': 'GET', 'endpoint_path': '/', 'hedge': 'yes'}).validate()
+
+def check_backend(backend):
+    tools = {tool.name: tool for tool in backend.load_tools()}
+    assert set(tools) == {'Legacy', 'Good'}
+    assert tools['Legacy'].required_params == []
+    assert tools['Good'].required_params == ['id']
+    text, info = execute_http_tool(tools['Legacy'], {})
+    assert text.startswith("Error executing tool 'Legacy'") and 'error' in info
+
+def test_json_backend_loads_a_stored_tool_that_no_longer_validates(tmp_path):
+    backend = JSONBackend(str(tmp_path))
+    (tmp_path / 'tools.json').write_text(json.dumps(LEGACY_TOOLS))
+    check_backend(backend)
+
+def test_sqlite_backend_loads_a_stored_tool_that_no_longer_validates(tmp_path):
+    backend = SQLiteBackend(str(tmp_path))
+    conn = backend._conn()
+    for tool in LEGACY_TOOLS:
+        conn.execute("INSERT INTO tools (name, data) VALUES (?, ?)", (tool['name'], json.dumps(tool)))
+    check_backend(backend)
+    assert [tool.name for tool in backend.get_tools(['Legacy'])] == ['Legacy']
@@ -0,0 +1,524 @@
+import json
+import dataclasses
+import os
+import threading
+import time
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import Agent, Tool
+from utils.tool_executor import execute_http_tool
+from utils.tool_response import digest
+from utils.sessions import Session, estimate_tokens, session_store
+from utils.prompt_cache import prompt_cache
+from utils.answer_cache import answer_cache
+from utils.metrics import observe_request
+from utils.single_flight import COALESCE_COMPLETIONS, completion_flights
+from utils.rate_limit import rate_limits
+from utils.stream_json import JsonPrefixScanner
+from utils.tool_health import tool_health
+
+# Context window assumed for history trimming when the model's is unknown
+MODEL_CONTEXT_TOKENS = int(os.getenv('MODEL_CONTEXT_TOKENS', '8192'))
+
+# Retries for Groq connection errors and 5xx responses (429s are retried until the rate-limit deadline)
+GROQ_RETRIES = int(os.getenv('GROQ_RETRIES', '2'))
+
+# Start tool calls as soon as a streamed completion has produced a complete tool request,
+# instead of after the whole completion (non-streaming requests stream internally for this)
+EARLY_TOOL_DISPATCH = os.getenv('EARLY_TOOL_DISPATCH', '1') == '1'
+
+# Shared bound on concurrently running tool calls across all requests in this worker
+tool_pool = ThreadPoolExecutor(max_workers=int(os.getenv('TOOL_MAX_PARALLEL', '8')),
+                               thread_name_prefix='tool')
+
+def create_groq_client():
+    # The SDK (with httpx) is the slowest import in the app, so it waits until a client is needed
+    from groq import Groq
+    # With rate limiting on, 429s are retried by the limiter instead of inside the SDK
+    return Groq(max_retries=0 if rate_limits.enabled else 2)
+
+class _SlotStream:
+    """A streaming completion that keeps its rate limiter slot until it is exhausted or closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            try:
+                self._stream.close()
+            finally:
+                release()
+
+    def __del__(self):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def parse_tool_requests(response: str) -> Optional[List[Dict]]:
+    """Return the tool requests in a model response, or None for a plain answer.
+
+    Text after the JSON is ignored, as it is when a streamed request is dispatched early."""
+    try:
+        parsed = json.loads(JsonPrefixScanner().feed(response))
+    except (json.JSONDecodeError, TypeError):
+        return None
+    requests = parsed if isinstance(parsed, list) else [parsed]
+    if requests and all(isinstance(r, dict) and isinstance(r.get('tool'), str) and isinstance(r.get('params'), dict)
+                        for r in requests):
+        return requests
+    return None
+
+def tool_cache_hits(debug_log: List[Dict]) -> List[str]:
+    """Names of tools whose result was served from the tool response cache."""
+    return [entry['tool'] for entry in debug_log
+            if entry['event'] == 'tool_execution_completed' and entry['debug_info'].get('cache') == 'hit']
+
+def _entry(event: str, **fields) -> Dict:
+    return {'timestamp': datetime.now().isoformat(), 'event': event, **fields}
+
+def _timed_tool_call(tool: Tool, params: Dict, owner: str = '') -> Tuple[str, Dict, float]:
+    started = time.perf_counter()
+    result, debug_info = execute_http_tool(tool, params, owner)
+    return result, debug_info, time.perf_counter() - started
+
+class AgentEngine:
+    """Runs a question through an agent: completion, tool calls, follow-up completion.
+
+    The model may ask for one tool or a list of tools per step. Independent
+    tool calls run concurrently on `tool_pool`, all results are fed back in a
+    single follow-up completion, and this repeats for up to `max_steps` tool
+    rounds. `iter_ask` yields ('debug', entry) and ('token', text) events as
+    it goes and finishes with ('done', result); `ask` just returns the result."""
+
+    def __init__(self, storage, client=None, max_steps: int = None):
+        self.storage = storage
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.max_steps = max_steps or int(os.getenv('AGENT_MAX_STEPS', '3'))
+
+    @property
+    def client(self):
+        """The Groq client, created on first use when none was passed in."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = create_groq_client()
+        return self._client
+
+    def ask(self, agent: Agent, question: str, session: Optional[Session] = None,
+            owner: Optional[str] = None) -> Dict:
+        for kind, payload in self.iter_ask(agent, question, session=session, owner=owner):
+            if kind == 'done':
+                return payload
+
+    def iter_ask(self, agent: Agent, question: str, stream: bool = False,
+                 session: Optional[Session] = None, owner: Optional[str] = None) -> Iterator[Tuple[str, object]]:
+        """`owner` is who this request queues as in the rate limiters' fair queues (the agent by default)."""
+        owner = owner or agent.name
+        debug_log = []
+        tools_used = []
+
+        def debug(event, **fields):
+            entry = _entry(event, **fields)
+            debug_log.append(entry)
+            return ('debug', entry)
+
+        yield debug('request_received', question=question)
+
+        # Update agent's last active timestamp
+        self.storage.touch_agent(agent.name)
+
+        # Get available tools for the agent
+        available_tools = self.storage.get_tools(agent.tools)
+        tools_by_name = {tool.name: tool for tool in available_tools}
+        yield debug('tools_loaded', available_tools=list(tools_by_name))
+
+        tools_version = self.storage.tools_version()
+        # Tools with an open circuit breaker are marked in the prompt so the model avoids them
+        unavailable = frozenset(tool_health.unavailable(tools_by_name))
+        system_message, prompt_info = prompt_cache.get(agent, available_tools, tools_version, unavailable)
+        if unavailable:
+            prompt_info['unavailable_tools'] = sorted(unavailable)
+        yield debug('system_prompt_ready', **prompt_info)
+        history = []
+        if session is not None:
+            # Leave room for the system prompt, the question and the answer
+            budget = (MODEL_CONTEXT_TOKENS - agent.max_tokens
+                      - estimate_tokens(system_message) - estimate_tokens(question))
+            history, history_info = session_store.history(session, max(0, budget))
+            yield debug('history_loaded', session_id=session.id, budget_tokens=max(0, budget), **history_info)
+
+        messages = [
+            {"role": "system", "content": system_message},
+            *history,
+            {"role": "user", "content": question}
+        ]
+
+        # Repeated questions can be answered from the agent's answer cache (first turn only,
+        # since an answer that depends on session history can't be reused)
+        answer_cache_state = 'disabled'
+        cached = None
+        if agent.answer_cache and not history:
+            cached = answer_cache.get(agent, tools_version, question)
+            answer_cache_state = 'hit' if cached else 'miss'
+
+        if cached:
+            response = cached['response']
+            tools_used = cached['tools_used']
+            yield debug('answer_cache_hit', similarity=cached['similarity'], age_s=cached['age_s'],
+                        tools_used=tools_used)
+            if stream:
+                yield ('token', response)
+        else:
+            response = yield from self._solve(agent, messages, tools_by_name, debug, tools_used, stream, owner)
+            # Answers given while a tool was down aren't kept
+            if answer_cache_state == 'miss' and not response.startswith('Error:') and not unavailable:
+                answer_cache.put(agent, tools_version, question, response, tools_used)
+
+        tool_memory = [entry['debug_info']['memory'] for entry in debug_log
+                       if entry['event'] == 'tool_execution_completed' and 'memory' in entry['debug_info']]
+        if tool_memory:
+            yield debug('request_memory',
+                        tool_estimated_buffered_bytes=sum(m['estimated_buffered_bytes'] for m in tool_memory),
+                        process_max_rss_kb=max(m['process_max_rss_kb'] for m in tool_memory))
+
+        completions = sum(1 for entry in debug_log if entry['event'] == 'groq_api_call')
+        yield debug('prompt_savings', completions=completions,
+                    cpu_ms_saved=prompt_info.get('cpu_ms_saved', 0.0),
+                    tokens_saved=prompt_info['tokens_saved_per_call'] * completions)
+
+        log_data = {
+            'agent_name': agent.name,
+            'question': question,
+            'response': response,
+            'tools_used': tools_used,
+            'tool_cache_hits': tool_cache_hits(debug_log),
+            'answer_cache': answer_cache_state,
+            'debug_log': debug_log
+        }
+        if session is not None:
+            log_data['session_id'] = session.id
+            session_store.record(session, question, response)
+        self.storage.save_interaction_log(agent.name, log_data)
+        observe_request(agent.name, agent.model, log_data)
+
+        result = {'response': response, 'tools_used': tools_used, 'debug_log': debug_log}
+        if session is not None:
+            result['session_id'] = session.id
+        yield ('done', result)
+
+    def _solve(self, agent: Agent, messages: List[Dict], tools_by_name: Dict[str, Tool], debug,
+               tools_used: List[str], stream: bool, owner: str):
+        """Completion / tool rounds until the model answers in plain text; returns the answer."""
+        result = []
+        early = {'step': 1}
+        if agent.router_model and tools_by_name:
+            # Model cascade: the fast router model picks the tool; anything else (a plain answer,
+            # or output that doesn't parse as a request for this agent's tools) escalates
+            router = dataclasses.replace(agent, model=agent.router_model, max_tokens=agent.router_max_tokens)
+            yield from self._complete(router, messages, debug, result, context='tool_selection',
+                                      tools_by_name=tools_by_name, early=early, owner=owner)
+            response = result.pop()
+            requests = parse_tool_requests(response)
+            if requests is None or not all(r['tool'] in tools_by_name for r in requests):
+                yield debug('router_escalated', router_model=router.model, model=agent.model,
+                            reason='no_tool_request' if requests is None else 'unknown_tool')
+                early = {'step': 1}
+                yield from self._complete(agent, messages, debug, result, stream=stream, context='escalation',
+                                          tools_by_name=tools_by_name, early=early, owner=owner)
+                response = result.pop()
+        else:
+            yield from self._complete(agent, messages, debug, result, stream=stream,
+                                      tools_by_name=tools_by_name, early=early, owner=owner)
+            response = result.pop()
+
+        step = 0
+        while True:
+            tool_requests = parse_tool_requests(response)
+            if tool_requests is None:
+                yield debug('no_tool_request', response=response)
+                if stream and response.lstrip().startswith(('{', '[')):
+                    # Held back as a possible tool request, but it was a plain answer
+                    yield ('token', response)
+                return response
+            if step >= self.max_steps:
+                yield debug('step_budget_exhausted', max_steps=self.max_steps)
+                return (yield from self._final_answer(agent, messages, response, debug, stream, owner))
+            step += 1
+
+            for tool_request in tool_requests:
+                yield debug('tool_request_detected', tool_request=tool_request, step=step)
+
+            known = [r for r in tool_requests if r['tool'] in tools_by_name]
+            if not known:
+                tool_name = tool_requests[0]['tool']
+                response = f"Error: Tool '{tool_name}' not found or not available to this agent."
+                yield debug('tool_not_found', tool=tool_name)
+                if stream:
+                    yield ('token', response)
+                return response
+
+            results = yield from self._run_tools(tool_requests, tools_by_name, debug, tools_used, step, owner,
+                                                 started=early.get('futures'), dispatched_at=early.get('dispatched_at'))
+            if early.get('futures'):
+                # The tools ran while the rest of the completion was still streaming
+                tools_ms = max(future.result()[2] for future in early['futures']) * 1000
+                yield debug('early_dispatch_saved', step=step, tail_ms=early['tail_ms'],
+                            tools_ms=round(tools_ms, 1), saved_ms=round(min(early['tail_ms'], tools_ms), 1),
+                            stream_closed_early=early['closed_early'])
+
+            if len(results) == 1:
+                feedback = f"Tool execution result: {results[0]}"
+            else:
+                feedback = "Tool execution results:\n" + "\n".join(
+                    f"- {r['tool']}: {result}" for r, result in zip(tool_requests, results))
+            if step >= self.max_steps:
+                feedback += "\n\nNo more tool calls are available; answer the question now."
+
+            messages += [
+                {"role": "assistant", "content": response},
+                {"role": "user", "content": feedback}
+            ]
+            # No early dispatch once the step budget is spent: those tools would never be used
+            early = {'step': step + 1}
+            yield from self._complete(agent, messages, debug, result, stream=stream,
+                                      context='tool_result_interpretation', tools_by_name=tools_by_name,
+                                      early=early if step < self.max_steps else None, owner=owner)
+            response = result.pop()
+
+    def _final_answer(self, agent: Agent, messages: List[Dict], response: str, debug, stream: bool,
+                      owner: str):
+        """One last completion, without tools, after the step budget is spent on a tool request.
+        The raw request is never returned as the answer."""
+        result = []
+        messages = messages + [
+            {"role": "assistant", "content": response},
+            {"role": "user", "content": "No more tool calls are available. Answer the question in plain "
+                                        "text now, using only the tool results you already have."}
+        ]
+        yield from self._complete(agent, messages, debug, result, stream=stream, context='final_answer', owner=owner)
+        response = result.pop()
+        if parse_tool_requests(response) is not None:
+            response = (f"Error: The agent was still requesting tools after using all {self.max_steps} "
+                        "tool steps.")
+            yield debug('final_answer_failed', max_steps=self.max_steps)
+            if stream:
+                yield ('token', response)
+        elif stream and response.lstrip().startswith(('{', '[')):
+            # Held back as a possible tool request, but it was a plain answer
+            yield ('token', response)
+        return response
+
+    def _complete(self, agent: Agent, messages: List[Dict], debug, result: List[str],
+                  stream: bool = False, context: Optional[str] = None,
+                  tools_by_name: Optional[Dict[str, Tool]] = None, early: Optional[Dict] = None,
+                  owner: Optional[str] = None):
+        """Run one completion, appending its text to `result`.
+
+        When streaming, tokens are yielded as they arrive, except that output
+        starting like JSON is held back until it is known whether it is a
+        tool request. When `early` is given and the agent has tools, a tool
+        request is dispatched as soon as its JSON is complete: `early` (which
+        holds the step number) gets the futures, and the rest of the output
+        is discarded."""
+        owner = owner or agent.name
+        fields = {'model': agent.model, 'temperature': agent.temperature, 'max_tokens': agent.max_tokens}
+        if context:
+            fields['context'] = context
+        yield debug('groq_api_call', **fields)
+
+        coalesce = not stream and agent.temperature == 0 and COALESCE_COMPLETIONS
+        dispatch = early is not None and bool(tools_by_name) and EARLY_TOOL_DISPATCH and not coalesce
+        # Early dispatch needs the output as it is generated, so stream even for /ask
+        streamed = stream or dispatch
+
+        def create():
+            return self.create_completion(agent, messages, streamed, owner)
+
+        call_started = time.perf_counter()
+        usage = None
+        tool_json = None
+        coalescing = None
+        if coalesce:
+            # Deterministic completions with identical input share one in-flight Groq call
+            key = (agent.model, agent.max_tokens, json.dumps(messages, sort_keys=True))
+            completion, coalescing = completion_flights.do(key, create, name=agent.model)
+        else:
+            completion = create()
+
+        if not streamed:
+            response = completion.choices[0].message.content
+            usage = completion.usage
+        else:
+            parts = []
+            holding = True
+            started = time.perf_counter()
+            scanner = JsonPrefixScanner() if dispatch else None
+            try:
+                for chunk in completion:
+                    # Groq reports token usage on the final chunk
+                    x_groq = getattr(chunk, 'x_groq', None)
+                    if x_groq is not None and getattr(x_groq, 'usage', None) is not None:
+                        usage = x_groq.usage
+                    if tool_json is not None:
+                        # Already dispatched: drain the tail only until the tools are done
+                        if all(future.done() for future in early['futures']):
+                            early['closed_early'] = True
+                            break
+                        continue
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if not text:
+                        continue
+                    parts.append(text)
+                    if scanner is not None:
+                        found = scanner.feed(text)
+                        if found is not None:
+                            scanner = None
+                            requests = parse_tool_requests(found)
+                            if requests and all(r['tool'] in tools_by_name for r in requests):
+                                tool_json = found
+                                early.update(requests=requests, dispatched_at=time.perf_counter(), closed_early=False,
+                                             futures=[tool_pool.submit(_timed_tool_call, tools_by_name[r['tool']],
+                                                                       r['params'], owner) for r in requests])
+                                yield debug('tool_dispatched_early', tools=[r['tool'] for r in requests],
+                                            chars=len(found),
+                                            stream_ms=round((early['dispatched_at'] - started) * 1000, 1))
+                                for r in requests:
+                                    yield debug('tool_execution_started', tool=r['tool'], params=r['params'],
+                                                step=early['step'], early_dispatch=True)
+                                continue
+                        elif scanner.plain:
+                            scanner = None
+                    if not stream:
+                        continue
+                    if holding:
+                        so_far = ''.join(parts).lstrip()
+                        if not so_far or so_far.startswith(('{', '[')):
+                            continue
+                        holding = False
+                        text = ''.join(parts)
+                    yield ('token', text)
+            finally:
+                # Exhausted, cut short, or abandoned by our caller: give back the rate limiter slot
+                completion.close()
+            if tool_json is not None:
+                early['tail_ms'] = round((time.perf_counter() - early['dispatched_at']) * 1000, 1)
+                response = tool_json
+            else:
+                response = ''.join(parts)
+        if tool_json is None and parse_tool_requests(response) is not None:
+            # As with early dispatch, only the tool request is kept when the model wrote on after it
+            response = JsonPrefixScanner().feed(response)
+
+        response_fields = {'response': response, 'model': agent.model,
+                           'elapsed_ms': round((time.perf_counter() - call_started) * 1000, 1)}
+        if context:
+            response_fields['context'] = context
+        if coalescing is not None:
+            response_fields['coalescing'] = coalescing
+        if usage is not None and (coalescing or {}).get('role') != 'follower':
+            response_fields['usage'] = {'prompt_tokens': usage.prompt_tokens,
+                                        'completion_tokens': usage.completion_tokens}
+        elif streamed:
+            # Closed after early dispatch, before the final chunk that carries the usage
+            response_fields['usage_unknown'] = True
+        yield debug('groq_response_received', **response_fields)
+        result.append(response)
+
+    def create_completion(self, agent: Agent, messages: List[Dict], stream: bool, owner: Optional[str] = None):
+        """Call Groq through the model's rate limiter, backing off on 429s until the limiter's deadline.
+
+        A streamed completion holds its concurrency slot until it is exhausted or closed."""
+        import groq
+        limiter = rate_limits.for_model(agent.model)
+        deadline = rate_limits.deadline()
+        failures = 0
+        while True:
+            try:
+                with ExitStack() as held:
+                    held.enter_context(rate_limits.slot(limiter, owner or agent.name, deadline))
+                    raw = self.client.chat.completions.with_raw_response.create(
+                        messages=messages,
+                        model=agent.model,
+                        temperature=agent.temperature,
+                        max_tokens=agent.max_tokens,
+                        stream=stream,
+                    )
+                    if limiter:
+                        limiter.record(raw.status_code, raw.headers)
+                    completion = raw.parse()
+                    if stream:
+                        return _SlotStream(completion, held.pop_all().close)
+                    return completion
+            except groq.RateLimitError as e:
+                if limiter is None:
+                    raise
+                # The limiter now holds this model back; queue up again behind it
+                limiter.record(429, e.response.headers)
+            except (groq.APIConnectionError, groq.InternalServerError):
+                failures += 1
+                if failures > GROQ_RETRIES:
+                    raise
+                time.sleep(0.5 * 2 ** (failures - 1))
+
+    def _run_tools(self, tool_requests: List[Dict], tools_by_name: Dict[str, Tool], debug,
+                   tools_used: List[str], step: int, owner: str = '', started: Optional[List] = None,
+                   dispatched_at: Optional[float] = None):
+        """Execute a step's tool requests concurrently; returns results in request order.
+        `started` holds futures for requests already dispatched (at `dispatched_at`) while
+        the completion streamed."""
+        results = [None] * len(tool_requests)
+        futures = {}
+        batch_started = time.perf_counter()
+
+        if started:
+            # Dispatched (and logged as started) while the completion was streaming
+            tools_used.extend(tool_request['tool'] for tool_request in tool_requests)
+            futures = {future: i for i, future in enumerate(started)}
+            batch_started = dispatched_at or batch_started
+        else:
+            for i, tool_request in enumerate(tool_requests):
+                tool_name = tool_request['tool']
+                tool = tools_by_name.get(tool_name)
+                if tool is None:
+                    results[i] = f"Error: Tool '{tool_name}' not found or not available to this agent."
+                    yield debug('tool_not_found', tool=tool_name)
+                    continue
+                tools_used.append(tool_name)
+                yield debug('tool_execution_started', tool=tool_name, params=tool_request['params'], step=step)
+                if len(tool_requests) == 1:
+                    # Nothing to overlap with; skip the thread hop
+                    results[i], tool_debug, _ = _timed_tool_call(tool, tool_request['params'], owner)
+                    yield debug('tool_execution_completed', tool=tool_name, result=digest(results[i]),
+                                debug_info=tool_debug, step=step)
+                    return results
+                futures[tool_pool.submit(_timed_tool_call, tool, tool_request['params'], owner)] = i
+
+        sequential = 0.0
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i], tool_debug, elapsed = future.result()
+            sequential += elapsed
+            yield debug('tool_execution_completed', tool=tool_requests[i]['tool'], result=digest(results[i]),
+                        debug_info=tool_debug, elapsed_ms=round(elapsed * 1000, 1), step=step)
+
+        if len(tool_requests) == 1:
+            return results
+        wall_clock = time.perf_counter() - batch_started
+        yield debug('parallel_tools_completed', step=step, tool_count=len(futures),
+                    wall_clock_ms=round(wall_clock * 1000, 1),
+                    sequential_ms=round(sequential * 1000, 1),
+                    saved_ms=round(max(0.0, sequential - wall_clock) * 1000, 1))
+        return results
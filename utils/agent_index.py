@@ -0,0 +1,136 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from models import Agent, Tool
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'get', 'give',
+    'how', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'please', 'tell', 'that', 'the', 'this',
+    'to', 'what', 'when', 'where', 'which', 'who', 'why', 'with', 'you', 'your', 'about', 'some', 'any',
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with camelCase split, stopwords removed and plurals folded."""
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    tokens = []
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+class AgentIndex:
+    """BM25 keyword index over agent names, descriptions and their tools' descriptions.
+
+    Scoring walks the posting lists of the query terms only, so a lookup
+    touches the agents that share a term with the question rather than every
+    agent. Agents are added, removed or re-indexed one at a time."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Dict] = {}  # agent name -> {'length', 'tools', 'fingerprint'}
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> {agent name: term frequency}
+        self._tool_descriptions: Dict[str, str] = {}
+        self._total_length = 0
+        self._versions = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _fingerprint(agent: Agent):
+        return (agent.description, tuple(agent.tools))
+
+    def add_agent(self, agent: Agent, tools: List[Tool]):
+        terms = Counter(tokenize(agent.name) * 2 + tokenize(agent.description))
+        for tool in tools:
+            terms.update(tokenize(tool.name) + tokenize(tool.description))
+        with self._lock:
+            self.remove_agent(agent.name)
+            for tool in tools:
+                self._tool_descriptions[tool.name] = tool.description
+            length = sum(terms.values())
+            self._docs[agent.name] = {'length': length, 'terms': list(terms),
+                                      'tools': [tool.name for tool in tools],
+                                      'fingerprint': self._fingerprint(agent)}
+            self._total_length += length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[agent.name] = tf
+
+    def remove_agent(self, name: str):
+        with self._lock:
+            doc = self._docs.pop(name, None)
+            if doc is None:
+                return
+            self._total_length -= doc['length']
+            for term in doc['terms']:
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(name, None)
+                    if not posting:
+                        del self._postings[term]
+
+    def agents_using_tool(self, tool_name: str) -> List[str]:
+        with self._lock:
+            return [name for name, doc in self._docs.items() if tool_name in doc['tools']]
+
+    def sync(self, storage):
+        """Bring the index in line with storage, re-indexing only agents whose text changed.
+
+        Cheap when nothing changed (two version checks); otherwise a diff over
+        the agent list, which also picks up edits made by other workers."""
+        versions = (storage.agents_version(), storage.tools_version())
+        if versions == self._versions:
+            return
+        with self._lock:
+            stale = set()
+            if self._versions is None or versions[1] != self._versions[1]:
+                for tool in storage.load_tools():
+                    if self._tool_descriptions.get(tool.name, tool.description) != tool.description:
+                        stale.update(self.agents_using_tool(tool.name))
+                    self._tool_descriptions[tool.name] = tool.description
+
+            agents = storage.load_agents()
+            current = {agent.name for agent in agents}
+            for name in [name for name in self._docs if name not in current]:
+                self.remove_agent(name)
+            for agent in agents:
+                doc = self._docs.get(agent.name)
+                if doc is None or agent.name in stale or doc['fingerprint'] != self._fingerprint(agent):
+                    self.add_agent(agent, storage.get_tools(agent.tools))
+            self._versions = versions
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Top-k (agent name, BM25 score) pairs for the query, best first; only agents with a match."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            avg_length = self._total_length / n or 1.0
+            scores: Dict[str, float] = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for name, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._docs[name]['length'] / avg_length)
+                    scores[name] = scores.get(name, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+def confident_pick(ranked: List[Tuple[str, float]], min_score: float, ratio: float) -> Optional[str]:
+    """The top agent if it clearly beats the runner-up, else None."""
+    if not ranked or ranked[0][1] < min_score:
+        return None
+    if len(ranked) == 1 or ranked[0][1] >= ratio * ranked[1][1]:
+        return ranked[0][0]
+    return None
+
+agent_index = AgentIndex()
@@ -0,0 +1,194 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+from models import Agent
+
+# Unlike the recommendation index's stopwords, these keep interrogatives (when/where/who/...)
+# and negations, which change what a question asks for
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'could', 'do', 'does', 'did', 'for', 'from',
+    'give', 'i', 'in', 'is', 'it', 'me', 'my', 'of', 'on', 'or', 'please', 'tell', 'that', 'the', 'this',
+    'to', 'was', 'were', 'with', 'you', 'your', 'about', 'some', 'any',
+}
+
+def normalize_question(question: str) -> str:
+    return ' '.join(re.findall(r'\w+', question.lower()))
+
+def question_terms(question: str) -> List[str]:
+    """Terms for similarity matching: lowercase words, plurals folded, contractions like
+    "isn't" split into the word and "not", and possessives dropped."""
+    terms = []
+    for word in re.findall(r"[a-z0-9]+(?:'[a-z]+)?", question.lower()):
+        if word.endswith("n't"):
+            word, negation = word[:-3], 'not'
+        else:
+            word, negation = word.split("'")[0], None
+        if word and word not in STOPWORDS:
+            if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            terms.append(word)
+        if negation:
+            terms.append(negation)
+    return terms
+
+def _vector(question: str) -> Dict[str, float]:
+    counts = Counter(question_terms(question))
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {term: v / norm for term, v in counts.items()}
+
+class _AgentAnswers:
+    """One agent's cached answers: LRU + TTL, with an inverted index for similarity lookups."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Tuple, Dict]' = OrderedDict()
+        self.postings: Dict[Tuple, Dict[str, set]] = {}  # fingerprint -> term -> keys
+
+    def _remove(self, key: Tuple):
+        entry = self.entries.pop(key)
+        postings = self.postings.get(key[0], {})
+        for term in entry['vector']:
+            keys = postings.get(term)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del postings[term]
+        # Fingerprints of an older tools version or agent config are never looked up again
+        if not postings:
+            self.postings.pop(key[0], None)
+
+    def _expire(self, now: float) -> int:
+        expired = [key for key, entry in self.entries.items() if entry['expires_at'] <= now]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def get(self, fingerprint: Tuple, question: str, threshold: Optional[float]):
+        now = time.monotonic()
+        key = (fingerprint, normalize_question(question))
+        entry = self.entries.get(key)
+        similarity = 1.0
+        if entry is None and threshold:
+            # Only entries sharing at least one term with the question can be similar
+            vector = _vector(question)
+            postings = self.postings.get(fingerprint, {})
+            candidates = set().union(*(postings.get(term, ()) for term in vector)) if vector else set()
+            best = None
+            for candidate in candidates:
+                if self.entries[candidate]['expires_at'] <= now:
+                    continue
+                other = self.entries[candidate]['vector']
+                score = sum(weight * other.get(term, 0.0) for term, weight in vector.items())
+                if score >= threshold and (best is None or score > best[0]):
+                    best = (score, candidate)
+            if best:
+                similarity, key = best
+                entry = self.entries[key]
+        if entry is None:
+            return None, 'miss'
+        if entry['expires_at'] <= now:
+            self._remove(key)
+            return None, 'expired'
+        self.entries.move_to_end(key)
+        return {**entry['value'], 'similarity': round(similarity, 3),
+                'age_s': round(now - entry['stored_at'], 1)}, 'hit'
+
+    def put(self, fingerprint: Tuple, question: str, value: Dict) -> Tuple[int, int]:
+        """Store an answer; returns (evicted, expired) entry counts."""
+        key = (fingerprint, normalize_question(question))
+        if key in self.entries:
+            self._remove(key)
+        now = time.monotonic()
+        # Expired entries are otherwise only dropped when the same question comes back
+        expired = self._expire(now)
+        vector = _vector(question)
+        self.entries[key] = {'value': value, 'vector': vector, 'stored_at': now, 'expires_at': now + self.ttl}
+        postings = self.postings.setdefault(fingerprint, {})
+        for term in vector:
+            postings.setdefault(term, set()).add(key)
+        evicted = 0
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+            evicted += 1
+        return evicted, expired
+
+class AnswerCache:
+    """Per-agent cache of final answers, enabled with `answer_cache` on the agent:
+
+        "answer_cache": {"ttl": 300, "max_entries": 256, "similarity_threshold": 0.9}
+
+    Entries are keyed on the agent's model, temperature, max_tokens, tool list
+    and the tool registry version plus the normalized question, so changing any
+    of those makes old answers unreachable. Without a similarity_threshold
+    only exact (normalized) matches hit."""
+
+    def __init__(self):
+        self._agents: Dict[str, _AgentAnswers] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def fingerprint(agent: Agent, tools_version: str) -> Tuple:
+        return (agent.model, agent.temperature, agent.max_tokens, tuple(agent.tools), tools_version)
+
+    def _answers(self, agent: Agent) -> Optional[_AgentAnswers]:
+        config = agent.answer_cache
+        if not config:
+            return None
+        ttl = float(config.get('ttl', 300))
+        max_entries = int(config.get('max_entries', 256))
+        answers = self._agents.get(agent.name)
+        if answers is None or (answers.ttl, answers.max_entries) != (ttl, max_entries):
+            answers = self._agents[agent.name] = _AgentAnswers(ttl, max_entries)
+        return answers
+
+    def get(self, agent: Agent, tools_version: str, question: str) -> Optional[Dict]:
+        with self._lock:
+            answers = self._answers(agent)
+            if answers is None:
+                return None
+            threshold = agent.answer_cache.get('similarity_threshold')
+            value, outcome = answers.get(self.fingerprint(agent, tools_version), question,
+                                         float(threshold) if threshold else None)
+            if outcome == 'hit':
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.expirations += outcome == 'expired'
+            return value
+
+    def put(self, agent: Agent, tools_version: str, question: str, response: str, tools_used):
+        with self._lock:
+            answers = self._answers(agent)
+            if answers is None:
+                return
+            evicted, expired = answers.put(self.fingerprint(agent, tools_version), question,
+                                           {'response': response, 'tools_used': list(tools_used)})
+            self.evictions += evicted
+            self.expirations += expired
+
+    def invalidate_agent(self, agent_name: str):
+        with self._lock:
+            self._agents.pop(agent_name, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'agents': len(self._agents),
+                'entries': sum(len(answers.entries) for answers in self._agents.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+answer_cache = AnswerCache()
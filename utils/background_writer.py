@@ -0,0 +1,93 @@
+import atexit
+import os
+import queue
+import threading
+from typing import Callable, List, Optional
+
+class BackgroundWriter:
+    """Hands items to `write(batch)` on a background thread, through a bounded queue.
+
+    The thread is started on first use in each process, and again after a fork
+    (gunicorn --preload), since threads don't survive one. `submit` never blocks:
+    when the queue is full, or with `background=False`, the item is written on the
+    caller's thread. Items should be snapshots (serialized or otherwise immutable),
+    since they are written after `submit` returns. Pending items are written on
+    interpreter exit."""
+
+    def __init__(self, write: Callable[[List], None], name: str, queue_size: int = 10000,
+                 background: bool = True, batch_size: int = 256, on_start: Optional[Callable[[], None]] = None):
+        self.write = write
+        self.name = name
+        self.queue_size = queue_size
+        self.background = background
+        self.batch_size = batch_size
+        # Called in each process before its thread starts, e.g. to replace locks inherited from a fork
+        self.on_start = on_start
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.sync_writes = 0
+        if background:
+            atexit.register(self.close)
+
+    def submit(self, item):
+        if not self.background:
+            self.write([item])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.sync_writes += 1
+            self.write([item])
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # The parent's queue may have been in use by its thread at fork time
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            if self.on_start is not None:
+                self.on_start()
+            self._thread = threading.Thread(target=self._drain, name=self.name, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not None]
+            try:
+                if items:
+                    self.write(items)
+            except Exception as e:
+                print(f"Error in {self.name}: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if None in batch:
+                return
+
+    def running(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every submitted item has been written."""
+        if self.running():
+            self._queue.join()
+
+    def close(self):
+        if self.running():
+            self._queue.put(None)
+            self._thread.join(timeout=30)
@@ -0,0 +1,60 @@
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List
+
+# Shared by all batches and separate from the request workers and tool_pool, so batch
+# jobs together can never hold more than BATCH_MAX_WORKERS questions in flight
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '8'))
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '10000'))
+BATCH_DEFAULT_DEADLINE = float(os.getenv('BATCH_DEFAULT_DEADLINE', '600'))
+
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+def run_batch(items: List[Dict], run_item: Callable[[Dict], Dict], concurrency: int,
+              deadline: float) -> Iterator[Dict]:
+    """Run `run_item` over items with at most `concurrency` in flight, yielding results in
+    completion order. Items not finished `deadline` seconds in are reported as errors."""
+    concurrency = max(1, min(concurrency, BATCH_MAX_WORKERS))
+    expires = time.monotonic() + deadline
+    done: 'queue.Queue[Dict]' = queue.Queue()
+    pending = iter(enumerate(items))
+    in_flight = set()
+
+    def execute(index, item):
+        started = time.perf_counter()
+        try:
+            result = {'index': index, **run_item(item), 'error': None}
+        except Exception as e:
+            result = {'index': index, 'error': str(e)}
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        done.put(result)
+
+    def submit_next():
+        for index, item in pending:
+            in_flight.add(index)
+            batch_pool.submit(execute, index, item)
+            return True
+        return False
+
+    for _ in range(concurrency):
+        if not submit_next():
+            break
+
+    while in_flight:
+        try:
+            result = done.get(timeout=max(0.0, expires - time.monotonic()))
+        except queue.Empty:
+            break
+        in_flight.discard(result['index'])
+        yield result
+        if time.monotonic() < expires:
+            submit_next()
+
+    # Past the deadline: report what is still running or never started (running
+    # items finish in the background but their results are dropped)
+    for index in sorted(in_flight):
+        yield {'index': index, 'error': 'Batch deadline exceeded while running', 'elapsed_ms': None}
+    for index, _ in pending:
+        yield {'index': index, 'error': 'Batch deadline exceeded before start', 'elapsed_ms': None}
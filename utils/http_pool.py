@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+class PoolStats:
+    """Counters for one host's connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.acquired = 0
+        self.new_connections = 0
+        self.wait_time = 0.0
+        self.errors = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'connection_hits': max(0, self.acquired - self.new_connections),
+                'new_connections': self.new_connections,
+                'wait_time_ms': round(self.wait_time * 1000, 3),
+                'errors': self.errors,
+            }
+
+def _timed_pool_classes(stats: PoolStats):
+    """urllib3 pool classes that report connection reuse and checkout wait time into `stats`."""
+
+    class TimedPoolMixin:
+        def _get_conn(self, timeout=None):
+            start = time.perf_counter()
+            try:
+                return super()._get_conn(timeout)
+            finally:
+                stats.add(acquired=1, wait_time=time.perf_counter() - start)
+
+        def _new_conn(self):
+            stats.add(new_connections=1)
+            return super()._new_conn()
+
+    class TimedHTTPConnectionPool(TimedPoolMixin, HTTPConnectionPool):
+        pass
+
+    class TimedHTTPSConnectionPool(TimedPoolMixin, HTTPSConnectionPool):
+        pass
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+class _StatsAdapter(HTTPAdapter):
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _timed_pool_classes(self.stats)
+
+class HttpPool:
+    """Shared keep-alive sessions for tool calls, one connection pool per base_url host.
+
+    Each host gets at most `pool_maxsize` connections (callers wait for a free
+    one), connect/read timeouts, and retry-with-backoff for idempotent methods
+    on connection errors and 502/503/504."""
+
+    def __init__(self, pool_maxsize: int = 10, connect_timeout: float = 3.05,
+                 read_timeout: float = 30.0, retries: int = 2, backoff_factor: float = 0.3):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, PoolStats] = {}
+        self._pid = os.getpid()
+
+    @classmethod
+    def from_env(cls) -> 'HttpPool':
+        return cls(
+            pool_maxsize=int(os.getenv('TOOL_POOL_MAXSIZE', '10')),
+            connect_timeout=float(os.getenv('TOOL_CONNECT_TIMEOUT', '3.05')),
+            read_timeout=float(os.getenv('TOOL_READ_TIMEOUT', '30')),
+            retries=int(os.getenv('TOOL_RETRIES', '2')),
+            backoff_factor=float(os.getenv('TOOL_RETRY_BACKOFF', '0.3')),
+        )
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _new_session(self, stats: PoolStats) -> requests.Session:
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # idempotent methods only
+            raise_on_status=False,
+        )
+        adapter = _StatsAdapter(stats, pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                pool_block=True, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url: str) -> Tuple[requests.Session, PoolStats]:
+        key = self.host_key(url)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Sockets inherited across fork must not be shared with the parent
+                self._sessions.clear()
+                self._pid = os.getpid()
+            session = self._sessions.get(key)
+            if session is None:
+                stats = self._stats.setdefault(key, PoolStats())
+                session = self._sessions[key] = self._new_session(stats)
+            return session, self._stats[key]
+
+    def request(self, method: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        session, stats = self.session_for(url)
+        stats.add(requests=1)
+        try:
+            return session.request(method=method, url=url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            stats.add(errors=1)
+            raise
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            items = list(self._stats.items())
+        return {host: stats.to_dict() for host, stats in items}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+def tool_timeout(config: Dict) -> Optional[Tuple[float, float]]:
+    """Per-tool timeout override from the tool config: a number or {"connect": .., "read": ..}."""
+    timeout = config.get('timeout')
+    if timeout is None:
+        return None
+    if isinstance(timeout, dict):
+        return (float(timeout.get('connect', http_pool.timeout[0])),
+                float(timeout.get('read', http_pool.timeout[1])))
+    return (float(timeout), float(timeout))
+
+http_pool = HttpPool.from_env()
@@ -0,0 +1,346 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+from utils.rate_limit import RateLimitExceeded
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    agent TEXT NOT NULL,
+    question TEXT NOT NULL,
+    session_id TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat REAL,
+    owner TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (status, priority DESC, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_agent ON jobs (status, agent);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+"""
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_AGENT_CONCURRENCY = int(os.getenv('JOB_AGENT_CONCURRENCY', '2'))
+JOB_MAX_QUEUED = int(os.getenv('JOB_MAX_QUEUED', '10000'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', '86400'))
+# Running jobs whose owner hasn't sent a heartbeat for JOB_STALE_AFTER seconds (a
+# worker that was killed or restarted) go back to the queue
+JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '5'))
+JOB_STALE_AFTER = float(os.getenv('JOB_STALE_AFTER', '30'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.5'))
+
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    pass
+
+class QueueFull(Exception):
+    pass
+
+class JobQueue:
+    """Background /ask jobs in SQLite, shared by every worker process.
+
+    Jobs are claimed highest priority first (then oldest), skipping agents that
+    already have `agent_concurrency` jobs running in any worker, so one busy
+    agent can't take every slot. Claiming is one IMMEDIATE transaction, so two
+    workers never run the same job."""
+
+    def __init__(self, db_path: str, agent_concurrency: int = JOB_AGENT_CONCURRENCY,
+                 max_queued: int = JOB_MAX_QUEUED):
+        self.db_path = db_path
+        self.agent_concurrency = agent_concurrency
+        self.max_queued = max_queued
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row, with_result: bool = True) -> Dict:
+        job = {
+            'job_id': row['id'],
+            'agent': row['agent'],
+            'question': row['question'],
+            'session_id': row['session_id'],
+            'priority': row['priority'],
+            'status': row['status'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'attempts': row['attempts'],
+            'cancel_requested': bool(row['cancel_requested']),
+            'error': row['error'],
+        }
+        if with_result:
+            job['result'] = json.loads(row['result']) if row['result'] else None
+        return job
+
+    def submit(self, agent: str, question: str, session_id: Optional[str] = None, priority: int = 0) -> Dict:
+        conn = self._conn()
+        job_id = uuid.uuid4().hex
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFull(f"Job queue is full ({queued} queued)")
+            conn.execute(
+                "INSERT INTO jobs (id, agent, question, session_id, priority, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, agent, question, session_id, priority, time.time()))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, status: Optional[str] = None, agent: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if agent:
+            clauses.append("agent = ?")
+            args.append(agent)
+        sql = "SELECT * FROM jobs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY seq DESC LIMIT ?"
+        args.append(limit)
+        return [self._to_dict(row, with_result=False) for row in self._conn().execute(sql, args)]
+
+    def claim(self, owner: str) -> Optional[Dict]:
+        """Mark the next runnable job as running by `owner` and return it, or None."""
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs j WHERE status = 'queued' AND not_before <= ? "
+                "AND (SELECT COUNT(*) FROM jobs r WHERE r.status = 'running' AND r.agent = j.agent) < ? "
+                "ORDER BY priority DESC, seq LIMIT 1",
+                (now, self.agent_concurrency)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, started_at = ?, heartbeat = ?, "
+                "attempts = attempts + 1 WHERE seq = ?",
+                (owner, now, now, row['seq']))
+        job = self._to_dict(row, with_result=False)
+        job.update(status='running', started_at=now, attempts=row['attempts'] + 1)
+        return job
+
+    def heartbeat(self, owner: str, job_ids: List[str]):
+        if not job_ids:
+            return
+        placeholders = ', '.join('?' * len(job_ids))
+        self._conn().execute(
+            f"UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = 'running' AND id IN ({placeholders})",
+            (time.time(), owner, *job_ids))
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._conn().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued job at once; a running job is flagged and stops at its next step."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+                         "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        return self.get(job_id)
+
+    def finish(self, job_id: str, owner: str, status: str, result: Optional[Dict] = None,
+               error: Optional[str] = None):
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, heartbeat = NULL "
+            "WHERE id = ? AND owner = ? AND status = 'running'",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, owner))
+
+    def retry_later(self, job_id: str, owner: str, delay: float, error: str):
+        """Put a running job back in the queue without counting the attempt (e.g. rate limited)."""
+        self._conn().execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, heartbeat = NULL, not_before = ?, "
+            "attempts = attempts - 1, error = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (time.time() + delay, error, job_id, owner))
+
+    def recover(self, stale_after: float = JOB_STALE_AFTER, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Requeue running jobs whose worker stopped sending heartbeats; returns how many.
+
+        Jobs that have already been tried `max_attempts` times fail instead."""
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Worker stopped while running the job' "
+                "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                (now, now - stale_after, max_attempts))
+            requeued = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN cancel_requested THEN 'cancelled' ELSE 'queued' END, "
+                "finished_at = CASE WHEN cancel_requested THEN ? END, owner = NULL, heartbeat = NULL "
+                "WHERE status = 'running' AND heartbeat < ?",
+                (now, now - stale_after)).rowcount
+        return requeued
+
+    def purge(self, older_than: float = JOB_RETENTION) -> int:
+        """Delete finished jobs (and their results) older than `older_than` seconds."""
+        placeholders = ', '.join('?' * len(FINISHED))
+        return self._conn().execute(
+            f"DELETE FROM jobs WHERE status IN ({placeholders}) AND finished_at < ?",
+            (*FINISHED, time.time() - older_than)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+class JobRunner:
+    """A bounded pool of threads that claim jobs from a JobQueue and run them.
+
+    `execute(job, check_cancelled)` runs one job and returns its result;
+    it should call `check_cancelled()` between steps, which raises JobCancelled
+    once the job has been cancelled. Threads are started per process, so under
+    gunicorn every worker (not the preloading master) gets its own pool."""
+
+    def __init__(self, jobs: JobQueue, execute: Callable[[Dict, Callable[[], None]], Dict],
+                 workers: int = JOB_WORKERS):
+        self.jobs = jobs
+        self.execute = execute
+        self.workers = workers
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._running: Dict[str, str] = {}  # job id -> owner
+        self._finished = threading.Condition()
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.recovered = 0
+
+    def ensure_started(self):
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._running = {}
+            self.recovered += self.jobs.recover()
+            for index in range(self.workers):
+                threading.Thread(target=self._work, args=(f"{os.getpid()}-{index}-{uuid.uuid4().hex[:6]}",),
+                                 name=f'job-{index}', daemon=True).start()
+            threading.Thread(target=self._maintain, name='job-heartbeat', daemon=True).start()
+
+    def notify(self):
+        """Wake an idle thread of this process (jobs submitted elsewhere are found by polling)."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Return the job once it has finished, or as it is after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.jobs.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in FINISHED or remaining <= 0:
+                return job
+            with self._finished:
+                self._finished.wait(min(remaining, JOB_POLL_INTERVAL))
+
+    def _work(self, owner: str):
+        while True:
+            try:
+                job = self.jobs.claim(owner)
+            except Exception as e:
+                print(f"Error claiming job: {str(e)}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(JOB_POLL_INTERVAL)
+                continue
+            with self._lock:
+                self._running[job['job_id']] = owner
+            try:
+                self._run(job, owner)
+            finally:
+                with self._lock:
+                    self._running.pop(job['job_id'], None)
+                with self._finished:
+                    self._finished.notify_all()
+
+    def _run(self, job: Dict, owner: str):
+        job_id = job['job_id']
+        last_check = [0.0]
+
+        def check_cancelled():
+            # A cancel may come through any worker, so it's read back from the queue
+            now = time.monotonic()
+            if now - last_check[0] < JOB_POLL_INTERVAL:
+                return
+            last_check[0] = now
+            if self.jobs.cancel_requested(job_id):
+                raise JobCancelled()
+
+        try:
+            result = self.execute(job, check_cancelled)
+            self.jobs.finish(job_id, owner, 'succeeded', result=result)
+            self.completed += 1
+        except JobCancelled:
+            self.jobs.finish(job_id, owner, 'cancelled', error='Cancelled')
+            self.cancelled += 1
+        except RateLimitExceeded as e:
+            self.jobs.retry_later(job_id, owner, e.retry_after, str(e))
+        except Exception as e:
+            print(f"Error running job {job_id}: {str(e)}")
+            self.jobs.finish(job_id, owner, 'failed', error=str(e))
+            self.failed += 1
+
+    def _maintain(self):
+        last_purge = 0.0
+        while True:
+            time.sleep(JOB_HEARTBEAT_INTERVAL)
+            try:
+                with self._lock:
+                    by_owner: Dict[str, List[str]] = {}
+                    for job_id, owner in self._running.items():
+                        by_owner.setdefault(owner, []).append(job_id)
+                for owner, job_ids in by_owner.items():
+                    self.jobs.heartbeat(owner, job_ids)
+                self.recovered += self.jobs.recover()
+                if time.monotonic() - last_purge > 600:
+                    self.jobs.purge()
+                    last_purge = time.monotonic()
+            except Exception as e:
+                print(f"Error in job maintenance: {str(e)}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running_here = len(self._running)
+        return {'workers': self.workers, 'agent_concurrency': self.jobs.agent_concurrency,
+                'running_in_worker': running_here, 'completed': self.completed, 'failed': self.failed,
+                'cancelled': self.cancelled, 'recovered': self.recovered, 'queue': self.jobs.counts()}
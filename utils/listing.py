@@ -0,0 +1,131 @@
+import bisect
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from flask import Response, current_app, jsonify, request
+
+MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', '1000'))
+
+class ListQuery:
+    """Pagination, name-prefix filter and field projection for a registry listing."""
+
+    def __init__(self, limit: Optional[int] = None, cursor: Optional[str] = None, prefix: str = '',
+                 fields: Optional[Tuple[str, ...]] = None):
+        if limit is not None and limit <= 0:
+            raise ValueError("'limit' must be a positive integer")
+        self.limit = min(limit, MAX_PAGE_SIZE) if limit is not None else None
+        self.cursor = cursor or None
+        self.prefix = prefix or ''
+        self.fields = fields
+
+    @classmethod
+    def from_args(cls, args, allowed_fields: Sequence[str]) -> 'ListQuery':
+        """Parse ?limit=&cursor=&prefix=&fields=a,b from request args; raises ValueError."""
+        limit = args.get('limit')
+        fields = args.get('fields')
+        if fields:
+            fields = tuple(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+            unknown = [f for f in fields if f not in allowed_fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(allowed_fields)}")
+        return cls(limit=int(limit) if limit else None, cursor=args.get('cursor'),
+                   prefix=args.get('prefix', ''), fields=fields or None)
+
+    def key(self) -> Tuple:
+        return (self.limit, self.cursor, self.prefix, self.fields)
+
+    def etag(self, kind: str, version: str) -> str:
+        digest = hashlib.sha1(repr((kind, version, self.key())).encode()).hexdigest()[:16]
+        return f'"{digest}"'
+
+class ListingCache:
+    """Serialized /agents and /tools pages per registry version.
+
+    Records are sorted by name once per version; each distinct query's
+    response body is then kept (LRU) until the registry changes, so
+    repeated listings are served without loading or serializing anything."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._records: Dict[str, Tuple[str, List[str], List[Dict]]] = {}
+        self._pages: 'OrderedDict[Tuple, Tuple[str, Optional[str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _sorted(self, kind: str, version: str, load: Callable[[], List[Dict]]) -> Tuple[List[str], List[Dict]]:
+        with self._lock:
+            cached = self._records.get(kind)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+        records = sorted(load(), key=lambda record: record['name'])
+        names = [record['name'] for record in records]
+        with self._lock:
+            self._records[kind] = (version, names, records)
+            # Pages of the previous version can't be requested with a matching ETag any more
+            for key in [key for key in self._pages if key[0] == kind and key[1] != version]:
+                del self._pages[key]
+        return names, records
+
+    def page(self, kind: str, version: str, query: ListQuery, load: Callable[[], List[Dict]],
+             dumps: Callable[[object], str]) -> Tuple[str, Optional[str]]:
+        """Return (JSON body, next cursor) for one page of the listing at this version."""
+        key = (kind, version, query.key())
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        names, records = self._sorted(kind, version, load)
+        # Names are sorted, so the prefix and the cursor both mark out one contiguous range
+        start = bisect.bisect_left(names, query.prefix)
+        if query.cursor is not None:
+            start = max(start, bisect.bisect_right(names, query.cursor))
+        end = bisect.bisect_left(names, query.prefix + '\U0010ffff') if query.prefix else len(names)
+        stop = min(end, start + query.limit) if query.limit is not None else end
+        selected = records[start:stop]
+        if query.fields:
+            selected = [{field: record.get(field) for field in query.fields} for record in selected]
+        entry = (dumps(selected), names[stop - 1] if stop < end else None)
+
+        with self._lock:
+            self.misses += 1
+            self._pages[key] = entry
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return entry
+
+    def note_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._pages), 'hits': self.hits, 'misses': self.misses,
+                    'not_modified': self.not_modified}
+
+listing_cache = ListingCache()
+
+def listing_response(kind: str, version: str, load: Callable[[], List[Dict]], fields: Sequence[str]):
+    """Serve GET /agents or /tools: 304 when the client's ETag still matches the registry
+    version, otherwise the (cached) page with its ETag and an X-Next-Cursor header."""
+    try:
+        query = ListQuery.from_args(request.args, fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    etag = query.etag(kind, version)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        listing_cache.note_not_modified()
+        return Response(status=304, headers=headers)
+
+    body, next_cursor = listing_cache.page(kind, version, query, load, current_app.json.dumps)
+    if next_cursor is not None:
+        headers['X-Next-Cursor'] = next_cursor
+    return Response(body, mimetype='application/json', headers=headers)
@@ -0,0 +1,340 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from utils.background_writer import BackgroundWriter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    agent TEXT NOT NULL,
+    error INTEGER NOT NULL,
+    total_ms REAL,
+    question TEXT,
+    response TEXT,
+    tools TEXT,
+    session_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_agent ON interactions (agent, id);
+CREATE INDEX IF NOT EXISTS idx_interactions_ts ON interactions (ts);
+CREATE INDEX IF NOT EXISTS idx_interactions_error ON interactions (error, id);
+CREATE TABLE IF NOT EXISTS interaction_tools (
+    interaction_id INTEGER NOT NULL,
+    tool TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interaction_tools ON interaction_tools (tool, interaction_id);
+CREATE TABLE IF NOT EXISTS stage_rollups (
+    resolution INTEGER NOT NULL,
+    period INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    error INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    total_ms REAL NOT NULL,
+    PRIMARY KEY (resolution, period, agent, stage, tool, error, bucket)
+);
+"""
+
+# Rollups are kept per hour (for the edges of a time range) and per day (for the rest)
+HOUR = 3600
+DAY = 86400
+
+# Latency histogram buckets grow by 2^(1/4) (~19%), starting at 0.1 ms
+BUCKET_BASE = 2 ** 0.25
+BUCKET_MIN_MS = 0.1
+
+def bucket_for(ms: float) -> int:
+    return max(0, int(math.log(max(ms, BUCKET_MIN_MS) / BUCKET_MIN_MS, BUCKET_BASE)))
+
+def bucket_value(bucket: int) -> float:
+    """Representative latency of a bucket (its geometric midpoint)."""
+    return BUCKET_MIN_MS * BUCKET_BASE ** (bucket + 0.5)
+
+def _ts(value: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def stage_timings(debug_log: List[Dict]) -> List[Tuple[str, str, float]]:
+    """(stage, tool, milliseconds) spans derived from the timestamps already in a debug_log."""
+    spans = []
+    events = [(entry.get('event'), _ts(entry.get('timestamp')), entry) for entry in debug_log]
+    events = [e for e in events if e[1] is not None]
+    if not events:
+        return spans
+
+    open_groq = None
+    open_tools: Dict[str, List[float]] = {}
+    request_start = events[0][1]
+    for event, ts, entry in events:
+        if event == 'tools_loaded':
+            spans.append(('storage_load', '', (ts - request_start) * 1000))
+        elif event == 'system_prompt_ready':
+            spans.append(('prompt_build', '', entry.get('build_ms', entry.get('lookup_ms', 0.0))))
+        elif event == 'groq_api_call':
+            open_groq = (ts, entry.get('context', 'tool_selection'))
+        elif event == 'groq_response_received' and open_groq:
+            spans.append(('groq_call', open_groq[1], (ts - open_groq[0]) * 1000))
+            open_groq = None
+        elif event == 'tool_execution_started':
+            open_tools.setdefault(entry.get('tool', ''), []).append(ts)
+        elif event == 'tool_execution_completed':
+            starts = open_tools.get(entry.get('tool', ''))
+            if starts:
+                spans.append(('tool_call', entry.get('tool', ''), (ts - starts.pop(0)) * 1000))
+    spans.append(('total', '', (events[-1][1] - request_start) * 1000))
+    return spans
+
+def is_error(log: Dict) -> bool:
+    if str(log.get('response', '')).startswith('Error'):
+        return True
+    for entry in log.get('debug_log', []):
+        if entry.get('event') == 'tool_not_found':
+            return True
+        info = entry.get('debug_info') or {}
+        if info.get('error') or (info.get('response') or {}).get('status_code', 200) >= 400:
+            return True
+    return False
+
+class LogAnalytics:
+    """Query and aggregate interaction history from summaries written alongside each log.
+
+    Every saved log adds one `interactions` row (indexed by agent, time and error
+    status), its tools, and increments hourly and daily latency histogram
+    rollups for each stage. Listing walks an index with keyset pagination; aggregate stats
+    read only rollup rows, so they stay fast however many logs there are.
+
+    `record` summarizes the log on the caller's thread and hands the rows to a
+    background writer (one per process, started on first use) that inserts them in
+    batches; when its queue is full the rows are written directly."""
+
+    def __init__(self, db_path: str, background: bool = True, queue_size: int = 10000):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        self._writer = BackgroundWriter(self._write, 'log-analytics-writer', queue_size=queue_size,
+                                        background=background)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, agent_name: str, log: Dict):
+        """Index one interaction log (in the background unless `background=False`)."""
+        self._writer.submit(self._summarize(agent_name, log))
+
+    def record_many(self, logs):
+        """Index logs synchronously in one transaction (imports and rebuilds)."""
+        self._write([self._summarize(agent_name, log) for agent_name, log in logs])
+
+    @staticmethod
+    def _summarize(agent_name: str, log: Dict) -> Tuple:
+        """The rows for one log, computed up front so nothing is read from `log` later."""
+        ts = _ts(log.get('timestamp')) or datetime.now().timestamp()
+        error = int(is_error(log))
+        spans = stage_timings(log.get('debug_log', []))
+        total_ms = next((ms for stage, _, ms in spans if stage == 'total'), None)
+        tools = list(log.get('tools_used', []))
+        interaction = (ts, agent_name, error, total_ms, str(log.get('question', ''))[:500],
+                       str(log.get('response', ''))[:500], json.dumps(tools), log.get('session_id'))
+        rollups = [(resolution, int(ts // resolution), agent_name, stage, tool, error, bucket_for(ms), ms)
+                   for resolution in (HOUR, DAY) for stage, tool, ms in spans]
+        return interaction, sorted(set(tools)), rollups
+
+    def _write(self, summaries: List[Tuple]):
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for interaction, tools, rollups in summaries:
+                cursor = conn.execute(
+                    "INSERT INTO interactions (ts, agent, error, total_ms, question, response, tools, session_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", interaction)
+                conn.executemany("INSERT INTO interaction_tools (interaction_id, tool) VALUES (?, ?)",
+                                 [(cursor.lastrowid, tool) for tool in tools])
+                conn.executemany(
+                    "INSERT INTO stage_rollups (resolution, period, agent, stage, tool, error, bucket, count, total_ms) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?) "
+                    "ON CONFLICT (resolution, period, agent, stage, tool, error, bucket) "
+                    "DO UPDATE SET count = count + 1, total_ms = total_ms + excluded.total_ms",
+                    rollups)
+
+    def flush(self):
+        """Block until every queued log has been indexed."""
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+    @staticmethod
+    def _filters(agent=None, since=None, until=None, error=None, prefix='') -> Tuple[List[str], List]:
+        clauses, args = [], []
+        if agent:
+            clauses.append(f"{prefix}agent = ?")
+            args.append(agent)
+        if since is not None:
+            clauses.append(f"{prefix}ts >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append(f"{prefix}ts < ?")
+            args.append(until)
+        if error is not None:
+            clauses.append(f"{prefix}error = ?")
+            args.append(int(error))
+        return clauses, args
+
+    def query(self, agent: Optional[str] = None, tool: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, error: Optional[bool] = None, cursor: Optional[int] = None,
+              limit: int = 100) -> Iterator[Dict]:
+        """Matching interaction summaries, newest first, yielded one at a time.
+
+        Pass the `id` of the last row as `cursor` to continue after it."""
+        self.flush()
+        clauses, args = self._filters(agent, since, until, error, prefix='i.')
+        # With a tool filter, walk that tool's postings instead of every interaction
+        order = "t.interaction_id" if tool else "i.id"
+        if cursor is not None:
+            clauses.append(f"{order} < ?")
+            args.append(cursor)
+        sql = "SELECT i.id, i.ts, i.agent, i.error, i.total_ms, i.question, i.response, i.tools, i.session_id "
+        if tool:
+            sql += "FROM interaction_tools t JOIN interactions i ON i.id = t.interaction_id"
+            clauses.insert(0, "t.tool = ?")
+            args.insert(0, tool)
+        else:
+            sql += "FROM interactions i"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} DESC LIMIT ?"
+        args.append(limit)
+        for row in self._conn().execute(sql, args):
+            yield {
+                'id': row[0],
+                'timestamp': datetime.fromtimestamp(row[1]).isoformat(),
+                'agent_name': row[2],
+                'error': bool(row[3]),
+                'total_ms': round(row[4], 1) if row[4] is not None else None,
+                'question': row[5],
+                'response': row[6],
+                'tools_used': json.loads(row[7] or '[]'),
+                'session_id': row[8],
+            }
+
+    def stats(self, agent: Optional[str] = None, tool: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, error: Optional[bool] = None) -> Dict:
+        """Per-stage latency percentiles, tool usage counts and per-agent error rates.
+
+        Computed from histogram rollups (whole days from the daily rollups, the
+        partial days at either end from the hourly ones): time filters apply at hour
+        granularity, `tool` narrows the tool stages only, and percentiles are
+        accurate to one bucket (~19%)."""
+        self.flush()
+        clauses, args = self._filters(agent, None, None, error)
+        periods, period_args = self._periods(since, until)
+        clauses.append(periods)
+        args += period_args
+        if tool:
+            clauses.append("(stage != 'tool_call' OR tool = ?)")
+            args.append(tool)
+        where = " AND ".join(clauses) or "1"
+        conn = self._conn()
+        histograms: Dict[str, Dict] = {}
+        tool_usage: Dict[str, int] = {}
+        for stage, stage_tool, bucket, count, total in conn.execute(
+                "SELECT stage, tool, bucket, SUM(count), SUM(total_ms) FROM stage_rollups "
+                f"WHERE {where} GROUP BY stage, tool, bucket", args):
+            label = f"{stage}:{stage_tool}" if stage_tool else stage
+            hist = histograms.setdefault(label, {'buckets': {}, 'count': 0, 'total_ms': 0.0})
+            hist['buckets'][bucket] = count
+            hist['count'] += count
+            hist['total_ms'] += total
+            if stage == 'tool_call':
+                tool_usage[stage_tool] = tool_usage.get(stage_tool, 0) + count
+
+        agents: Dict[str, Dict] = {}
+        for row_agent, requests, errors in conn.execute(
+                "SELECT agent, SUM(count), SUM(CASE WHEN error THEN count ELSE 0 END) FROM stage_rollups "
+                f"WHERE stage = 'total' AND {where} GROUP BY agent", args):
+            agents[row_agent] = {'requests': requests, 'errors': errors}
+
+        stages = {}
+        for label, hist in sorted(histograms.items()):
+            stages[label] = {'count': hist['count'], 'mean_ms': round(hist['total_ms'] / hist['count'], 1)}
+            for name, p in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+                stages[label][name] = round(self._percentile(hist['buckets'], hist['count'], p), 1)
+        for summary in agents.values():
+            summary['error_rate'] = round(summary['errors'] / summary['requests'], 4) if summary['requests'] else 0.0
+        return {'stages': stages, 'tool_usage': tool_usage, 'agents': agents}
+
+    @staticmethod
+    def _periods(since: Optional[float], until: Optional[float]) -> Tuple[str, List]:
+        """SQL covering [since, until] with daily rollups where whole days fit and hourly ones elsewhere."""
+        if since is None and until is None:
+            return "resolution = ?", [DAY]
+        first_hour = int(since // HOUR) if since is not None else 0
+        last_hour = int(until // HOUR) if until is not None else 2 ** 40
+        first_day = -(-first_hour * HOUR // DAY)
+        last_day = (last_hour + 1) * HOUR // DAY - 1
+        if first_day > last_day:
+            return "(resolution = ? AND period BETWEEN ? AND ?)", [HOUR, first_hour, last_hour]
+        hours_per_day = DAY // HOUR
+        return ("((resolution = ? AND period BETWEEN ? AND ?) OR "
+                "(resolution = ? AND (period BETWEEN ? AND ? OR period BETWEEN ? AND ?)))",
+                [DAY, first_day, last_day,
+                 HOUR, first_hour, first_day * hours_per_day - 1, (last_day + 1) * hours_per_day, last_hour])
+
+    @staticmethod
+    def _percentile(buckets: Dict[int, int], count: int, p: float) -> float:
+        rank = max(1, math.ceil(count * p))
+        seen = 0
+        for bucket in sorted(buckets):
+            seen += buckets[bucket]
+            if seen >= rank:
+                return bucket_value(bucket)
+        return 0.0
+
+    def rebuild(self, logs: Iterator[Dict], batch_size: int = 1000) -> int:
+        """Re-create the summaries from a full log history (e.g. after an upgrade)."""
+        conn = self._conn()
+        conn.executescript("DELETE FROM interactions; DELETE FROM interaction_tools; DELETE FROM stage_rollups;")
+        count, batch = 0, []
+        for log in logs:
+            batch.append((log.get('agent_name', ''), log))
+            if len(batch) >= batch_size:
+                self.record_many(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.record_many(batch)
+            count += len(batch)
+        return count
+
+def main():
+    from storage import BACKENDS, create_backend
+
+    parser = argparse.ArgumentParser(description="Rebuild the interaction log summaries used by /logs")
+    parser.add_argument('--backend', default=os.getenv('STORAGE_BACKEND', 'json'), choices=BACKENDS)
+    parser.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend, args.data_dir)
+    analytics = LogAnalytics(os.path.join(args.data_dir, 'log_analytics.db'), background=False)
+    print(f"Indexed {analytics.rebuild(backend.iter_logs())} logs")
+    backend.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import gzip
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from utils.background_writer import BackgroundWriter
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Per-agent index record: segment number, byte offset, byte length
+INDEX_RECORD = struct.Struct('<IQI')
+
+class LogStore:
+    """Append-only, segmented JSONL store for interaction logs.
+
+    Records are appended to `segment-<n>.jsonl` (or `.jsonl.gz`, one gzip member
+    per record, when compressed) and a new segment starts once the current one
+    exceeds `max_segment_bytes` or `max_segment_age` seconds. Each agent has a
+    fixed-width offset index under `index/`, so its last N logs are found by
+    reading the tail of that file, independent of total log volume.
+
+    Writes are handed to a background thread through a bounded queue and
+    flushed on interpreter exit. Appends are serialized with a file lock, so
+    several worker processes can share a directory."""
+
+    def __init__(self, logs_dir: str, max_segment_bytes: int = 16 * 1024 * 1024,
+                 max_segment_age: float = 24 * 3600, compress: bool = False,
+                 queue_size: int = 10000, background: bool = True):
+        self.logs_dir = logs_dir
+        self.index_dir = os.path.join(logs_dir, 'index')
+        self.lock_file = os.path.join(logs_dir, '.append.lock')
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.compress = compress
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._segment = self._latest_segment()
+        self._segment_started = None
+        self.written = 0
+        self._writer = BackgroundWriter(self._write_batch, 'log-writer', queue_size=queue_size,
+                                        background=background, on_start=self._reset_lock)
+
+    @classmethod
+    def from_env(cls, logs_dir: str) -> 'LogStore':
+        return cls(
+            logs_dir,
+            max_segment_bytes=int(os.getenv('LOG_SEGMENT_BYTES', str(16 * 1024 * 1024))),
+            max_segment_age=float(os.getenv('LOG_SEGMENT_AGE', str(24 * 3600))),
+            compress=os.getenv('LOG_COMPRESS', '0') == '1',
+            queue_size=int(os.getenv('LOG_QUEUE_SIZE', '10000')),
+        )
+
+    # Segment files
+
+    def _segment_path(self, seq: int, compressed: Optional[bool] = None) -> str:
+        compressed = self.compress if compressed is None else compressed
+        return os.path.join(self.logs_dir, f"segment-{seq:08d}.jsonl" + ('.gz' if compressed else ''))
+
+    def _existing_segment_path(self, seq: int) -> Optional[str]:
+        for compressed in (self.compress, not self.compress):
+            path = self._segment_path(seq, compressed)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _segments(self) -> List[int]:
+        seqs = set()
+        for filename in os.listdir(self.logs_dir):
+            if filename.startswith('segment-') and '.jsonl' in filename:
+                seqs.add(int(filename[len('segment-'):].split('.')[0]))
+        return sorted(seqs)
+
+    def _latest_segment(self) -> int:
+        segments = self._segments()
+        return segments[-1] if segments else 1
+
+    def _index_path(self, agent_name: str) -> str:
+        return os.path.join(self.index_dir, quote(agent_name, safe='') + '.idx')
+
+    @contextmanager
+    def _append_lock(self):
+        with self._lock:
+            with open(self.lock_file, 'a') as lock:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _current_segment(self) -> str:
+        """Path of the segment to append to, rotating if needed. Call with the append lock held."""
+        # Another worker may have rotated already
+        while self._existing_segment_path(self._segment + 1):
+            self._segment += 1
+            self._segment_started = None
+        path = self._existing_segment_path(self._segment)
+        if path is not None:
+            if self._segment_started is None:
+                self._segment_started = self._started_at(path)
+            too_big = os.path.getsize(path) >= self.max_segment_bytes
+            too_old = time.time() - self._segment_started >= self.max_segment_age
+            if too_big or too_old:
+                self._segment += 1
+                path = None
+        if path is None:
+            path = self._segment_path(self._segment)
+            self._segment_started = time.time()
+        return path
+
+    @staticmethod
+    def _serialize(record: Dict) -> bytes:
+        return (json.dumps(record, default=str) + '\n').encode()
+
+    def _encode(self, line: bytes) -> bytes:
+        return gzip.compress(line) if self.compress else line
+
+    @staticmethod
+    def _decode(data: bytes, path: str) -> Dict:
+        if path.endswith('.gz'):
+            data = zlib.decompress(data, wbits=31)
+        return json.loads(data)
+
+    def _started_at(self, path: str) -> float:
+        """When a segment was started: its first record's timestamp, else the file's mtime."""
+        try:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rb') as f:
+                line = f.readline()
+            return datetime.fromisoformat(json.loads(line)['timestamp']).timestamp()
+        except (OSError, ValueError, KeyError, TypeError):
+            return os.path.getmtime(path)
+
+    # Writing
+
+    def _reset_lock(self):
+        # The parent's lock may have been held by its writer at fork time (gunicorn --preload)
+        self._lock = threading.RLock()
+
+    def append(self, agent_name: str, record: Dict):
+        """Queue a record for writing, or write it at once if the queue is full.
+
+        The record is serialized first, so later changes to it (callers keep
+        the dict) don't reach the log."""
+        self._writer.submit((agent_name, self._serialize(record)))
+
+    def _write_batch(self, records: List[Tuple[str, bytes]]):
+        with self._append_lock():
+            path = self._current_segment()
+            index_entries: Dict[str, bytearray] = {}
+            with open(path, 'ab') as f:
+                for agent_name, line in records:
+                    data = self._encode(line)
+                    offset = f.tell()
+                    f.write(data)
+                    index_entries.setdefault(agent_name, bytearray()).extend(
+                        INDEX_RECORD.pack(self._segment, offset, len(data)))
+            # Index entries are written after the data they point to is on disk
+            for agent_name, entries in index_entries.items():
+                with open(self._index_path(agent_name), 'ab') as f:
+                    f.write(entries)
+            self.written += len(records)
+
+    def flush(self):
+        """Block until every queued record has been written."""
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+    # Reading
+
+    def _read_record(self, seq: int, offset: int, length: int) -> Optional[Dict]:
+        path = self._existing_segment_path(seq)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return self._decode(f.read(length), path)
+
+    def last(self, agent_name: str, limit: int = 10) -> List[Dict]:
+        """The agent's most recent `limit` records, newest first."""
+        self.flush()
+        try:
+            with open(self._index_path(agent_name), 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                count = f.tell() // INDEX_RECORD.size
+                start = max(0, count - limit)
+                f.seek(start * INDEX_RECORD.size)
+                raw = f.read((count - start) * INDEX_RECORD.size)
+        except FileNotFoundError:
+            return []
+        records = []
+        for i in range(len(raw) // INDEX_RECORD.size - 1, -1, -1):
+            record = self._read_record(*INDEX_RECORD.unpack_from(raw, i * INDEX_RECORD.size))
+            if record is not None:
+                records.append(record)
+        return records
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Every record, oldest first."""
+        self.flush()
+        for seq in self._segments():
+            path = self._existing_segment_path(seq)
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def stats(self) -> Dict:
+        return {
+            'segment': self._segment,
+            'queued': self._writer.qsize(),
+            'written': self.written,
+            'sync_fallbacks': self._writer.sync_writes,
+        }
@@ -0,0 +1,241 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from utils.log_analytics import is_error, stage_timings
+
+# Seconds; spans sub-millisecond storage lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'kind': self.kind, 'help': self.help, 'labels': self.labels,
+                    'series': [[list(labels), value] for labels, value in self._values.items()]}
+
+    @staticmethod
+    def merge(series: List, other: List) -> List:
+        merged = {tuple(labels): value for labels, value in series}
+        for labels, value in other:
+            merged[tuple(labels)] = merged.get(tuple(labels), 0.0) + value
+        return [[list(labels), value] for labels, value in merged.items()]
+
+    @staticmethod
+    def render(name: str, snapshot: Dict) -> Iterable[str]:
+        for labels, value in snapshot['series']:
+            yield f"{name}{_labels(snapshot['labels'], labels)} {_number(value)}"
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'kind': self.kind, 'help': self.help, 'labels': self.labels, 'buckets': self.buckets,
+                    'series': [[list(labels), list(counts), total] for labels, (counts, total) in self._values.items()]}
+
+    @staticmethod
+    def merge(series: List, other: List) -> List:
+        merged = {tuple(labels): [list(counts), total] for labels, counts, total in series}
+        for labels, counts, total in other:
+            current = merged.setdefault(tuple(labels), [[0] * len(counts), 0.0])
+            current[0] = [a + b for a, b in zip(current[0], counts)]
+            current[1] += total
+        return [[list(labels), counts, total] for labels, (counts, total) in merged.items()]
+
+    @staticmethod
+    def render(name: str, snapshot: Dict) -> Iterable[str]:
+        bounds = ['le="' + _number(b) + '"' for b in snapshot['buckets']] + ['le="+Inf"']
+        for labels, counts, total in snapshot['series']:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f"{name}_bucket{_labels(snapshot['labels'], labels, bound)} {cumulative}"
+            yield f"{name}_sum{_labels(snapshot['labels'], labels)} {_number(round(total, 6))}"
+            yield f"{name}_count{_labels(snapshot['labels'], labels)} {cumulative}"
+
+KINDS = {'counter': Counter, 'histogram': Histogram}
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format.
+
+    With METRICS_DIR set (gunicorn.conf.py does this), each worker writes a
+    snapshot to `<dir>/worker-<pid>.json` every METRICS_FLUSH_INTERVAL
+    seconds and at exit, and `/metrics` merges the snapshots of all workers,
+    including exited ones so counters never go backwards. Without it, only
+    this process's metrics are served."""
+
+    def __init__(self, metrics_dir: Optional[str] = None, flush_interval: float = 5.0):
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, object] = {}
+        self._flusher = None
+        self._pid = None
+        if metrics_dir:
+            os.makedirs(metrics_dir, exist_ok=True)
+            atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls) -> 'MetricsRegistry':
+        return cls(os.getenv('METRICS_DIR') or None, float(os.getenv('METRICS_FLUSH_INTERVAL', '5')))
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _ensure_flusher(self):
+        # Started lazily (and again after fork) so the preforked master never owns a worker file
+        if self.metrics_dir and self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error writing metrics snapshot: {str(e)}")
+
+    def flush(self):
+        if not self.metrics_dir or self._pid != os.getpid():
+            return
+        path = os.path.join(self.metrics_dir, f"worker-{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect(self) -> Dict[str, Dict]:
+        """Snapshots of every worker, merged."""
+        if not self.metrics_dir:
+            return self.snapshot()
+        self._ensure_flusher()
+        self.flush()
+        merged: Dict[str, Dict] = {}
+        for path in glob.glob(os.path.join(self.metrics_dir, 'worker-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, snapshot in snapshots.items():
+                if name not in merged:
+                    merged[name] = snapshot
+                else:
+                    kind = KINDS[snapshot['kind']]
+                    merged[name]['series'] = kind.merge(merged[name]['series'], snapshot['series'])
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        for name, snapshot in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {snapshot['help']}")
+            lines.append(f"# TYPE {name} {snapshot['kind']}")
+            lines.extend(KINDS[snapshot['kind']].render(name, snapshot))
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry.from_env()
+
+request_seconds = metrics.histogram(
+    'toolmind_request_seconds', 'Time to answer a question, end to end', ['agent'])
+storage_load_seconds = metrics.histogram(
+    'toolmind_storage_load_seconds', 'Time to load an agent\'s tools from storage')
+prompt_build_seconds = metrics.histogram(
+    'toolmind_prompt_build_seconds', 'Time to build (or fetch) the system prompt')
+groq_call_seconds = metrics.histogram(
+    'toolmind_groq_call_seconds', 'Duration of one Groq completion', ['model', 'context'])
+tool_call_seconds = metrics.histogram(
+    'toolmind_tool_call_seconds', 'Duration of one HTTP tool call', ['tool'])
+requests_total = metrics.counter(
+    'toolmind_requests_total', 'Questions answered', ['agent', 'status'])
+tokens_total = metrics.counter(
+    'toolmind_tokens_total', 'Groq tokens used', ['agent', 'model', 'type'])
+usage_unknown_total = metrics.counter(
+    'toolmind_usage_unknown_total', 'Groq completions whose token usage was not reported', ['agent', 'model'])
+
+def observe_request(agent_name: str, model: str, log: Dict):
+    """Record one finished interaction from its debug_log.
+
+    Groq calls and tokens are attributed to the model each call used (a
+    router model or the agent's), falling back to `model` for older logs."""
+    metrics._ensure_flusher()
+    debug_log = log.get('debug_log', [])
+    call_models = iter([entry.get('model', model) for entry in debug_log if entry.get('event') == 'groq_api_call'])
+    for stage, detail, ms in stage_timings(debug_log):
+        seconds = ms / 1000
+        if stage == 'total':
+            request_seconds.observe(seconds, agent_name)
+        elif stage == 'storage_load':
+            storage_load_seconds.observe(seconds)
+        elif stage == 'prompt_build':
+            prompt_build_seconds.observe(seconds)
+        elif stage == 'groq_call':
+            groq_call_seconds.observe(seconds, next(call_models, model), detail)
+        elif stage == 'tool_call':
+            tool_call_seconds.observe(seconds, detail)
+    requests_total.inc(agent_name, 'error' if is_error(log) else 'ok')
+    for entry in debug_log:
+        usage = entry.get('usage') if entry.get('event') == 'groq_response_received' else None
+        if usage:
+            used = entry.get('model', model)
+            tokens_total.inc(agent_name, used, 'prompt', amount=usage.get('prompt_tokens', 0))
+            tokens_total.inc(agent_name, used, 'completion', amount=usage.get('completion_tokens', 0))
+        elif entry.get('usage_unknown'):
+            usage_unknown_total.inc(agent_name, entry.get('model', model))
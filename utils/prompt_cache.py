@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from models import Agent, Tool
+from utils.sessions import estimate_tokens
+
+SYSTEM_PROMPT = """You are an AI assistant with access to the following tools:
+{tools}
+
+Always prioritize using a tool before trying to answer the question yourself. When you need to use a tool, respond with ONLY a JSON object in this format (parameter names depend on the tool's description):
+{{"tool":"tool_name","params":{{"param1":"value1","param2":"value2"}}}}
+
+If the question needs several independent tools, respond with ONLY a JSON list of such objects; they will be run together and you will get all results back.
+
+Otherwise, respond normally to the user's question."""
+
+UNAVAILABLE_NOTE = """
+
+Tools marked "unavailable" are failing right now; don't use them, and answer as well as you can without them."""
+
+# The pre-cache prompt, kept only to report how many tokens the compact one saves
+_LEGACY_SYSTEM_PROMPT = """You are an AI assistant with access to the following tools:
+{tools}
+
+Always prioritize using a tool before trying to answer the question yourself. When you need to use a tool, respond with ONLY a JSON object in this format. You can also return parameters like param1 and param2, they can be called something else as per the tool's description:
+{{
+    "tool": "tool_name",
+    "params": {{
+        "param1": "value1",
+        "param2": "value2"
+    }}
+}}
+
+If the question needs several independent tools, respond with ONLY a JSON list of such objects; they will be run together and you will get all results back.
+
+Otherwise, respond normally to the user's question."""
+
+def _tool_summaries(available_tools: List[Tool], unavailable: FrozenSet[str] = frozenset()) -> List[Dict]:
+    summaries = []
+    for tool in available_tools:
+        summary = {'name': tool.name, 'description': tool.description}
+        # Parameters the tool's URL or body template can't be filled in without
+        if tool.required_params:
+            summary['required_params'] = tool.required_params
+        # Tools whose circuit breaker is open
+        if tool.name in unavailable:
+            summary['unavailable'] = True
+        summaries.append(summary)
+    return summaries
+
+def build_system_message(available_tools: List[Tool], unavailable: FrozenSet[str] = frozenset()) -> str:
+    """Create a system message that includes tool information, serialized compactly."""
+    prompt = SYSTEM_PROMPT.format(tools=json.dumps(_tool_summaries(available_tools, unavailable),
+                                                   separators=(',', ':')))
+    return prompt + UNAVAILABLE_NOTE if unavailable else prompt
+
+class PromptCache:
+    """Compiled system prompts per agent, keyed by agent name, its tool list, the tool registry
+    version and which of its tools are currently unavailable.
+
+    A registry version change (any tool created, changed or deleted, in this
+    or another worker) yields a new key, and routes also drop entries
+    explicitly when an agent or tool changes."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, agent: Agent, available_tools: List[Tool], tools_version: str,
+            unavailable: FrozenSet[str] = frozenset()) -> Tuple[str, Dict]:
+        """Return (system_prompt, debug_info) for the agent."""
+        key = (agent.name, tuple(agent.tools), tools_version, unavailable)
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            return entry['prompt'], {
+                'cache': 'hit',
+                'lookup_ms': round((time.perf_counter() - started) * 1000, 3),
+                'cpu_ms_saved': entry['build_ms'],
+                'prompt_tokens': entry['prompt_tokens'],
+                'tokens_saved_per_call': entry['tokens_saved_per_call'],
+            }
+
+        # CPU time of this thread only: process time would count other requests running meanwhile
+        cpu_started = time.thread_time()
+        prompt = build_system_message(available_tools, unavailable)
+        build_ms = round((time.thread_time() - cpu_started) * 1000, 3)
+        legacy = _LEGACY_SYSTEM_PROMPT.format(tools=json.dumps(_tool_summaries(available_tools), indent=2))
+        entry = {
+            'prompt': prompt,
+            'tools': frozenset(agent.tools),
+            'build_ms': build_ms,
+            'prompt_tokens': estimate_tokens(prompt),
+            'tokens_saved_per_call': estimate_tokens(legacy) - estimate_tokens(prompt),
+        }
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prompt, {
+            'cache': 'miss',
+            'build_ms': build_ms,
+            'prompt_tokens': entry['prompt_tokens'],
+            'tokens_saved_per_call': entry['tokens_saved_per_call'],
+        }
+
+    def invalidate_agent(self, agent_name: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == agent_name]:
+                del self._entries[key]
+
+    def invalidate_tool(self, tool_name: Optional[str] = None):
+        """Drop prompts that reference a tool (or every prompt when no name is given)."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if tool_name is None or tool_name in entry['tools']]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+prompt_cache = PromptCache()
@@ -0,0 +1,255 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlsplit
+from utils.metrics import metrics
+
+rate_limit_wait_seconds = metrics.histogram(
+    'toolmind_rate_limit_wait_seconds', 'Time spent queued for an upstream rate limiter', ['limiter'])
+upstream_throttled_total = metrics.counter(
+    'toolmind_upstream_throttled_total', 'Upstream 429 responses', ['limiter'])
+
+class RateLimitExceeded(Exception):
+    """Raised when a call could not get past its limiter before the max-wait deadline."""
+
+    def __init__(self, limiter: str, retry_after: float):
+        super().__init__(f"Rate limit for {limiter} still exhausted after waiting; retry in {retry_after:.1f}s")
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds in values like '7.66s', '2m59.56s', '120ms' or a bare '5'."""
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+def retry_delay(headers: Mapping[str, str]) -> Optional[float]:
+    """How long the upstream asked us to hold off, from Retry-After or exhausted rate-limit headers."""
+    headers = {key.lower(): value for key, value in headers.items()}
+    if 'retry-after' in headers:
+        delay = parse_duration(headers['retry-after'])
+        if delay is None:
+            try:
+                delay = parsedate_to_datetime(headers['retry-after']).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return max(0.0, delay)
+    # Groq: x-ratelimit-remaining-requests / x-ratelimit-reset-requests (and -tokens);
+    # many APIs: x-ratelimit-remaining / x-ratelimit-reset (seconds or an epoch timestamp)
+    for suffix in ('-requests', '-tokens', ''):
+        remaining = headers.get(f'x-ratelimit-remaining{suffix}')
+        reset = headers.get(f'x-ratelimit-reset{suffix}')
+        if remaining is None or reset is None:
+            continue
+        try:
+            if float(remaining) > 0:
+                continue
+        except ValueError:
+            continue
+        delay = parse_duration(reset)
+        if delay is not None:
+            return max(0.0, delay - time.time() if delay > 1e9 else delay)
+    return None
+
+class AdaptiveLimiter:
+    """Token bucket plus a concurrency cap for one upstream.
+
+    Waiting callers are served round-robin across owners (agents), so one
+    busy agent can't starve the others. The rate adapts AIMD-style: a 429
+    halves it and pauses the bucket for the upstream's Retry-After (or
+    until its rate-limit window resets), and each success wins back 5% of
+    the configured rate."""
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None, max_concurrency: int = 8,
+                 min_rate: float = 0.1):
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst or max(1.0, rate)
+        self.max_concurrency = max_concurrency
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.queued = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _ready_in(self, now: float) -> Optional[float]:
+        """Seconds until the head of the queue may go (0 = now, None = when a slot frees up)."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        if self._in_flight >= self.max_concurrency:
+            return None
+        return 0.0
+
+    def acquire(self, owner: str, deadline: float) -> float:
+        """Wait for a slot (or raise RateLimitExceeded at `deadline`); returns seconds waited."""
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(owner, deque()).append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    head_owner, head_queue = next(iter(self._queues.items()))
+                    ready_in = self._ready_in(now) if head_queue[0] is ticket else None
+                    if ready_in == 0.0:
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        head_queue.popleft()
+                        # Rotate this owner behind the others that are waiting
+                        del self._queues[head_owner]
+                        if head_queue:
+                            self._queues[head_owner] = head_queue
+                        waited = now - started
+                        self.admitted += 1
+                        if waited > 0.001:
+                            self.queued += 1
+                        self.wait_seconds += waited
+                        self._cond.notify_all()
+                        return waited
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise RateLimitExceeded(self.name, ready_in or 1 / self.rate)
+                    self._cond.wait(min(remaining, ready_in) if ready_in else remaining)
+            except BaseException:
+                queue = self._queues.get(owner)
+                if queue is not None and ticket in queue:
+                    queue.remove(ticket)
+                    if not queue:
+                        del self._queues[owner]
+                self._cond.notify_all()
+                raise
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def record(self, status_code: int, headers: Mapping[str, str]):
+        """Adapt to an upstream response."""
+        delay = retry_delay(headers)
+        now = time.monotonic()
+        with self._cond:
+            self._refill(now)
+            if status_code == 429:
+                self.throttled += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._tokens = min(self._tokens, 0.0)
+                self._blocked_until = max(self._blocked_until, now + (delay if delay is not None else 1 / self.rate))
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+                if delay is not None:
+                    # Quota exhausted for this window even though the call went through
+                    self._blocked_until = max(self._blocked_until, now + delay)
+            self._cond.notify_all()
+        if status_code == 429:
+            upstream_throttled_total.inc(self.name)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'rate': round(self.rate, 3),
+                'max_rate': self.max_rate,
+                'in_flight': self._in_flight,
+                'waiting': sum(len(q) for q in self._queues.values()),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'timeouts': self.timeouts,
+                'upstream_429': self.throttled,
+                'wait_ms_total': round(self.wait_seconds * 1000, 1),
+            }
+
+class RateLimits:
+    """Limiters per Groq model and per tool host, created on first use.
+
+    Off unless RATE_LIMITS=1 (the limits are per worker process). Requests per second, burst and concurrency
+    come from GROQ_RATE_LIMIT / GROQ_BURST / GROQ_MAX_CONCURRENCY and
+    TOOL_RATE_LIMIT / TOOL_BURST / TOOL_MAX_CONCURRENCY; callers give up
+    after RATE_LIMIT_MAX_WAIT seconds in the queue."""
+
+    def __init__(self, enabled: bool = True, max_wait: float = 30.0, groq: Dict = None, tool: Dict = None):
+        self.enabled = enabled
+        self.max_wait = max_wait
+        self.groq = groq or {'rate': 5.0, 'burst': None, 'max_concurrency': 8}
+        self.tool = tool or {'rate': 20.0, 'burst': None, 'max_concurrency': 10}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RateLimits':
+        def settings(prefix, rate, concurrency):
+            burst = os.getenv(f'{prefix}_BURST')
+            return {'rate': float(os.getenv(f'{prefix}_RATE_LIMIT', rate)),
+                    'burst': float(burst) if burst else None,
+                    'max_concurrency': int(os.getenv(f'{prefix}_MAX_CONCURRENCY', concurrency))}
+
+        return cls(enabled=os.getenv('RATE_LIMITS', '0') == '1',
+                   max_wait=float(os.getenv('RATE_LIMIT_MAX_WAIT', '30')),
+                   groq=settings('GROQ', '5', '8'),
+                   tool=settings('TOOL', '20', os.getenv('TOOL_POOL_MAXSIZE', '10')))
+
+    def _get(self, name: str, settings: Dict) -> Optional[AdaptiveLimiter]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(name)
+            if limiter is None:
+                limiter = self._limiters[name] = AdaptiveLimiter(name, **settings)
+            return limiter
+
+    def for_model(self, model: str) -> Optional[AdaptiveLimiter]:
+        return self._get(f"groq:{model}", self.groq)
+
+    def for_url(self, url: str) -> Optional[AdaptiveLimiter]:
+        return self._get(f"host:{urlsplit(url).netloc}", self.tool)
+
+    def deadline(self) -> float:
+        return time.monotonic() + self.max_wait
+
+    @contextmanager
+    def slot(self, limiter: Optional[AdaptiveLimiter], owner: str, deadline: float):
+        if limiter is None:
+            yield
+            return
+        rate_limit_wait_seconds.observe(limiter.acquire(owner, deadline), limiter.name)
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {name: limiter.stats() for name, limiter in limiters.items()}
+
+rate_limits = RateLimits.from_env()
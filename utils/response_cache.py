@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+DEFAULT_CACHEABLE_METHODS = ('GET', 'HEAD')
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, ttl: float, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+class ToolResponseCache:
+    """Per-tool response caches, enabled with a `cache` block in the tool config:
+
+        "cache": {"ttl": 60, "max_entries": 128, "max_response_bytes": 65536,
+                  "methods": ["GET", "HEAD"]}
+    """
+
+    def __init__(self):
+        self._caches: Dict[str, TTLCache] = {}
+        self._skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def settings(config: Dict) -> Optional[Dict]:
+        cache_config = config.get('cache')
+        if not cache_config:
+            return None
+        return {
+            'ttl': float(cache_config.get('ttl', 60)),
+            'max_entries': int(cache_config.get('max_entries', 128)),
+            'max_response_bytes': int(cache_config.get('max_response_bytes', 64 * 1024)),
+            'methods': [m.upper() for m in cache_config.get('methods', DEFAULT_CACHEABLE_METHODS)],
+        }
+
+    def for_tool(self, tool_name: str, config: Dict) -> Optional[TTLCache]:
+        settings = self.settings(config)
+        if settings is None or config['http_method'].upper() not in settings['methods']:
+            return None
+        with self._lock:
+            cache = self._caches.get(tool_name)
+            if cache is None or (cache.ttl, cache.max_entries) != (settings['ttl'], settings['max_entries']):
+                cache = self._caches[tool_name] = TTLCache(settings['ttl'], settings['max_entries'])
+            return cache
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[Dict], body: Any) -> str:
+        return json.dumps([method.upper(), url, params or {}, body], sort_keys=True, default=str)
+
+    def store(self, tool_name: str, config: Dict, key: str, value: Dict, size: int) -> bool:
+        cache = self.for_tool(tool_name, config)
+        if cache is None:
+            return False
+        if size > self.settings(config)['max_response_bytes']:
+            with self._lock:
+                self._skipped[tool_name] = self._skipped.get(tool_name, 0) + 1
+            return False
+        cache.put(key, value)
+        return True
+
+    def invalidate(self, tool_name: str):
+        with self._lock:
+            self._caches.pop(tool_name, None)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            items = list(self._caches.items())
+            skipped = dict(self._skipped)
+        return {name: {**cache.stats(), 'skipped_too_large': skipped.get(name, 0)}
+                for name, cache in items}
+
+tool_response_cache = ToolResponseCache()
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.turns: List[Dict] = []  # {"role": ..., "content": ...}, oldest first
+        self.summary = ''
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.summary) + sum(len(turn['content']) for turn in self.turns)
+
+class SessionStore:
+    """In-memory conversation history, bounded by session count, total bytes and idle time.
+
+    Least recently used sessions are evicted first. Sessions live in the worker
+    that created them, so run a single worker (gevent) or sticky routing if
+    follow-ups must always find their session."""
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 idle_ttl: float = 3600, summary_max_chars: int = 2000):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.summary_max_chars = summary_max_chars
+        self._sessions: 'OrderedDict[str, Session]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_env(cls) -> 'SessionStore':
+        return cls(
+            max_sessions=int(os.getenv('SESSION_MAX_COUNT', '1000')),
+            max_bytes=int(os.getenv('SESSION_MAX_BYTES', str(32 * 1024 * 1024))),
+            idle_ttl=float(os.getenv('SESSION_IDLE_TTL', '3600')),
+        )
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Session:
+        """Return the live session with this id, or a new one if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = Session(uuid.uuid4().hex)
+                self._sessions[session.id] = session
+                self._evict()
+            self._sessions.move_to_end(session.id)
+            session.last_used = now
+            return session
+
+    def _expire(self, now: float):
+        # Sessions are ordered by last use, so expired ones are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used < self.idle_ttl:
+                break
+            self._drop(session.id)
+            self.expirations += 1
+
+    def _evict(self):
+        while len(self._sessions) > self.max_sessions or (self._bytes > self.max_bytes and len(self._sessions) > 1):
+            self._drop(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+
+    def history(self, session: Session, budget_tokens: int) -> Tuple[List[Dict], Dict]:
+        """Messages to replay before the new question, trimmed to `budget_tokens`.
+
+        The newest turns are kept verbatim. Older turns that don't fit are
+        folded into a short extractive summary and removed from the session,
+        which also keeps per-session memory bounded."""
+        with session.lock:
+            before = session.size
+            summary_cost = estimate_tokens(session.summary) if session.summary else 0
+            kept, used = [], summary_cost
+            # Turns are recorded as (question, answer) pairs; keep or drop them together
+            for i in range(len(session.turns) - 2, -1, -2):
+                pair = session.turns[i:i + 2]
+                cost = sum(estimate_tokens(turn['content']) for turn in pair)
+                if used + cost > budget_tokens:
+                    break
+                kept[:0] = pair
+                used += cost
+
+            dropped = session.turns[:len(session.turns) - len(kept)]
+            if dropped:
+                lines = [f"{turn['role']}: {turn['content'][:200]}" for turn in dropped]
+                summary = '\n'.join(filter(None, [session.summary] + lines))
+                session.summary = summary[-self.summary_max_chars:]
+                session.turns = kept
+            # The summary can itself be too large for a tight budget: keep its newest part
+            # that fits, or drop it when not even the per-message overhead fits
+            used -= summary_cost
+            room = budget_tokens - used
+            if session.summary and estimate_tokens(session.summary) > room:
+                max_chars = (room - 4) * 4
+                session.summary = session.summary[-max_chars:] if max_chars > 0 else ''
+            if session.summary:
+                used += estimate_tokens(session.summary)
+            self._adjust_bytes(session, session.size - before)
+
+            messages = []
+            if session.summary:
+                messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{session.summary}"})
+            messages += [dict(turn) for turn in session.turns]
+            return messages, {'turns': len(session.turns), 'trimmed_turns': len(dropped),
+                              'summarized': bool(session.summary), 'estimated_tokens': used}
+
+    def record(self, session: Session, question: str, response: str):
+        with session.lock:
+            session.turns.append({"role": "user", "content": question})
+            session.turns.append({"role": "assistant", "content": response})
+            session.last_used = time.monotonic()
+            self._adjust_bytes(session, len(question) + len(response))
+        with self._lock:
+            self._evict()
+
+    def _adjust_bytes(self, session: Session, delta: int):
+        with self._lock:
+            # An evicted session may still finish its request; it no longer counts
+            if session.id in self._sessions:
+                self._bytes += delta
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': self._bytes,
+                'max_sessions': self.max_sessions,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+session_store = SessionStore.from_env()
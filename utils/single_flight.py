@@ -0,0 +1,78 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+from utils.metrics import metrics
+
+coalesced_total = metrics.counter(
+    'toolmind_coalesced_total', 'Calls answered by sharing an identical in-flight call', ['kind', 'name'])
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+class SingleFlight:
+    """Deduplicate concurrent identical calls: the first caller for a key runs
+    the function, callers arriving while it is in flight wait for and share
+    its result (or exception). Nothing is kept once the call finishes, so this
+    is not a cache."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self._by_name: Dict[str, int] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], name: str = '') -> Tuple[Any, Dict]:
+        """Return (result, info); info says whether this caller led or followed
+        and how many callers shared the upstream call."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.followers += 1
+                self._by_name[name] = self._by_name.get(name, 0) + 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            coalesced_total.inc(self.kind, name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, {'role': 'follower'}
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, {'role': 'leader', 'followers': call.followers}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'by_name': dict(self._by_name),
+            }
+
+# Tool calls coalesce by default for GET/HEAD (see Tool config 'coalesce');
+# temperature-0 completions coalesce unless COALESCE_COMPLETIONS=0
+tool_flights = SingleFlight('tool')
+completion_flights = SingleFlight('completion')
+COALESCE_COMPLETIONS = os.getenv('COALESCE_COMPLETIONS', '1') == '1'
@@ -0,0 +1,50 @@
+from typing import Optional
+
+class JsonPrefixScanner:
+    """Finds, chunk by chunk, where a JSON object or array at the start of streamed text ends.
+
+    `feed` returns the complete JSON text once its closing bracket arrives.
+    Text that doesn't start with `{` or `[` (after whitespace) is a plain
+    answer, and `plain` turns True. Only the bracket structure is tracked
+    (strings and escapes included); the caller still parses the result."""
+
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.plain = False
+        self.chars = 0
+
+    def feed(self, text: str) -> Optional[str]:
+        if self.plain:
+            return None
+        for position, char in enumerate(text):
+            if not self.started:
+                if char.isspace():
+                    continue
+                if char not in '{[':
+                    self.plain = True
+                    return None
+                self.started = True
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.parts.append(text[:position + 1])
+                    self.chars += position + 1
+                    return ''.join(self.parts)
+        self.parts.append(text)
+        self.chars += len(text)
+        return None
@@ -1,12 +1,20 @@
 from datetime import datetime
-import json
-import requests
-from urllib.parse import urljoin
-from string import Template
+import resource
+import time
 from models import Tool
+from utils.http_pool import http_pool, tool_timeout
+from utils.response_cache import tool_response_cache
+from utils.single_flight import tool_flights
+from utils.rate_limit import RateLimitExceeded, rate_limits
+from utils.tool_health import ToolUnavailable, hedged, tool_health
+from utils.tool_response import (TOOL_MAX_RESPONSE_BYTES, digest, logged_headers, read_capped,
+                                 shape_for_prompt)
 
-def execute_http_tool(tool: Tool, params: dict) -> tuple[str, dict]:
+COALESCE_METHODS = ('GET', 'HEAD')
+
+def execute_http_tool(tool: Tool, params: dict, owner: str = '') -> tuple[str, dict]:
     """Execute an HTTP API tool with the given parameters.
+    `owner` (the calling agent) is used for fair queueing at the host's rate limiter.
     Returns a tuple of (response_text, debug_info)"""
     debug_info = {
         'timestamp': datetime.now().isoformat(),
@@ -21,54 +29,120 @@ def execute_http_tool(tool: Tool, params: dict) -> tuple[str, dict]:
     }
     
     try:
-        # Replace path parameters in endpoint_path
-        endpoint_path = tool.config['endpoint_path']
-        for param_name, param_value in params.items():
-            placeholder = f"<{param_name}>"
-            if placeholder in endpoint_path:
-                endpoint_path = endpoint_path.replace(placeholder, str(param_value))
-                # Remove the used parameter from params to avoid duplicate in query string
-                params = {k: v for k, v in params.items() if k != param_name}
-        
-        # Construct the full URL
-        url = urljoin(tool.config['base_url'], endpoint_path)
-        debug_info['request']['endpoint_path'] = endpoint_path
+        # Fill in the tool's precompiled URL and body templates (path values are URL-encoded)
+        url, params, body = tool.compiled_request().render(params)
         debug_info['request']['combined_url'] = url
+        if body is not None:
+            debug_info['request']['body'] = body
         
         # Prepare headers with default User-Agent
         headers = tool.config['headers'].copy()
         headers['User-Agent'] = 'Mozilla/5.0'
         headers['Accept'] = 'application/json'
         
-        # Prepare body if it exists
-        body = None
-        if tool.config['body_template']:
-            # Replace placeholders in the template
-            template = Template(tool.config['body_template'])
-            body = json.loads(template.substitute(params))
-            debug_info['request']['body'] = body
-        
-        # Make the request
-        response = requests.request(
-            method=tool.config['http_method'],
-            url=url,
-            headers=headers,
-            json=body if body else None,
-            params=params if tool.config['http_method'] == 'GET' else None
-        )
+        method = tool.config['http_method']
+        query_params = params if method == 'GET' else None
+
+        # Serve idempotent calls from the tool's response cache when it is enabled
+        cache = tool_response_cache.for_tool(tool.name, tool.config)
+        cache_key = tool_response_cache.key(method, url, query_params, body) if cache else None
+        cached = cache.get(cache_key) if cache else None
+        debug_info['cache'] = 'disabled' if cache is None else ('hit' if cached else 'miss')
+
+        if cached:
+            status_code, response_headers, response_text, truncated = cached
+        else:
+            max_bytes = tool.config.get('max_response_bytes', TOOL_MAX_RESPONSE_BYTES)
+            breaker = tool_health.for_tool(tool.name, tool.config)
+
+            def attempt():
+                limiter = rate_limits.for_url(url)
+                deadline = rate_limits.deadline()
+                try:
+                    while True:
+                        # Make the request over the shared keep-alive pool for this host; the body
+                        # is streamed so no more than max_bytes of it is ever held
+                        with rate_limits.slot(limiter, owner, deadline):
+                            started = time.perf_counter()
+                            response = http_pool.request(
+                                method=method,
+                                url=url,
+                                headers=headers,
+                                json=body if body else None,
+                                params=query_params,
+                                timeout=tool_timeout(tool.config),
+                                stream=True
+                            )
+                        if limiter is not None:
+                            limiter.record(response.status_code, response.headers)
+                        # A 429 means the request wasn't processed, so it is safe to queue up and retry
+                        if limiter is None or response.status_code != 429:
+                            break
+                        response.close()
+                    content, truncated = read_capped(response, max_bytes)
+                except RateLimitExceeded:
+                    if breaker is not None:
+                        breaker.release()
+                    raise
+                except Exception:
+                    if breaker is not None:
+                        breaker.record(False)
+                    raise
+                if breaker is not None:
+                    breaker.record(response.status_code < 500, time.perf_counter() - started)
+                text = content.decode(response.encoding or 'utf-8', errors='replace')
+                return response.status_code, dict(response.headers), text, truncated, len(content)
+
+            def fetch():
+                # Fail fast while the tool's upstream is known to be down
+                if breaker is not None and not breaker.allow():
+                    debug_info['circuit'] = 'open'
+                    raise ToolUnavailable(f"Tool '{tool.name}' is temporarily unavailable after repeated failures")
+                hedge = tool.config.get('hedge', False)
+                if hedge and method == 'GET' and breaker is not None:
+                    delay = hedge['after_ms'] / 1000 if isinstance(hedge, dict) and 'after_ms' in hedge else breaker.p95()
+                    fetched, debug_info['hedge'] = hedged(attempt, breaker, delay)
+                    return fetched
+                return attempt()
+
+            started = time.perf_counter()
+            # Identical calls already in flight (same tool, URL, params and body) share one request
+            if tool.config.get('coalesce', method in COALESCE_METHODS):
+                coalesce_key = (tool.name, tool_response_cache.key(method, url, query_params, body))
+                fetched, debug_info['coalescing'] = tool_flights.do(coalesce_key, fetch, name=tool.name)
+            else:
+                fetched = fetch()
+            debug_info['request']['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            status_code, response_headers, response_text, truncated, content_length = fetched
+
+            if cache and 200 <= status_code < 300 and debug_info.get('coalescing', {}).get('role') != 'follower':
+                tool_response_cache.store(tool.name, tool.config, cache_key,
+                                          (status_code, response_headers, response_text, truncated), content_length)
         
         # Update last_used timestamp
         tool.last_used = datetime.now()
+
+        # Only the extracted, size-capped part of the response goes to the model
+        prompt_text, shaping = shape_for_prompt(response_text, truncated, tool.config)
         
-        # Add response info to debug
+        # Add response info to debug (a digest, not the body: the interaction log keeps this)
+        body_digest = digest(response_text)
         debug_info['response'] = {
-            'status_code': response.status_code,
-            'headers': dict(response.headers),
-            'text': response.text[:1000] + '...' if len(response.text) > 1000 else response.text
+            'status_code': status_code,
+            'headers': logged_headers(response_headers),
+            'truncated': truncated,
+            'body': body_digest,
+            'prompt': {'chars': len(prompt_text), **shaping}
+        }
+        debug_info['memory'] = {
+            # An estimate, not a measurement: the body counted twice (read_capped's chunks and
+            # their join) plus the prompt text
+            'estimated_buffered_bytes': body_digest['bytes'] * 2 + len(prompt_text),
+            'process_max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
         }
         
         # Return both response and debug info
-        return f"Tool '{tool.name}' executed successfully. Response: {response.text}", debug_info
+        return f"Tool '{tool.name}' executed successfully. Response: {prompt_text}", debug_info
     except Exception as e:
         debug_info['error'] = str(e)
         return f"Error executing tool '{tool.name}': {str(e)}", debug_info 
\ No newline at end of file
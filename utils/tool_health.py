@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Defaults for tools that don't set "circuit_breaker" in their config
+TOOL_BREAKER_FAILURES = int(os.getenv('TOOL_BREAKER_FAILURES', '5'))
+TOOL_BREAKER_COOLDOWN = float(os.getenv('TOOL_BREAKER_COOLDOWN', '30'))
+# Hedged GETs fire the second attempt after the tool's recent p95 latency, once there are
+# enough samples to trust it, and never for more than this share of a tool's calls
+TOOL_HEDGE_MIN_SAMPLES = int(os.getenv('TOOL_HEDGE_MIN_SAMPLES', '20'))
+TOOL_HEDGE_MAX_RATIO = float(os.getenv('TOOL_HEDGE_MAX_RATIO', '0.1'))
+TOOL_HEDGE_WORKERS = int(os.getenv('TOOL_HEDGE_WORKERS', '32'))
+LATENCY_WINDOW = 200
+
+# Both attempts of a hedged call run here, so the first can be waited on with a timeout
+hedge_pool = ThreadPoolExecutor(max_workers=TOOL_HEDGE_WORKERS, thread_name_prefix='hedge')
+
+class ToolUnavailable(Exception):
+    pass
+
+def validate_config(config: Dict):
+    """Raise ValueError for malformed circuit breaker or hedging settings in a tool config."""
+    breaker = config.get('circuit_breaker')
+    if breaker is not None and breaker is not False:
+        if not isinstance(breaker, dict):
+            raise ValueError("'circuit_breaker' must be false or an object like {\"failures\": 5, \"cooldown\": 30}")
+        if 'failures' in breaker and (not isinstance(breaker['failures'], int) or breaker['failures'] <= 0):
+            raise ValueError("'circuit_breaker.failures' must be a positive integer")
+        if 'cooldown' in breaker and (not isinstance(breaker['cooldown'], (int, float)) or breaker['cooldown'] <= 0):
+            raise ValueError("'circuit_breaker.cooldown' must be a positive number of seconds")
+    hedge = config.get('hedge')
+    if hedge is not None and not isinstance(hedge, bool):
+        if not isinstance(hedge, dict) or not isinstance(hedge.get('after_ms', 0), (int, float)) \
+                or hedge.get('after_ms', 0) < 0:
+            raise ValueError("'hedge' must be true, false or an object like {\"after_ms\": 250}")
+
+class CircuitBreaker:
+    """Health of one tool's upstream: closed (calls go through), open (calls fail fast) or
+    half_open (one trial call is let through after the cooldown; it decides which way to go).
+
+    `failures` consecutive errors (exceptions or 5xx responses) open the breaker.
+    Successful calls also feed a window of recent latencies used to time hedges."""
+
+    def __init__(self, name: str, failures: int = TOOL_BREAKER_FAILURES, cooldown: float = TOOL_BREAKER_COOLDOWN):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._p95: Optional[float] = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.short_circuited = 0
+        self.opened = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (in half_open, only the one trial call)."""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+                self.trial_in_flight = False
+            if self.state == 'closed' or (self.state == 'half_open' and not self.trial_in_flight):
+                if self.state == 'half_open':
+                    self.trial_in_flight = True
+                self.calls += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record(self, ok: bool, elapsed: Optional[float] = None):
+        with self._lock:
+            if ok:
+                self.consecutive_failures = 0
+                self.state = 'closed'
+                self.trial_in_flight = False
+                if elapsed is not None:
+                    self.latencies.append(elapsed)
+                    self._p95 = None
+                return
+            self.errors += 1
+            self.consecutive_failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.consecutive_failures >= self.failures):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+                self.opened += 1
+
+    def release(self):
+        """A call let through by `allow` ended without a verdict (e.g. it was rate limited)."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def available(self) -> bool:
+        """False while the breaker is open and still cooling down."""
+        with self._lock:
+            return not (self.state == 'open' and time.monotonic() - self.opened_at < self.cooldown)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if self._p95 is None and self.latencies:
+                ordered = sorted(self.latencies)
+                self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            return self._p95 if len(self.latencies) >= TOOL_HEDGE_MIN_SAMPLES else None
+
+    def take_hedge(self) -> bool:
+        """Reserve a hedge if this tool is under its hedge budget."""
+        with self._lock:
+            if self.state != 'closed' or self.hedges + 1 > self.calls * TOOL_HEDGE_MAX_RATIO:
+                return False
+            self.hedges += 1
+            return True
+
+    def note_hedge_win(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> Dict:
+        p95 = self.p95()
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.consecutive_failures, 'calls': self.calls,
+                    'errors': self.errors, 'short_circuited': self.short_circuited, 'opened': self.opened,
+                    'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+                    'hedges': self.hedges, 'hedge_wins': self.hedge_wins}
+
+class ToolHealth:
+    """Circuit breakers per tool (per worker process), created on first use."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_tool(self, name: str, config: Dict) -> Optional[CircuitBreaker]:
+        settings = config.get('circuit_breaker')
+        if settings is False:
+            return None
+        settings = settings or {}
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    name, failures=settings.get('failures', TOOL_BREAKER_FAILURES),
+                    cooldown=settings.get('cooldown', TOOL_BREAKER_COOLDOWN))
+            return breaker
+
+    def unavailable(self, names: Iterable[str]) -> Set[str]:
+        """Tools whose breaker is open, to be marked in the system prompt."""
+        with self._lock:
+            breakers = [self._breakers.get(name) for name in names]
+        return {breaker.name for breaker in breakers if breaker is not None and not breaker.available()}
+
+    def reset(self, name: Optional[str] = None):
+        """Forget a tool's health (e.g. when it is recreated), or every tool's."""
+        with self._lock:
+            if name is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(name, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+tool_health = ToolHealth()
+
+def hedged(attempt: Callable[[], Tuple], breaker: CircuitBreaker, delay: Optional[float]) -> Tuple[Tuple, Dict]:
+    """Run `attempt`, and if it hasn't returned after `delay` seconds run it a second time
+    in parallel; return (first result to arrive, hedge debug info).
+
+    The slower attempt finishes in the background and its result is dropped. If the
+    first to finish raised, the other one is still waited for."""
+    if delay is None:
+        return attempt(), {'fired': False, 'reason': 'not_enough_samples'}
+    primary = hedge_pool.submit(attempt)
+    done, _ = wait([primary], timeout=delay)
+    if done or not breaker.take_hedge():
+        info = {'fired': False, 'delay_ms': round(delay * 1000, 1)}
+        if not done:
+            info['reason'] = 'budget'
+        return primary.result(), info
+
+    backup = hedge_pool.submit(attempt)
+    pending = {primary, backup}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                winner = 'hedge' if future is backup else 'primary'
+                if winner == 'hedge':
+                    breaker.note_hedge_win()
+                return future.result(), {'fired': True, 'delay_ms': round(delay * 1000, 1), 'winner': winner}
+            error = future.exception()
+    raise error
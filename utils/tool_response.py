@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# Defaults for tools that don't set max_response_bytes / max_prompt_chars in their config
+TOOL_MAX_RESPONSE_BYTES = int(os.getenv('TOOL_MAX_RESPONSE_BYTES', str(1024 * 1024)))
+TOOL_MAX_PROMPT_CHARS = int(os.getenv('TOOL_MAX_PROMPT_CHARS', '8000'))
+READ_CHUNK_BYTES = 64 * 1024
+
+# Response headers worth keeping in debug_info (the rest are dropped)
+LOGGED_HEADERS = ('content-type', 'content-length', 'content-encoding', 'etag', 'cache-control',
+                  'retry-after', 'x-ratelimit-remaining')
+
+_PATH_TOKEN = re.compile(r"\.([^.\[\]]+)|\[(\*|-?\d+)\]|\[['\"]([^'\"]+)['\"]\]")
+_MISSING = object()
+
+def read_capped(response, max_bytes: int) -> Tuple[bytes, bool]:
+    """Read a streamed requests response up to max_bytes; returns (body, truncated).
+
+    A truncated response is closed rather than drained, so its connection is
+    dropped instead of going back to the pool."""
+    chunks = []
+    size = 0
+    truncated = False
+    for chunk in response.iter_content(READ_CHUNK_BYTES):
+        if size + len(chunk) > max_bytes:
+            chunks.append(chunk[:max_bytes - size])
+            truncated = True
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    if truncated:
+        response.close()
+    return b''.join(chunks), truncated
+
+@lru_cache(maxsize=256)
+def compile_path(path: str) -> Tuple[Union[str, int], ...]:
+    """Parse a JSON path like `$.data.items[*].name` or `results[0]['full name']`."""
+    text = path.strip()
+    if text.startswith('$'):
+        text = text[1:]
+    if text and text[0] not in '.[':
+        text = '.' + text
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _PATH_TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Invalid JSON path '{path}' at position {position}")
+        name, index, quoted = match.groups()
+        if index is not None:
+            tokens.append('*' if index == '*' else int(index))
+        else:
+            tokens.append(name if name is not None else quoted)
+        position = match.end()
+    return tuple(tokens)
+
+def _walk(value: Any, tokens: Tuple) -> Any:
+    if not tokens:
+        return value
+    token, rest = tokens[0], tokens[1:]
+    if token == '*':
+        items = value if isinstance(value, list) else list(value.values()) if isinstance(value, dict) else []
+        return [found for found in (_walk(item, rest) for item in items) if found is not _MISSING]
+    if isinstance(token, int):
+        if isinstance(value, list) and -len(value) <= token < len(value):
+            return _walk(value[token], rest)
+        return _MISSING
+    if isinstance(value, dict) and token in value:
+        return _walk(value[token], rest)
+    return _MISSING
+
+def extract(data: Any, paths: Union[str, List[str]]) -> Any:
+    """Apply one path (returning its value) or several (returning {path: value})."""
+    if isinstance(paths, str):
+        found = _walk(data, compile_path(paths))
+        return None if found is _MISSING else found
+    result = {}
+    for path in paths:
+        found = _walk(data, compile_path(path))
+        result[path] = None if found is _MISSING else found
+    return result
+
+def digest(text: str, preview_chars: int = 200) -> Dict:
+    data = text.encode('utf-8', errors='replace')
+    return {
+        'bytes': len(data),
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'preview': text[:preview_chars] + ('...' if len(text) > preview_chars else ''),
+    }
+
+def shape_for_prompt(text: str, truncated: bool, config: Dict) -> Tuple[str, Dict]:
+    """Reduce a tool response to what the model needs: the configured `extract` paths
+    (when the body is complete JSON), capped at the tool's max_prompt_chars."""
+    info = {}
+    paths = config.get('extract')
+    if paths:
+        try:
+            if truncated:
+                raise ValueError('response was truncated')
+            text = json.dumps(extract(json.loads(text), paths), separators=(',', ':'), ensure_ascii=False)
+            info['extracted'] = True
+        except ValueError as e:
+            info['extracted'] = False
+            info['extract_error'] = str(e)
+    max_chars = int(config.get('max_prompt_chars', TOOL_MAX_PROMPT_CHARS))
+    if len(text) > max_chars:
+        info['prompt_truncated_chars'] = len(text) - max_chars
+        text = f"{text[:max_chars]}... [truncated {len(text) - max_chars} characters]"
+    elif truncated:
+        text += " ... [response truncated]"
+    return text, info
+
+def logged_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    return {key: value for key, value in headers.items() if key.lower() in LOGGED_HEADERS}
+
+def validate_config(config: Dict):
+    """Raise ValueError for malformed response-handling settings in a tool config."""
+    for key in ('max_response_bytes', 'max_prompt_chars'):
+        if key in config and (not isinstance(config[key], int) or config[key] <= 0):
+            raise ValueError(f"'{key}' must be a positive integer")
+    paths = config.get('extract')
+    if paths is not None:
+        if isinstance(paths, str):
+            paths = [paths]
+        if not isinstance(paths, list) or not paths or not all(isinstance(p, str) for p in paths):
+            raise ValueError("'extract' must be a JSON path or a list of JSON paths")
+        for path in paths:
+            compile_path(path)
@@ -0,0 +1,129 @@
+import json
+import re
+from functools import lru_cache
+from string import Template
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urljoin
+
+# `<name>` placeholders in endpoint_path; body templates use string.Template's $name / ${name}
+_PATH_PLACEHOLDER = re.compile(r'<([^<>/]+)>')
+# Placeholders are swapped for these markers (a private-use character) before parsing
+_SLOT = '\ue000{}\ue000'
+_SLOT_PATTERN = re.compile('\ue000([^\ue000]+)\ue000')
+
+def _missing(name: str):
+    raise ValueError(f"Missing required parameter '{name}'")
+
+def _as_text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value)
+
+def _as_json_value(value: Any) -> Any:
+    # A bare $name outside quotes used to be substituted as text and parsed, so
+    # '5' or 'true' still become a number or a boolean
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+class CompiledRequest:
+    """A tool's URL and body templates, parsed once and filled in directly on each call."""
+
+    def __init__(self, url_parts: List[str], url_params: Tuple[str, ...], body: Optional[Callable],
+                 body_params: Tuple[str, ...]):
+        self._url_parts = url_parts
+        self.url_params = url_params
+        self._render_body = body
+        self.body_params = body_params
+        self.required_params = tuple(dict.fromkeys(url_params + body_params))
+
+    def render(self, params: Dict) -> Tuple[str, Dict, Any]:
+        """Return (url, remaining query params, body) for a call with the given params."""
+        parts = self._url_parts
+        url = parts[0]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            if name not in params:
+                _missing(name)
+            url += quote(str(params[name]), safe='') + parts[i + 1]
+        query = {k: v for k, v in params.items() if k not in self.url_params} if self.url_params else params
+        body = self._render_body(params) if self._render_body else None
+        return url, query, body
+
+def _compile_url(base_url: str, endpoint_path: str) -> Tuple[List[str], Tuple[str, ...]]:
+    # Encoded values never contain '/', '?' or '#', so joining with the placeholders
+    # still in place gives the same URL as joining after filling them in
+    parts = _PATH_PLACEHOLDER.split(urljoin(base_url, endpoint_path))
+    return parts, tuple(dict.fromkeys(parts[1::2]))
+
+def _compile_node(node: Any, names: List[str]) -> Callable[[Dict], Any]:
+    if isinstance(node, dict):
+        items = [(_compile_node(k, names), _compile_node(v, names)) for k, v in node.items()]
+        return lambda params: {key(params): value(params) for key, value in items}
+    if isinstance(node, list):
+        items = [_compile_node(item, names) for item in node]
+        return lambda params: [item(params) for item in items]
+    if not isinstance(node, str) or '\ue000' not in node:
+        return lambda params: node
+
+    pieces = _SLOT_PATTERN.split(node)
+    for spec in pieces[1::2]:
+        names.append(spec.lstrip('='))
+    if len(pieces) == 3 and not pieces[0] and not pieces[2] and pieces[1].startswith('='):
+        # A placeholder standing in for a whole JSON value
+        name = pieces[1][1:]
+        return lambda params: _as_json_value(params[name]) if name in params else _missing(name)
+
+    def render(params):
+        text = pieces[0]
+        for i in range(1, len(pieces), 2):
+            name = pieces[i].lstrip('=')
+            if name not in params:
+                _missing(name)
+            text += _as_text(params[name]) + pieces[i + 1]
+        return text
+    return render
+
+def _compile_body(body_template: str) -> Tuple[Optional[Callable], Tuple[str, ...]]:
+    """Parse a JSON body template once: placeholders become slots in the parsed structure."""
+    if not body_template:
+        return None, ()
+    text = []
+    in_string = False
+    position = 0
+    for match in Template.pattern.finditer(body_template):
+        literal = body_template[position:match.start()]
+        # Track whether the placeholder sits inside a JSON string
+        escaped = False
+        for char in literal:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = in_string
+            elif char == '"':
+                in_string = not in_string
+        text.append(literal)
+        position = match.end()
+        if match.group('escaped') is not None:
+            text.append('$')
+            continue
+        name = match.group('named') or match.group('braced')
+        if name is None:
+            raise ValueError(f"Invalid placeholder in body_template at position {match.start()}")
+        text.append(_SLOT.format(name) if in_string else '"' + _SLOT.format('=' + name) + '"')
+    text.append(body_template[position:])
+    try:
+        parsed = json.loads(''.join(text))
+    except ValueError as e:
+        raise ValueError(f"body_template is not valid JSON: {e}")
+    names = []
+    return _compile_node(parsed, names), tuple(dict.fromkeys(names))
+
+@lru_cache(maxsize=1024)
+def compile_request(base_url: str, endpoint_path: str, body_template: str = '') -> CompiledRequest:
+    """Compile (and validate) a tool's templates; raises ValueError for a malformed body_template.
+    Cached on the template strings, so reloading a tool from storage reuses the compiled form."""
+    url_parts, url_params = _compile_url(base_url, endpoint_path)
+    body, body_params = _compile_body(body_template)
+    return CompiledRequest(url_parts, url_params, body, body_params)
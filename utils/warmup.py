@@ -0,0 +1,27 @@
+import time
+from typing import Dict
+from utils.agent_index import agent_index
+from utils.http_pool import http_pool
+from utils.prompt_cache import prompt_cache
+
+def warm_up(storage, engine) -> Dict:
+    """Do the one-time work of a worker's first requests at startup.
+
+    Loads the agent and tool registries (compiling each tool's URL and body
+    templates), builds the system prompts and the recommendation index,
+    sets up connection pools for tool hosts (no connections are opened) and
+    imports the Groq SDK. Under gunicorn --preload this runs once in the
+    master and forked workers inherit the result."""
+    started = time.perf_counter()
+    agents = storage.load_agents()
+    tools = {tool.name: tool for tool in storage.load_tools()}
+    tools_version = storage.tools_version()
+    for agent in agents[:prompt_cache.max_entries]:
+        prompt_cache.get(agent, [tools[name] for name in agent.tools if name in tools], tools_version)
+    agent_index.sync(storage)
+    for tool in tools.values():
+        if tool.type == 'http_api':
+            http_pool.session_for(tool.config['base_url'])
+    engine.client
+    return {'agents': len(agents), 'tools': len(tools),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}